@@ -0,0 +1,312 @@
+# cython: profile=False
+# cython: cdivision=True
+# cython: boundscheck=False
+# cython: wraparound=False
+
+import cython
+cimport cython
+
+import threading
+import multiprocessing as multi
+
+import numpy as np
+cimport numpy as np
+
+try:
+    import sklearn
+except ImportError:
+    raise ImportError('Scikit-learn must be installed')
+
+
+DTYPE_float32 = np.float32
+ctypedef np.float32_t DTYPE_float32_t
+
+DTYPE_float64 = np.float64
+ctypedef np.float64_t DTYPE_float64_t
+
+DTYPE_intp = np.intp
+ctypedef np.intp_t DTYPE_intp_t
+
+DTYPE_int32 = np.int32
+ctypedef np.int32_t DTYPE_int32_t
+
+# The number of samples evaluated together, tree by tree
+DEF BLOCK_SIZE = 32768
+
+
+def _normalizes_leaves():
+
+    """
+    Checks whether trees store leaf class counts that `predict_proba` normalizes
+    (Scikit-learn < 1.4) rather than class fractions
+    """
+
+    version = tuple([int(v) for v in sklearn.__version__.split('.')[:2] if v.isdigit()])
+
+    return version < (1, 4)
+
+
+def _float32_thresholds(threshold):
+
+    """
+    Rounds float64 split thresholds down to float32
+
+    For a float32 value x and a float64 threshold t, x <= t exactly when x <= t32,
+    where t32 is the largest float32 that is <= t. Comparing in float32 therefore
+    takes the same branches as Scikit-learn, which compares float32 features
+    with float64 thresholds.
+    """
+
+    threshold = np.asarray(threshold, dtype='float64')
+
+    threshold32 = threshold.astype('float32')
+
+    rounded_up = threshold32.astype('float64') > threshold
+
+    threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+
+    return threshold32
+
+
+def is_supported(model):
+
+    """
+    Checks whether a fitted model can be exported to a `FlatForest`
+
+    Args:
+        model (object): A fitted Scikit-learn model.
+    """
+
+    estimators = getattr(model, 'estimators_', None)
+
+    if not hasattr(model, 'predict_proba') or not isinstance(estimators, list) or not estimators:
+        return False
+
+    if getattr(model, 'n_outputs_', 1) != 1:
+        return False
+
+    # Random Forest-like ensembles average the per-tree leaf probabilities.
+    if type(model).__name__ not in ['RandomForestClassifier', 'ExtraTreesClassifier', 'BalancedRandomForestClassifier']:
+        return False
+
+    return all([hasattr(estimator, 'tree_') for estimator in estimators])
+
+
+cdef packed struct Node:
+    DTYPE_int32_t left
+    DTYPE_int32_t right
+    DTYPE_int32_t feature
+    DTYPE_float32_t threshold
+
+
+NODE_DTYPE = np.dtype([('left', np.int32),
+                       ('right', np.int32),
+                       ('feature', np.int32),
+                       ('threshold', np.float32)])
+
+
+cdef void _predict_rows(DTYPE_float32_t[:, ::1] features,
+                        DTYPE_intp_t[::1] roots,
+                        Node[::1] nodes,
+                        DTYPE_float64_t[:, ::1] leaf_proba,
+                        DTYPE_float64_t[:, ::1] out_proba,
+                        Py_ssize_t start,
+                        Py_ssize_t end) nogil:
+
+    """
+    Averages the leaf probabilities of every tree for samples [start, end)
+
+    The trees are summed in order and then divided by the number of trees,
+    the same operations as Scikit-learn's `predict_proba`.
+    """
+
+    cdef:
+        Py_ssize_t i, t, c, node, block_start, block_end
+        Py_ssize_t n_trees = roots.shape[0]
+        Py_ssize_t n_classes = leaf_proba.shape[1]
+        DTYPE_float64_t n_trees_f = <DTYPE_float64_t>n_trees
+
+    # Blocks of samples go through one tree at a time, which keeps the tree nodes in cache.
+    for block_start in range(start, end, BLOCK_SIZE):
+
+        block_end = block_start + BLOCK_SIZE
+
+        if block_end > end:
+            block_end = end
+
+        for t in range(0, n_trees):
+
+            for i in range(block_start, block_end):
+
+                node = roots[t]
+
+                while nodes[node].left != -1:
+
+                    if features[i, nodes[node].feature] <= nodes[node].threshold:
+                        node = nodes[node].left
+                    else:
+                        node = nodes[node].right
+
+                for c in range(0, n_classes):
+                    out_proba[i, c] += leaf_proba[node, c]
+
+        for i in range(block_start, block_end):
+            for c in range(0, n_classes):
+                out_proba[i, c] /= n_trees_f
+
+
+cdef class FlatForest:
+
+    """
+    A Random Forest exported to contiguous node arrays
+
+    The nodes of all trees are stored back to back in one array of (children,
+    split feature, threshold) records, with the normalized leaf class probabilities
+    alongside. Samples are evaluated without the GIL, split across threads.
+
+    Args:
+        model (object): A fitted Scikit-learn Random Forest or Extra Trees classifier.
+        n_jobs (Optional[int]): The number of threads. If -1, use all CPUs. Default is 1.
+
+    Example:
+        >>> flat_model = FlatForest(model, n_jobs=8)
+        >>> probabilities = flat_model.predict_proba(features)
+    """
+
+    cdef public object classes_
+    cdef public int n_jobs
+    cdef public Py_ssize_t n_features, n_classes, n_trees
+
+    cdef np.ndarray roots, nodes, leaf_proba
+
+    def __init__(self, model, n_jobs=1):
+
+        if not is_supported(model):
+            raise TypeError('{} cannot be exported to a FlatForest.'.format(type(model).__name__))
+
+        self.classes_ = model.classes_
+        self.n_jobs = n_jobs
+        self.n_classes = len(model.classes_)
+        self.n_trees = len(model.estimators_)
+        self.n_features = model.estimators_[0].tree_.n_features
+
+        roots = list()
+        nodes = list()
+        leaf_proba = list()
+
+        node_offset = 0
+        normalize = _normalizes_leaves()
+
+        for estimator in model.estimators_:
+
+            tree = estimator.tree_
+
+            left = np.array(tree.children_left, dtype='intp')
+            right = np.array(tree.children_right, dtype='intp')
+
+            # Leaf probabilities, normalized the same way as `DecisionTreeClassifier.predict_proba`
+            proba = np.array(tree.value[:, 0, :self.n_classes], dtype='float64')
+
+            if normalize:
+
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer
+
+            tree_nodes = np.zeros(tree.node_count, dtype=NODE_DTYPE)
+
+            tree_nodes['left'] = np.where(left == -1, -1, left + node_offset)
+            tree_nodes['right'] = np.where(right == -1, -1, right + node_offset)
+            tree_nodes['feature'] = tree.feature
+            tree_nodes['threshold'] = _float32_thresholds(tree.threshold)
+
+            roots.append(node_offset)
+            nodes.append(tree_nodes)
+            leaf_proba.append(proba)
+
+            node_offset += tree.node_count
+
+        self.roots = np.array(roots, dtype='intp')
+        self.nodes = np.ascontiguousarray(np.concatenate(nodes))
+        self.leaf_proba = np.ascontiguousarray(np.concatenate(leaf_proba, axis=0), dtype='float64')
+
+    @property
+    def n_nodes(self):
+        return self.nodes.shape[0]
+
+    def _predict_chunk(self, DTYPE_float32_t[:, ::1] features, DTYPE_float64_t[:, ::1] out_proba,
+                       Py_ssize_t start, Py_ssize_t end):
+
+        cdef:
+            DTYPE_intp_t[::1] roots = self.roots
+            Node[::1] nodes = self.nodes
+            DTYPE_float64_t[:, ::1] leaf_proba = self.leaf_proba
+
+        with nogil:
+
+            _predict_rows(features,
+                          roots,
+                          nodes,
+                          leaf_proba,
+                          out_proba,
+                          start,
+                          end)
+
+    def predict_proba(self, features):
+
+        """
+        Predicts class posterior probabilities
+
+        Args:
+            features (2d array): The features, shaped [samples x features]. Values are
+                compared as float32, like Scikit-learn trees.
+
+        Returns:
+            Probabilities as a 2d array, shaped [samples x classes].
+        """
+
+        features = np.ascontiguousarray(features, dtype='float32')
+
+        if (features.ndim != 2) or (features.shape[1] != self.n_features):
+
+            raise ValueError('The features should be shaped [samples x {:d}], not {}.'.format(self.n_features,
+                                                                                         features.shape))
+
+        n_samples = features.shape[0]
+
+        out_proba = np.zeros((n_samples, self.n_classes), dtype='float64')
+
+        n_jobs = self.n_jobs if self.n_jobs > 0 else multi.cpu_count()
+        n_jobs = max(1, min(n_jobs, n_samples))
+
+        if n_jobs == 1:
+            self._predict_chunk(features, out_proba, 0, n_samples)
+        else:
+
+            chunk_size = int(np.ceil(n_samples / float(n_jobs)))
+
+            threads = [threading.Thread(target=self._predict_chunk,
+                                        args=(features, out_proba, start, min(start+chunk_size, n_samples)))
+                       for start in range(0, n_samples, chunk_size)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        return out_proba
+
+    def predict(self, features):
+
+        """
+        Predicts class labels
+
+        Args:
+            features (2d array): The features, shaped [samples x features].
+
+        Returns:
+            Class labels as a 1d array.
+        """
+
+        return self.classes_.take(np.argmax(self.predict_proba(features), axis=1), axis=0)
@@ -3279,90 +3279,6 @@ cdef DTYPE_float32_t _fill_basins(DTYPE_float32_t[:, ::1] image_block,
         return bcv
 
 
-cdef DTYPE_float32_t _get_proba_mean(DTYPE_float32_t[:, ::1] proba_block___,
-                                     DTYPE_float32_t[:, ::1] weight_sums___,
-                                     unsigned int window_size) nogil:
-
-    """Calculates the weighted mean of the relaxed probability sums"""
-
-    cdef:
-        Py_ssize_t ii, jj
-        DTYPE_float32_t proba_sum = 0.
-        DTYPE_float32_t weight_sum = 0.
-
-    for ii in range(0, window_size):
-
-        for jj in range(0, window_size):
-
-            proba_sum += proba_block___[ii, jj]
-            weight_sum += weight_sums___[ii, jj]
-
-    return proba_sum / weight_sum
-
-
-cdef void _block_weighted_sum(DTYPE_float32_t[:, ::1] proba_block__,
-                              DTYPE_float32_t[:, ::1] probs_layer,
-                              unsigned int window_size,
-                              DTYPE_float32_t pls,
-                              DTYPE_float32_t[:, ::1] dist_weights,
-                              DTYPE_float32_t[:, ::1] weight_sums__) nogil:
-
-    """Calculates the weighted sum of posterior probabilities"""
-
-    cdef:
-        Py_ssize_t ii, jj, iii, jjj
-        DTYPE_float32_t weight
-
-    for ii in range(0, window_size):
-
-        for jj in range(0, window_size):
-
-            weight = pls * dist_weights[ii, jj]
-
-            # posterior class probability x class uncertainty x distance weight
-            proba_block__[ii, jj] += (probs_layer[ii, jj] * weight)
-
-            weight_sums__[ii, jj] += weight
-
-
-cdef DTYPE_float32_t _k_prob(DTYPE_float32_t[:, :, ::1] probs,
-                             DTYPE_float32_t[:, ::1] proba_block_,
-                             Py_ssize_t current_band,
-                             unsigned int bands,
-                             unsigned int window_size,
-                             DTYPE_float32_t[:, ::1] compatibility_matrix,
-                             DTYPE_float32_t[:, ::1] dist_weights,
-                             DTYPE_float32_t[:, ::1] weight_sums_) nogil:
-
-    cdef:
-        Py_ssize_t class_iter
-        DTYPE_float32_t[:, ::1] current_layer
-
-    # Iterate over each class
-    for class_iter in range(0, bands):
-
-        # The current class probability window
-        current_layer = probs[class_iter, :, :]
-
-        # --------------------
-        # Get the weighted sum
-        # --------------------
-
-        # Add the current class probabilities,
-        #   weighted by the uncertainty.
-        _block_weighted_sum(proba_block_,
-                            current_layer,
-                            window_size,
-                            compatibility_matrix[current_band, class_iter],
-                            dist_weights,
-                            weight_sums_)
-
-    # Get the weighted mean
-    return _get_proba_mean(proba_block_,
-                           weight_sums_,
-                           window_size)
-
-
 cdef DTYPE_float32_t[:, ::1] _create_weights(unsigned int window_size,
                                              unsigned int half_window):
 
@@ -3406,26 +3322,29 @@ cdef np.ndarray[DTYPE_float32_t, ndim=3] plr(DTYPE_float32_t[:, :, ::1] proba_ar
     Process:
         proba_q:
             The Q_i vector equals the sum of probabilities over all classes and neighborhoods.
+
+            For class c, Q_c = sum_k(C[c, k] * (D * P_k)) / (sum_k(C[c, k]) * sum(D)), where
+            D * P_k is the distance-weighted window sum of class k and C is the compatibility
+            matrix. The window sums of each class are computed once per iteration with
+            (threaded) OpenCV filters, and the compatibility matrix is applied as a
+            (classes x classes) product.
     """
 
     cdef:
-        Py_ssize_t i, j, iteration, band, bci, bcj
+        Py_ssize_t iteration, band, bci, bcj
         unsigned int bands = proba_array.shape[0]
         unsigned int rows = proba_array.shape[1]
         unsigned int cols = proba_array.shape[2]
         unsigned int half_window = <int>(window_size / 2.)
-        unsigned int row_dims = rows - (half_window * 2)
-        unsigned int col_dims = cols - (half_window * 2)
-        DTYPE_float32_t[:, :, ::1] out_array = proba_array.copy()
-        DTYPE_float32_t[:, ::1] block_proba = np.zeros((window_size, window_size), dtype='float32')
-        DTYPE_float32_t[:, ::1] proba_block = block_proba.copy()
-        DTYPE_float32_t[:, ::1] weight_sums = block_proba.copy()
-        DTYPE_float32_t[:, :, ::1] proba_block_3d
-        DTYPE_float32_t[:, ::1] dist_weights = _create_weights(window_size, half_window)
-        DTYPE_float32_t[:, ::1] compatibility_matrix = np.zeros((bands, bands), dtype='float32')
-        DTYPE_float32_t proba_q, proba_p
-
-    # TODO
+        np.ndarray[DTYPE_float32_t, ndim=3] out_array = np.array(proba_array, dtype='float32')
+        np.ndarray[DTYPE_float32_t, ndim=2] dist_weights = np.asarray(_create_weights(window_size, half_window))
+        np.ndarray[DTYPE_float32_t, ndim=2] compatibility_matrix = np.zeros((bands, bands), dtype='float32')
+        np.ndarray[DTYPE_float32_t, ndim=3] neighbor_sums
+        np.ndarray[DTYPE_float32_t, ndim=1] weight_sums
+
+    if (rows <= half_window * 2) or (cols <= half_window * 2):
+        return out_array
+
     # -------------------------------
     # Create the compatibility matrix
     # -------------------------------
@@ -3443,59 +3362,31 @@ cdef np.ndarray[DTYPE_float32_t, ndim=3] plr(DTYPE_float32_t[:, :, ::1] proba_ar
                 else:
                     compatibility_matrix[bci, bcj] = .5
 
-    # with nogil:
-    #
-    #     for ic from 0 <= ic < rows by 2:
-    #
-    #         for jc from 0 <= jc < cols by 2:
-    #
-    #             for bci in range(0, bands):
-    #
-    #                 for bcj in range(0, bands):
-    #
-    #                     compatibility_matrix[bci, bcj]
-
-    for iteration in range(0, iterations):
-
-        with nogil:
-
-            for i in range(0, row_dims):
-
-                for j in range(0, col_dims):
-
-                    # Current probabilities
-                    proba_block_3d = proba_array[:,
-                                                 i:i+window_size,
-                                                 j:j+window_size]
+    # The sum of the weights for each class
+    weight_sums = np.float32(compatibility_matrix.sum(axis=1) * dist_weights.sum())
 
-                    # Iterate over each class.
-                    for band in range(0, bands):
+    row_slice = slice(half_window, rows - half_window)
+    col_slice = slice(half_window, cols - half_window)
 
-                        # Initiate the block to be filled with zeros.
-                        proba_block[...] = block_proba
-                        weight_sums[...] = block_proba
+    neighbor_sums = np.empty((bands, rows - half_window * 2, cols - half_window * 2), dtype='float32')
 
-                        # Get the weighted mean
-                        #   of probabilities.
-                        proba_q = _k_prob(proba_block_3d,
-                                          proba_block,
-                                          band,
-                                          bands,
-                                          window_size,
-                                          compatibility_matrix,
-                                          dist_weights,
-                                          weight_sums)
-
-                        proba_p = proba_block_3d[band, half_window, half_window]
+    for iteration in range(0, iterations):
 
-                        out_array[band, i+half_window, j+half_window] = proba_q * proba_p
+        # The distance-weighted window sum of each class
+        for band in range(0, bands):
 
-            proba_array[...] = out_array
+            neighbor_sums[band] = cv2.filter2D(out_array[band],
+                                               -1,
+                                               dist_weights,
+                                               borderType=cv2.BORDER_CONSTANT)[row_slice, col_slice]
 
-        # Normalize
-        # proba_array = np.float32(out_array) / np.float32(out_array).max(axis=0)
+        # Apply the compatibility matrix, get the weighted
+        #   mean, and weight by the current probabilities.
+        out_array[:, row_slice, col_slice] *= np.tensordot(compatibility_matrix,
+                                                           neighbor_sums,
+                                                           axes=1) / weight_sums[:, np.newaxis, np.newaxis]
 
-    return np.float32(proba_array)
+    return out_array
 
 
 cdef np.ndarray[DTYPE_float32_t, ndim=2] fill_basins(DTYPE_float32_t[:, ::1] image2fill,
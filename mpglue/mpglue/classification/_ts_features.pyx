@@ -0,0 +1,285 @@
+# cython: profile=False
+# cython: cdivision=True
+# cython: boundscheck=False
+# cython: wraparound=False
+
+import cython
+cimport cython
+
+import threading
+
+import numpy as np
+cimport numpy as np
+
+from libc.math cimport sqrt, floor, NAN
+
+
+DTYPE_float32 = np.float32
+ctypedef np.float32_t DTYPE_float32_t
+
+DTYPE_float64 = np.float64
+ctypedef np.float64_t DTYPE_float64_t
+
+DTYPE_intp = np.intp
+ctypedef np.intp_t DTYPE_intp_t
+
+cdef extern from 'numpy/npy_math.h':
+    bint npy_isfinite(DTYPE_float64_t x) nogil
+
+# Feature codes
+DEF MEAN = 0
+DEF CV = 1
+DEF QUANTILE = 2
+DEF CUMULATIVE = 3
+
+
+cdef inline void _swap(DTYPE_float32_t[::1] values, Py_ssize_t a, Py_ssize_t b) nogil:
+
+    cdef:
+        DTYPE_float32_t tmp = values[a]
+
+    values[a] = values[b]
+    values[b] = tmp
+
+
+cdef void _select(DTYPE_float32_t[::1] values,
+                  Py_ssize_t left,
+                  Py_ssize_t right,
+                  Py_ssize_t k) nogil:
+
+    """
+    Partially sorts values[left:right+1] in place (Hoare's selection), so that values[k]
+    is the value at sorted position k, with smaller values before and larger values after
+    """
+
+    cdef:
+        Py_ssize_t i, j, mid
+        DTYPE_float32_t pivot
+
+    while left < right:
+
+        # Median of three pivot
+        mid = left + (right - left) // 2
+
+        if values[mid] < values[left]:
+            _swap(values, left, mid)
+
+        if values[right] < values[left]:
+            _swap(values, left, right)
+
+        if values[right] < values[mid]:
+            _swap(values, mid, right)
+
+        pivot = values[mid]
+
+        i = left
+        j = right
+
+        while i <= j:
+
+            while values[i] < pivot:
+                i += 1
+
+            while values[j] > pivot:
+                j -= 1
+
+            if i <= j:
+
+                _swap(values, i, j)
+
+                i += 1
+                j -= 1
+
+        if k <= j:
+            right = j
+        elif k >= i:
+            left = i
+        else:
+            return
+
+
+cdef DTYPE_float64_t _lerp(DTYPE_float64_t a, DTYPE_float64_t b, DTYPE_float64_t t) nogil:
+
+    """
+    Linear interpolation, as in `np.percentile`
+    """
+
+    if t >= .5:
+        return b - (b - a) * (1. - t)
+    else:
+        return a + (b - a) * t
+
+
+cdef void _ts_features_rows(DTYPE_float32_t[:, :, ::1] block,
+                            DTYPE_intp_t[::1] codes,
+                            DTYPE_float64_t[::1] params,
+                            DTYPE_intp_t[::1] kth,
+                            DTYPE_float32_t[::1] series,
+                            DTYPE_float32_t[::1] cumsums,
+                            DTYPE_float32_t no_data,
+                            DTYPE_float32_t[:, :, ::1] out,
+                            Py_ssize_t start,
+                            Py_ssize_t end) nogil:
+
+    cdef:
+        Py_ssize_t cols = block.shape[1]
+        Py_ssize_t n_dims = block.shape[2]
+        Py_ssize_t n_features = codes.shape[0]
+        Py_ssize_t n_kth = kth.shape[0]
+        Py_ssize_t i, j, t, fi, ki, lo, left
+        DTYPE_float32_t cumulative
+        DTYPE_float64_t total, mean, sq_dev, value
+        bint has_nan, is_partitioned
+
+    for i in range(start, end):
+
+        for j in range(0, cols):
+
+            total = 0.
+            cumulative = 0.
+            has_nan = False
+
+            for t in range(0, n_dims):
+
+                series[t] = block[i, j, t]
+                total += series[t]
+
+                # Cumulative sums are accumulated in float32, like `cumsum`.
+                cumulative += series[t]
+                cumsums[t] = cumulative
+
+                if series[t] != series[t]:
+                    has_nan = True
+
+            mean = total / n_dims
+
+            is_partitioned = False
+
+            for fi in range(0, n_features):
+
+                if codes[fi] == MEAN:
+                    value = mean
+
+                elif codes[fi] == CV:
+
+                    sq_dev = 0.
+
+                    # The series might be partitioned, but the order does not matter.
+                    for t in range(0, n_dims):
+                        sq_dev += (series[t] - mean) * (series[t] - mean)
+
+                    value = sqrt(sq_dev / n_dims) / mean
+
+                elif codes[fi] == QUANTILE:
+
+                    if has_nan:
+                        value = NAN
+                    else:
+
+                        if not is_partitioned:
+
+                            # One partition of the series places every order statistic
+                            #   needed by the quantiles, from the lowest up.
+                            left = 0
+
+                            for ki in range(0, n_kth):
+
+                                _select(series, left, n_dims-1, kth[ki])
+                                left = kth[ki] + 1
+
+                            is_partitioned = True
+
+                        lo = <Py_ssize_t>floor(params[fi])
+
+                        if lo >= n_dims - 1:
+                            value = series[n_dims-1]
+                        else:
+                            value = _lerp(series[lo], series[lo+1], params[fi] - lo)
+
+                else:
+                    value = cumsums[<Py_ssize_t>params[fi]]
+
+                if npy_isfinite(value):
+                    out[fi, i, j] = <DTYPE_float32_t>value
+                else:
+                    out[fi, i, j] = no_data
+
+
+def _process_rows(DTYPE_float32_t[:, :, ::1] block,
+                  DTYPE_intp_t[::1] codes,
+                  DTYPE_float64_t[::1] params,
+                  DTYPE_intp_t[::1] kth,
+                  DTYPE_float32_t[::1] series,
+                  DTYPE_float32_t[::1] cumsums,
+                  double no_data,
+                  DTYPE_float32_t[:, :, ::1] out,
+                  Py_ssize_t start,
+                  Py_ssize_t end):
+
+    with nogil:
+
+        _ts_features_rows(block,
+                          codes,
+                          params,
+                          kth,
+                          series,
+                          cumsums,
+                          <DTYPE_float32_t>no_data,
+                          out,
+                          start,
+                          end)
+
+
+def ts_features_block(DTYPE_float32_t[:, :, ::1] block,
+                      DTYPE_intp_t[::1] codes,
+                      DTYPE_float64_t[::1] params,
+                      DTYPE_intp_t[::1] kth,
+                      DTYPE_float32_t[:, :, ::1] out,
+                      double no_data=0,
+                      int n_jobs=1):
+
+    """
+    Computes time series features of a block, one pixel series at a time
+
+    Each pixel series is partitioned at most once for all of its quantiles.
+
+    Args:
+        block (3d array): The float32 time series, shaped [rows x columns x dimensions].
+        codes (1d array): The feature codes (0=mean, 1=coefficient of variation,
+            2=quantile, 3=cumulative sum).
+        params (1d array): The quantile positions in the sorted series, or the cumulative
+            sum indices.
+        kth (1d array): The ascending, unique sorted positions that the quantiles interpolate between.
+        out (3d array): The float32 output, shaped [features x rows x columns].
+        no_data (Optional[float]): The value of non-finite features. Default is 0.
+        n_jobs (Optional[int]): The number of threads. Default is 1.
+    """
+
+    cdef:
+        Py_ssize_t rows = block.shape[0]
+        Py_ssize_t n_dims = block.shape[2]
+        DTYPE_float32_t[:, ::1] series
+        DTYPE_float32_t[:, ::1] cumsums
+
+    n_jobs = max(1, min(n_jobs, rows))
+
+    # One series and cumulative sum buffer per thread
+    series = np.empty((n_jobs, n_dims), dtype='float32')
+    cumsums = np.empty((n_jobs, n_dims), dtype='float32')
+
+    if n_jobs == 1:
+        _process_rows(block, codes, params, kth, series[0], cumsums[0], no_data, out, 0, rows)
+    else:
+
+        chunk_size = int(np.ceil(rows / float(n_jobs)))
+
+        threads = [threading.Thread(target=_process_rows,
+                                    args=(block, codes, params, kth, series[ji], cumsums[ji], no_data, out,
+                                          start, min(start+chunk_size, rows)))
+                   for ji, start in enumerate(range(0, rows, chunk_size))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
@@ -20,10 +20,14 @@ from copy import copy
 import itertools
 from collections import OrderedDict
 import inspect
+import threading
+from future.moves import queue
 
 # MpGlue
 from .error_matrix import error_matrix
 from ._moving_window import moving_window
+from ._forest import FlatForest, is_supported as flat_forest_supported
+from .sample_store import SampleStore, is_sample_store
 from .. import raster_tools
 from .. import vector_tools
 from ..helpers import get_path
@@ -241,6 +245,38 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
+def _fill_nonfinite(array, fill_value=0.0, chunk_size=1048576):
+
+    """
+    Replaces NaNs and infinite values in place, with one pass over the array
+
+    The array is processed in row chunks, so the boolean mask stays small.
+
+    Args:
+        array (ndarray): The array to fill.
+        fill_value (Optional[float]): The replacement value. Default is 0.
+        chunk_size (Optional[int]): The number of array elements per chunk. Default is 1048576.
+
+    Returns:
+        The filled array
+    """
+
+    if (array.dtype.kind != 'f') or (array.size == 0):
+        return array
+
+    if array.ndim == 1:
+        chunk_rows = chunk_size
+    else:
+        chunk_rows = max(1, int(chunk_size / (array.size / array.shape[0])))
+
+    for chunk_start in range(0, array.shape[0], chunk_rows):
+
+        array_chunk = array[chunk_start:chunk_start+chunk_rows]
+        array_chunk[~np.isfinite(array_chunk)] = fill_value
+
+    return array
+
+
 def _do_c5_cubist_predict(c5_cubist_model, classifier_name, predict_samps, rows_i=None):
 
     """
@@ -330,7 +366,7 @@ def predict_scikit_probas_static(features,
     """
 
     # `probabilities` shaped as [samples x n classes]
-    probabilities = mdl.predict_proba(np.float64(features))
+    probabilities = mdl.predict_proba(features)
 
     n_classes = probabilities.shape[1]
 
@@ -435,7 +471,7 @@ def predict_scikit_probas(rw,
     """
 
     # `probabilities` shaped as [samples x n classes]
-    probabilities = mdl.predict_proba(np.float64(features))
+    probabilities = mdl.predict_proba(features)
 
     n_classes = probabilities.shape[1]
 
@@ -875,8 +911,9 @@ class Samples(object):
         Split samples for training and testing.
         
         Args:
-            file_name (str or 2d array or DataFrame): Input text file, 2d array, or Pandas DataFrame
-                with samples and labels.
+            file_name (str or 2d array or DataFrame): Input text file, sample store (see `sample_store`),
+                2d array, or Pandas DataFrame with samples and labels. Sample stores are memory-mapped
+                instead of parsed, and always have the normal structure.
             perc_samp (Optional[float]): Percent to sample from all samples. Default is .9. This parameter
                 samples from the entire set of samples, regardless of which class they are in.
 
@@ -955,8 +992,19 @@ class Samples(object):
 
         self.sample_info_dict = dict()
 
+        store = None
+
         # Open the data samples.
-        if isinstance(self.file_name, str):
+        if is_sample_store(self.file_name):
+
+            store = SampleStore(self.file_name)
+
+            # Only the Id, X, Y and response columns go into the DataFrame.
+            self.df = store.to_frame(x_label=x_label, y_label=y_label, response_label=self.response_label)
+
+            norm_struct = True
+
+        elif isinstance(self.file_name, str):
 
             self.df = pd.read_csv(self.file_name, sep=',')
 
@@ -983,7 +1031,10 @@ class Samples(object):
             raise TypeError
 
         # Parse the headers.
-        self.headers = self.df.columns.values.tolist()
+        if store is not None:
+            self.headers = [store.headers[0], x_label, y_label] + store.headers[3:-1] + [self.response_label]
+        else:
+            self.headers = self.df.columns.values.tolist()
 
         if norm_struct:
 
@@ -1004,7 +1055,13 @@ class Samples(object):
             data_position = 0
 
         # Parse the x variables.
-        self.all_samps = self.df.loc[:, self.headers[data_position:]].values
+        if store is not None:
+
+            # The store matrix is already (features, response), so it is used without a copy.
+            self.all_samps = store.values
+
+        else:
+            self.all_samps = self.df.loc[:, self.headers[data_position:]].values
 
         if isinstance(clear_observations, np.ndarray) or isinstance(clear_observations, list):
 
@@ -1024,17 +1081,29 @@ class Samples(object):
             ignore_feas = np.array(sorted([int(f-1) for f in ignore_feas]), dtype='int64')
 
             self.all_samps = np.delete(self.all_samps, ignore_feas, axis=1)
-            self.df.drop(self.df.columns[ignore_feas+2], inplace=True, axis=1)
 
-            self.headers = self.df.columns.tolist()
+            if store is not None:
+                self.headers = self.headers[:2] + list(np.delete(self.headers[2:-1], ignore_feas)) + [self.headers[-1]]
+            else:
+
+                self.df.drop(self.df.columns[ignore_feas+2], inplace=True, axis=1)
+
+                self.headers = self.df.columns.tolist()
 
         if self.use_xy:
 
-            # Reorder the variables and x, y coordinates.
-            self.df = self.df[self.headers[2:-1] + self.headers[:2] + [self.headers[-1]]]
-            self.all_samps = self.df.values
+            if store is not None:
+
+                self.all_samps = np.c_[self.all_samps[:, :-1], self.df[[x_label, y_label]].values, self.all_samps[:, -1]]
+                self.headers = self.headers[2:-1] + self.headers[:2] + [self.headers[-1]]
+
+            else:
 
-            self.headers = self.df.columns.tolist()
+                # Reorder the variables and x, y coordinates.
+                self.df = self.df[self.headers[2:-1] + self.headers[:2] + [self.headers[-1]]]
+                self.all_samps = self.df.values
+
+                self.headers = self.df.columns.tolist()
 
         else:
 
@@ -5320,6 +5389,8 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
                 ignore_feas=None,
                 in_stats=None,
                 in_model=None,
+                aoi_file=None,
+                skip_empty=False,
                 mask_background=None,
                 background_band=1,
                 background_value=0,
@@ -5340,6 +5411,9 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
                 plr_matrix=None,
                 write2blocks=False,
                 block_range=None,
+                queue_size=2,
+                feature_dtype='float32',
+                inference_engine='sklearn',
                 morphology=False,
                 do_not_morph=None,
                 d_type='byte',
@@ -5360,6 +5434,10 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
             in_stats (Optional[str]): A XML statistics file. Default is None. *Only applicable to Orfeo models.
             in_model (Optional[str]): A model file to load. Default is None. *Only applicable to Orfeo
                 and C5/Cubist models.
+            aoi_file (Optional[str]): A vector file of the valid-data boundary. Default is None.
+                Blocks outside of the boundary are left as 0 without being read.
+            skip_empty (Optional[bool]): Whether to skip blocks that are 'no data' (0) in an overview of
+                `band_check` (or band 1) without reading them. Default is False. *Ignored if `aoi_file` is given.
             mask_background (Optional[str or 2d array]): An image or array to use as a background mask. Default is None.
             background_band (int): The band from `mask_background` to use for null background value. Default is 1.
             background_value (Optional[int]): The background value in `mask_background`. Default is 0.
@@ -5388,6 +5466,15 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
                 *In the event of True, each block will be given the name `base image_####base extension`.
             block_range (Optional[list or tuple]): A start and end range for block processing. Default is None,
                 or start at the first block.
+            queue_size (Optional[int]): The maximum number of blocks held in the read and write queues
+                of the prediction pipeline. Default is 2.
+            feature_dtype (Optional[str]): The data type to read features as. Default is 'float32', which is the
+                storage type of SpFeas features and the type Scikit-learn trees predict with. C5/Cubist models
+                always use 'float64'.
+            inference_engine (Optional[str]): The Random Forest inference engine. Choices are ['sklearn', 'flat'].
+                Default is 'sklearn'. 'flat' exports the fitted forest to contiguous node arrays and predicts with
+                a compiled kernel over `n_jobs` threads, giving the same probabilities as `predict_proba`.
+                Models other than Random Forests and Extra Trees always use 'sklearn'.
             morphology (Optional[bool]): Whether to apply image morphology to the predicted classes.
                 Default is False.
             do_not_morph (Optional[int list]): A list of classes not to morph with `morphology=True`. Default is None.
@@ -5434,6 +5521,8 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
         self.ignore_feas = ignore_feas
         self.bands2open = bands2open
         self.band_check = band_check
+        self.aoi_file = aoi_file
+        self.skip_empty = skip_empty
         self.row_block_size = row_block_size
         self.col_block_size = col_block_size
         self.mask_background = mask_background
@@ -5457,6 +5546,9 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
         self.plr_matrix = plr_matrix
         self.write2blocks = write2blocks
         self.block_range = block_range
+        self.queue_size = queue_size
+        self.feature_dtype = feature_dtype
+        self.inference_engine = inference_engine
         self.morphology = morphology
         self.do_not_morph = do_not_morph
         self.d_type = d_type
@@ -5465,6 +5557,11 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
         if self.n_jobs == -1:
             self.n_jobs = joblib.cpu_count()
 
+        if self.inference_engine not in ['sklearn', 'flat']:
+
+            logger.error('  The inference engine should be one of sklearn, flat.')
+            raise NameError
+
         if not hasattr(self, 'classifier_info'):
 
             logger.warning("""\
@@ -5487,6 +5584,10 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
 
             return
 
+        # R matrices are double precision.
+        if self.classifier_info['classifier'] in ['c5', 'cubist']:
+            self.feature_dtype = 'float64'
+
         self.dir_name, f_name = os.path.split(self.output_image)
         self.output_image_base, self.output_image_ext = os.path.splitext(f_name)
 
@@ -5680,6 +5781,30 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
             # app.SetParameterString('out', output_map)
             # app.ExecuteAndWriteOutput()
 
+    def _export_forest(self, model):
+
+        """
+        Exports a fitted forest to a `FlatForest`
+
+        Args:
+            model (object): The fitted model.
+
+        Returns:
+            A `FlatForest`, or `model` if it cannot be exported
+        """
+
+        if not flat_forest_supported(model):
+
+            logger.warning('  The flat inference engine does not support {}. Using Scikit-learn.'.format(type(model).__name__))
+            return model
+
+        flat_model = FlatForest(model, n_jobs=self.n_jobs)
+
+        logger.info('  Exported {:d} trees ({:,d} nodes) to the flat inference engine.'.format(flat_model.n_trees,
+                                                                                            flat_model.n_nodes))
+
+        return flat_model
+
     def _predict(self):
 
         # Global variables for parallel processing.
@@ -5697,6 +5822,9 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
         else:
             mdl = self.model
 
+        if self.inference_engine == 'flat':
+            mdl = self._export_forest(mdl)
+
         # Set default indexing variables.
         start_i = 0
         start_j = 0
@@ -5757,6 +5885,103 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
                                                      block_rows,
                                                      block_cols)
 
+        # Check the model against the predictive layers.
+        self._check_model_features()
+
+        # The valid-data footprint, for skipping empty blocks
+        self.occupancy_index = None
+
+        if isinstance(self.aoi_file, str) or self.skip_empty:
+
+            self.occupancy_index = raster_tools.OccupancyIndex(self.i_info,
+                                                               band=self.band_check if self.band_check != -1 else 1,
+                                                               boundary_file=self.aoi_file)
+
+        block_jobs = self._get_block_jobs(block_indices,
+                                          n_blocks,
+                                          image_top,
+                                          image_left,
+                                          iwo,
+                                          jwo)
+
+        if not self.open_image:
+
+            # Close the image information object because it
+            #   needs to be reopened for parallel ``read``.
+            self.i_info.close()
+            self.open_image = True
+
+        self._predict_blocks(block_jobs,
+                             None if self.write2blocks else out_raster_object)
+
+        # Close the file.
+        if not self.write2blocks:
+
+            if self.predict_probs:
+
+                for cidx in range(0, len(mdl.classes_)):
+
+                    out_raster_object.get_band(cidx+1)
+                    out_raster_object.close_band()
+
+            out_raster_object.close_all()
+            out_raster_object = None
+
+        if isinstance(self.mask_background, str) or isinstance(self.mask_background, np.ndarray):
+            self._mask_background()
+
+    def _check_model_features(self):
+
+        """Checks the number of predictive layers against the model"""
+
+        if 'CV' in self.classifier_info['classifier']:
+
+            if len(self.bands2open) != self.model.getVarCount():
+
+                logger.error('  The number of predictive layers does not match the number of model estimators.')
+                raise AssertionError
+
+        elif (self.classifier_info['classifier'] not in ['c5', 'cubist', 'qda', 'chaincrf']) and \
+                ('CV' not in self.classifier_info['classifier']):
+
+            if hasattr(self.model, 'n_features_'):
+
+                if len(self.bands2open) != self.model.n_features_:
+
+                    logger.error('  The number of predictive layers does not match the number of model estimators.')
+                    raise AssertionError
+
+            if hasattr(self.model, 'base_estimator'):
+
+                if hasattr(self.model.base_estimator, 'n_features_'):
+
+                    if len(self.bands2open) != self.model.base_estimator.n_features_:
+
+                        logger.error('  The number of predictive layers does not match the number of model estimators.')
+                        raise AssertionError
+
+    def _get_block_jobs(self, block_indices, n_blocks, image_top, image_left, iwo, jwo):
+
+        """
+        Gets the blocks to predict
+
+        Blocks outside of `block_range`, with an existing block file, or in the
+        block record are skipped.
+
+        Args:
+            block_indices (list): The block indices from `_set_n_blocks`.
+            n_blocks (int): The number of blocks.
+            image_top (float): The top coordinate of the image.
+            image_left (float): The left coordinate of the image.
+            iwo (int): The row offset of the output image.
+            jwo (int): The column offset of the output image.
+
+        Returns:
+            A list of block dictionaries
+        """
+
+        block_jobs = list()
+
         n_block = 1
 
         for block_index in block_indices:
@@ -5765,16 +5990,22 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
             j = block_index[1]
             n_rows = block_index[2]
             n_cols = block_index[3]
-            iw = block_index[4]
-            jw = block_index[5]
-            rw = block_index[6]
-            cw = block_index[7]
-            ipadded = block_index[9]
-            jpadded = block_index[10]
 
-            logger.info('  Block {:,d} of {:,d} ...'.format(n_block, n_blocks))
+            block_job = dict(n_block=n_block,
+                             n_blocks=n_blocks,
+                             i=i,
+                             j=j,
+                             n_rows=n_rows,
+                             n_cols=n_cols,
+                             iw=block_index[4],
+                             jw=block_index[5],
+                             rw=block_index[6],
+                             cw=block_index[7],
+                             ipadded=block_index[9],
+                             jpadded=block_index[10],
+                             iwo=iwo,
+                             jwo=jwo)
 
-            # Setup the object to write to.
             if self.write2blocks:
 
                 if isinstance(self.block_range, list) or isinstance(self.block_range, tuple):
@@ -5787,37 +6018,27 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
                     if n_block > self.block_range[1]:
                         break
 
-                self.output_image = os.path.join(self.dir_name,
-                                                 '{BASE}_{BLOCK:05d}{EXT}'.format(BASE=self.output_image_base,
-                                                                                  BLOCK=n_block,
-                                                                                  EXT=self.output_image_ext))
+                output_image = os.path.join(self.dir_name,
+                                            '{BASE}_{BLOCK:05d}{EXT}'.format(BASE=self.output_image_base,
+                                                                             BLOCK=n_block,
+                                                                             EXT=self.output_image_ext))
 
-                if os.path.isfile(self.output_image):
+                if os.path.isfile(output_image):
 
                     if self.overwrite:
-                        os.remove(self.output_image)
+                        os.remove(output_image)
                     else:
 
                         n_block += 1
                         continue
 
-                # Update the output image
-                #   information for the
-                #   current block.
-                self.o_info.update_info(top=image_top - (i*self.o_info.cellY),
-                                        left=image_left + (j*self.o_info.cellY),
-                                        rows=n_rows,
-                                        cols=n_cols)
-
-                iwo = i
-                jwo = j
-
-                out_raster_object = self._set_output_object()
-
-                if not self.predict_probs:
-
-                    out_raster_object.get_band(1)
-                    out_raster_object.fill(0)
+                # The output image information
+                #   for the current block.
+                block_job.update(output_image=output_image,
+                                 top=image_top - (i*self.o_info.cellY),
+                                 left=image_left + (j*self.o_info.cellY),
+                                 iwo=i,
+                                 jwo=j)
 
             n_block += 1
 
@@ -5825,388 +6046,478 @@ class classification(ModelOptions, PickleIt, Preprocessing, Samples, Visualizati
 
                 if n_block in self.record_list:
 
-                    logger.info('  Skipping current block ...')
+                    logger.info('  Skipping block {:,d} ...'.format(block_job['n_block']))
                     continue
 
-            # Check for zeros in the block.
-            if self.band_check != -1:
+            block_job['record_id'] = n_block
 
-                if self.open_image:
+            block_jobs.append(block_job)
 
-                    self.i_info = raster_tools.ropen(self.input_image)
-                    self.open_image = False
+        return block_jobs
 
-                max_check = self.i_info.read(bands2open=self.band_check,
-                                             i=i,
-                                             j=j,
-                                             rows=n_rows,
-                                             cols=n_cols).max()
+    def _read_block_features(self, block_job, band_info):
 
-                if max_check == 0:
+        """
+        Reads the features of a block
 
-                    # Close the block file.
-                    if self.write2blocks:
+        Args:
+            block_job (dict): The block from `_get_block_jobs`.
+            band_info (object): An open `ropen` instance of `input_image` for the 'no data' check.
 
-                        out_raster_object.close_all()
-                        out_raster_object = None
+        Returns:
+            The features, shaped ([rows x columns] x features), and the null sample locations,
+            or None, None if the block is empty.
+        """
 
-                    continue
+        iw = block_job['iw']
+        jw = block_job['jw']
+        rw = block_job['rw']
+        cw = block_job['cw']
+
+        # Check the valid-data footprint before any reads.
+        if self.occupancy_index is not None:
+
+            if self.occupancy_index.is_empty(block_job['i'], block_job['j'], block_job['n_rows'], block_job['n_cols']):
+                return None, None
+
+        # Check for zeros in the block.
+        if self.band_check != -1:
+
+            max_check = band_info.read(bands2open=self.band_check,
+                                       i=block_job['i'],
+                                       j=block_job['j'],
+                                       rows=block_job['n_rows'],
+                                       cols=block_job['n_cols']).max()
+
+            if max_check == 0:
+                return None, None
+
+        # Get all the bands for the tile. The shape
+        #   of the features is ([rows x columns] x features).
+        features_ = raster_tools.read(image2open=self.input_image,
+                                      bands2open=self.bands2open,
+                                      i=iw,
+                                      j=jw,
+                                      rows=rw,
+                                      cols=cw,
+                                      predictions=True,
+                                      d_type=self.feature_dtype,
+                                      n_jobs=self.n_jobs_vars)
 
-            if not self.open_image:
+        if self.use_xy:
 
-                # Close the image information object because it
-                #   needs to be reopened for parallel ``read``.
-                self.i_info.close()
-                self.open_image = True
+            # Create x,y coordinates for the block.
+            x_coordinates, y_coordinates = self._create_indices(iw, jw, rw, cw)
 
-            if 'CV' in self.classifier_info['classifier']:
+            # Append the x,y coordinates to the features.
+            features_ = np.hstack((features_,
+                                   x_coordinates.astype(features_.dtype),
+                                   y_coordinates.astype(features_.dtype)))
 
-                if len(self.bands2open) != self.model.getVarCount():
+        # Reshape the features for CRF models.
+        if self.classifier_info['classifier'] == 'chaincrf':
+            features_ = self._transform4crf(p_vars2reshape=features_)[0]
+        else:
 
-                    logger.error('  The number of predictive layers does not match the number of model estimators.')
-                    raise AssertionError
+            # Scale the features.
+            if self.scaled:
+                features_ = self.scaler.transform(features_)
 
-            elif (self.classifier_info['classifier'] not in ['c5', 'cubist', 'qda', 'chaincrf']) and \
-                    ('CV' not in self.classifier_info['classifier']):
+        if self.func_applier:
+            features_ = self.func_applier(features_, self)
 
-                if hasattr(self.model, 'n_features_'):
+        # TODO: add to `func_applier` and remove here
+        if self.additional_layers:
 
-                    if len(self.bands2open) != self.model.n_features_:
+            additional_layers = self._get_additional_layers(iw, jw, rw, cw)
 
-                        logger.error('  The number of predictive layers does not match the number of model estimators.')
-                        raise AssertionError
+            features_ = np.hstack((features_,
+                                   additional_layers))
 
-                if hasattr(self.model, 'base_estimator'):
+        # Add extra predictive
+        #   time series features.
+        if self._add_features:
 
-                    if hasattr(self.model.base_estimator, 'n_features_'):
+            if not self.ts_indices:
 
-                        if len(self.bands2open) != self.model.base_estimator.n_features_:
+                if self.use_xy:
+                    self.ts_indices = np.array(range(0, features_.shape[1]-2), dtype='int64')
 
-                            logger.error('  The number of predictive layers does not match the number of model estimators.')
-                            raise AssertionError
+            features_ = self.feature_object.apply_features(X=features_,
+                                                           ts_indices=self.ts_indices,
+                                                           append_features=self.append_features)
 
-            # Get all the bands for the tile. The shape
-            #   of the features is ([rows x columns] x features).
-            features = raster_tools.read(image2open=self.input_image,
-                                         bands2open=self.bands2open,
-                                         i=iw,
-                                         j=jw,
-                                         rows=rw,
-                                         cols=cw,
-                                         predictions=True,
-                                         d_type='float64',
-                                         n_jobs=self.n_jobs_vars)
+        _fill_nonfinite(features_)
 
-            n_samples = rw * cw
+        # Get locations of empty features
+        null_samples = np.where(features_.max(axis=1).reshape(rw, cw) == 0)
 
-            if self.use_xy:
+        return features_, null_samples
 
-                # Create x,y coordinates for the block.
-                x_coordinates, y_coordinates = self._create_indices(iw, jw, rw, cw)
+    def _predict_block(self, block_job, block_features, null_samples):
 
-                # Append the x,y coordinates to the features.
-                features = np.hstack((features,
-                                      x_coordinates,
-                                      y_coordinates))
+        """
+        Makes the predictions of a block
+
+        Args:
+            block_job (dict): The block from `_get_block_jobs`.
+            block_features (2d array): The features from `_read_block_features`.
+            null_samples (tuple): The null sample locations from `_read_block_features`.
+
+        Returns:
+            A list of (array, band) items to write, where a band of None writes to the current band.
+        """
+
+        # Global variables for parallel processing.
+        global features, predict_samps, indice_pairs
+
+        features = block_features
+
+        n_rows = block_job['n_rows']
+        n_cols = block_job['n_cols']
+        rw = block_job['rw']
+        cw = block_job['cw']
+        ipadded = block_job['ipadded']
+        jpadded = block_job['jpadded']
+
+        n_samples = rw * cw
+
+        block_writes = list()
+
+        if 'CV' in self.classifier_info['classifier']:
+
+            if self.classifier_info['classifier'] == 'cvmlp':
+
+                self.model.predict(features, predicted)
+
+                predicted = np.argmax(predicted, axis=1)
 
-            # Reshape the features for CRF models.
-            if self.classifier_info['classifier'] == 'chaincrf':
-                features = self._transform4crf(p_vars2reshape=features)[0]
             else:
 
-                # Scale the features.
-                if self.scaled:
-                    features = self.scaler.transform(features)
+                predicted = joblib.Parallel(n_jobs=self.n_jobs,
+                                            max_nbytes=None)(joblib.delayed(predict_cv)(chunk,
+                                                                                        self.chunk_size,
+                                                                                        self.file_name,
+                                                                                        self.perc_samp,
+                                                                                        self.classes2remove,
+                                                                                        self.ignore_feas,
+                                                                                        self.use_xy,
+                                                                                        self.classifier_info,
+                                                                                        self.weight_classes)
+                                                             for chunk in range(0, n_samples, self.chunk_size))
+
+            # transpose and reshape the predicted labels to (rows x columns)
+            block_writes.append((np.array(list(itertools.chain.from_iterable(predicted))).reshape(n_rows,
+                                                                                                  n_cols), None))
 
-            if self.func_applier:
-                features = self.func_applier(features, self)
+        elif self.classifier_info['classifier'] in ['c5', 'cubist']:
 
-            # TODO: add to `func_applier` and remove here
-            if self.additional_layers:
+            # Load the predictor variables.
+            predict_samps = ro.r.matrix(features, nrow=n_samples, ncol=len(self.bands2open))
+            predict_samps.colnames = StrVector(self.headers[:-1])
 
-                additional_layers = self._get_additional_layers(iw, jw, rw, cw)
+            # Get chunks for parallel processing.
+            indice_pairs = list()
+            for i_ in range(1, n_samples+1, self.chunk_size):
 
-                features = np.hstack((features,
-                                      additional_layers))
+                n_rows_ = self._num_rows_cols(i_, self.chunk_size, n_samples)
+                indice_pairs.append([i_, n_rows_])
 
-            # Add extra predictive
-            #   time series features.
-            if self._add_features:
+            indice_pairs[-1][1] += 1
 
-                if not self.ts_indices:
+            # Make the predictions and convert to a NumPy array.
+            if isinstance(self.input_model, str):
 
-                    if self.use_xy:
-                        self.ts_indices = np.array(range(0, features.shape[1]-2), dtype='int64')
+                predicted = joblib.Parallel(n_jobs=self.n_jobs,
+                                            max_nbytes=None)(joblib.delayed(predict_c5_cubist)(self.input_model,
+                                                                                               ip)
+                                                             for ip in indice_pairs)
 
-                features = self.feature_object.apply_features(X=features,
-                                                              ts_indices=self.ts_indices,
-                                                              append_features=self.append_features)
+                block_writes.append((np.array(list(itertools.chain.from_iterable(predicted))).reshape(n_rows,
+                                                                                                      n_cols), None))
 
-            features[np.isnan(features) | np.isinf(features)] = 0.0
+            else:
 
-            # Get locations of empty features
-            null_samples = np.where(features.max(axis=1).reshape(rw, cw) == 0)
+                block_writes.append((_do_c5_cubist_predict(self.model,
+                                                           self.classifier_info['classifier'],
+                                                           predict_samps).reshape(n_rows,
+                                                                                  n_cols), None))
 
-            if 'CV' in self.classifier_info['classifier']:
+        else:
 
-                if self.classifier_info['classifier'] == 'cvmlp':
+            # SCIKIT-LEARN MODELS
 
-                    self.model.predict(features, predicted)
+            if self.predict_probs or self.relax_probabilities:
 
-                    predicted = np.argmax(predicted, axis=1)
+                # --------------------------------------
+                # Posterior probability label relaxation
+                # --------------------------------------
+
+                predicted = predict_scikit_probas(rw,
+                                                  cw,
+                                                  ipadded,
+                                                  jpadded,
+                                                  n_rows,
+                                                  n_cols,
+                                                  self.morphology,
+                                                  self.do_not_morph,
+                                                  self.relax_probabilities,
+                                                  self.plr_matrix,
+                                                  self.plr_window_size,
+                                                  self.plr_iterations,
+                                                  self.predict_probs,
+                                                  self.d_type,
+                                                  null_samples)
+
+                if self.predict_probs:
+
+                    # Class conditional probabilities
+                    for cidx in range(0, predicted.shape[0]):
+                        block_writes.append((predicted[cidx], cidx+1))
 
                 else:
+                    block_writes.append((predicted, None))
 
-                    # Setup the global array to write to. This avoids
-                    #   passing it to the joblib workers.
-                    # predicted = np.empty((n_samples, 1), dtype='uint8')
-
-                    predicted = joblib.Parallel(n_jobs=self.n_jobs,
-                                                max_nbytes=None)(joblib.delayed(predict_cv)(chunk,
-                                                                                            self.chunk_size,
-                                                                                            self.file_name,
-                                                                                            self.perc_samp,
-                                                                                            self.classes2remove,
-                                                                                            self.ignore_feas,
-                                                                                            self.use_xy,
-                                                                                            self.classifier_info,
-                                                                                            self.weight_classes)
-                                                                 for chunk in range(0, n_samples, self.chunk_size))
-
-                # transpose and reshape the predicted labels to (rows x columns)
-                out_raster_object.write_array(np.array(list(itertools.chain.from_iterable(predicted))).reshape(n_rows,
-                                                                                                               n_cols),
-                                              j=j-jwo,
-                                              i=i-iwo)
-
-            elif self.classifier_info['classifier'] in ['c5', 'cubist']:
-
-                # Load the predictor variables.
-                # predict_samps = pandas2ri.py2ri(pd.DataFrame(features))
-
-                predict_samps = ro.r.matrix(features, nrow=n_samples, ncol=len(self.bands2open))
-                predict_samps.colnames = StrVector(self.headers[:-1])
+            elif self.morphology:
 
-                # Get chunks for parallel processing.
-                indice_pairs = list()
-                for i_ in range(1, n_samples+1, self.chunk_size):
+                if isinstance(self.do_not_morph, list):
 
-                    n_rows_ = self._num_rows_cols(i_, self.chunk_size, n_samples)
-                    indice_pairs.append([i_, n_rows_])
+                    predictions = np.uint8(mdl.predict(features).reshape(rw, cw))
 
-                indice_pairs[-1][1] += 1
+                    predictions_copy = predictions[ipadded:ipadded+n_rows,
+                                                   jpadded:jpadded+n_cols].copy()
 
-                # Make the predictions and convert to a NumPy array.
-                if isinstance(self.input_model, str):
+                    predictions = pymorph.closerec(pymorph.closerec(predictions,
+                                                                    Bdil=pymorph.secross(r=3),
+                                                                    Bc=pymorph.secross(r=1)),
+                                                   Bdil=pymorph.secross(r=2),
+                                                   Bc=pymorph.secross(r=1))[ipadded:ipadded+n_rows,
+                                                                            jpadded:jpadded+n_cols]
 
-                    predicted = joblib.Parallel(n_jobs=self.n_jobs,
-                                                max_nbytes=None)(joblib.delayed(predict_c5_cubist)(self.input_model,
-                                                                                                   ip)
-                                                                 for ip in indice_pairs)
+                    for do_not_morph_value in self.do_not_morph:
+                        predictions[predictions_copy == do_not_morph_value] = do_not_morph_value
 
-                    # Write the predictions to file.
-                    out_raster_object.write_array(np.array(list(itertools.chain.from_iterable(predicted))).reshape(n_rows,
-                                                                                                                   n_cols),
-                                                  j=j-jwo,
-                                                  i=i-iwo)
+                    del predictions_copy
+
+                    block_writes.append((predictions, None))
 
                 else:
 
-                    out_raster_object.write_array(_do_c5_cubist_predict(self.model,
-                                                                        self.classifier_info['classifier'],
-                                                                        predict_samps).reshape(n_rows,
-                                                                                               n_cols),
-                                                  j=j-jwo,
-                                                  i=i-iwo)
+                    block_writes.append((pymorph.closerec(pymorph.closerec(np.uint8(mdl.predict(features).reshape(rw, cw)),
+                                                                           Bdil=pymorph.secross(r=3),
+                                                                           Bc=pymorph.secross(r=1)),
+                                                          Bdil=pymorph.secross(r=2),
+                                                          Bc=pymorph.secross(r=1))[ipadded:ipadded+n_rows,
+                                                                                   jpadded:jpadded+n_cols], None))
 
             else:
 
-                # SCIKIT-LEARN MODELS
+                np_dtype = raster_tools.STORAGE_DICT_NUMPY[self.d_type]
+
+                block_writes.append((np_dtype(mdl.predict(features).reshape(n_rows, n_cols)), None))
+
+        features = None
 
-                if self.predict_probs or self.relax_probabilities:
+        return block_writes
 
-                    # --------------------------------------
-                    # Posterior probability label relaxation
-                    # --------------------------------------
+    def _write_block(self, block_job, block_writes, out_raster_object):
 
-                    if self.predict_probs:
+        """
+        Writes the predictions of a block
 
-                        # Predict class conditional probabilities.
-                        predicted = predict_scikit_probas(rw,
-                                                          cw,
-                                                          ipadded,
-                                                          jpadded,
-                                                          n_rows,
-                                                          n_cols,
-                                                          self.morphology,
-                                                          self.do_not_morph,
-                                                          self.relax_probabilities,
-                                                          self.plr_matrix,
-                                                          self.plr_window_size,
-                                                          self.plr_iterations,
-                                                          self.predict_probs,
-                                                          self.d_type,
-                                                          null_samples)
+        Args:
+            block_job (dict): The block from `_get_block_jobs`.
+            block_writes (list): The (array, band) items from `_predict_block`, or None for an empty block.
+            out_raster_object (object): The output raster, or None if `write2blocks=True`.
+        """
 
-                        for cidx in range(0, predicted.shape[0]):
+        # Setup the object to write to.
+        if self.write2blocks:
 
-                            out_raster_object.write_array(predicted[cidx],
-                                                          i=i-iwo,
-                                                          j=j-jwo,
-                                                          band=cidx+1)
+            self.output_image = block_job['output_image']
 
-                    else:
+            # Update the output image
+            #   information for the
+            #   current block.
+            self.o_info.update_info(top=block_job['top'],
+                                    left=block_job['left'],
+                                    rows=block_job['n_rows'],
+                                    cols=block_job['n_cols'])
 
-                        # Write the predictions to file.
-                        out_raster_object.write_array(predict_scikit_probas(rw,
-                                                                            cw,
-                                                                            ipadded,
-                                                                            jpadded,
-                                                                            n_rows,
-                                                                            n_cols,
-                                                                            self.morphology,
-                                                                            self.do_not_morph,
-                                                                            self.relax_probabilities,
-                                                                            self.plr_matrix,
-                                                                            self.plr_window_size,
-                                                                            self.plr_iterations,
-                                                                            self.predict_probs,
-                                                                            self.d_type,
-                                                                            null_samples),
-                                                      j=j-jwo,
-                                                      i=i-iwo)
+            out_raster_object = self._set_output_object()
+
+            if not self.predict_probs:
+
+                out_raster_object.get_band(1)
+                out_raster_object.fill(0)
+
+        if block_writes:
+
+            for block_array, band in block_writes:
+
+                if band is None:
+
+                    out_raster_object.write_array(block_array,
+                                                  i=block_job['i']-block_job['iwo'],
+                                                  j=block_job['j']-block_job['jwo'])
 
                 else:
 
-                    # Get chunks for parallel processing.
-                    # indice_pairs = list()
-                    #
-                    # for i_ in range(0, n_samples, self.chunk_size):
-                    #
-                    #     n_rows_ = self._num_rows_cols(i_, self.chunk_size, n_samples)
-                    #     indice_pairs.append([i_, n_rows_])
-                    #
-                    # if (self.n_jobs != 0) and (self.n_jobs != 1):
-                    #
-                    #     # Make the predictions and convert to a NumPy array.
-                    #     if isinstance(self.input_model, str):
-                    #
-                    #         if platform.system() == 'Windows':
-                    #
-                    #             predicted = joblib.Parallel(n_jobs=self.n_jobs,
-                    #                                         max_nbytes=None)(joblib.delayed(predict_scikit_win)(features[ip[0]:ip[0]+ip[1]],
-                    #                                                                                             self.input_model)
-                    #                                                          for ip in indice_pairs)
-                    #
-                    #         else:
-                    #
-                    #             mdl = self.load(self.input_model)[1]
-                    #
-                    #             pool = multi.Pool(processes=self.n_jobs)
-                    #
-                    #             predicted = pool.map(predict_scikit, range(0, len(indice_pairs)))
-                    #
-                    #             pool.close()
-                    #             del pool
-                    #
-                    #     else:
-                    #
-                    #         mdl = self.model
-                    #         predicted = [predict_scikit(ip) for ip in range(0, len(indice_pairs))]
-                    #
-                    # else:
+                    out_raster_object.write_array(block_array,
+                                                  i=block_job['i']-block_job['iwo'],
+                                                  j=block_job['j']-block_job['jwo'],
+                                                  band=band)
 
-                    # Make the predictions and convert to a NumPy array.
-                    # predicted = [predict_scikit(ip) for ip in range(0, len(indice_pairs))]
+        # Close the block file.
+        if self.write2blocks:
 
-                    # Write the predictions to file.
-                    # out_raster_object.write_array(np.array(list(itertools.chain.from_iterable(predicted))).reshape(n_rows,
-                    #                                                                                                n_cols),
-                    #                               j=j-jwo,
-                    #                               i=i-iwo)
+            out_raster_object.close_all()
+            out_raster_object = None
 
-                    # Write the predictions to file.
-                    if self.morphology:
+        elif self.track_blocks and (block_writes is not None):
 
-                        if isinstance(self.do_not_morph, list):
+            self.record_list.append(block_job['record_id'])
 
-                            predictions = np.uint8(mdl.predict(features).reshape(rw, cw))
+            if os.path.isfile(self.record_keeping):
+                os.remove(self.record_keeping)
 
-                            predictions_copy = predictions[ipadded:ipadded+n_rows,
-                                                           jpadded:jpadded+n_cols].copy()
+            self.dump(self.record_list,
+                      self.record_keeping)
 
-                            predictions = pymorph.closerec(pymorph.closerec(predictions,
-                                                                            Bdil=pymorph.secross(r=3),
-                                                                            Bc=pymorph.secross(r=1)),
-                                                           Bdil=pymorph.secross(r=2),
-                                                           Bc=pymorph.secross(r=1))[ipadded:ipadded+n_rows,
-                                                                                    jpadded:jpadded+n_cols]
+    def _predict_blocks(self, block_jobs, out_raster_object):
 
-                            for do_not_morph_value in self.do_not_morph:
-                                predictions[predictions_copy == do_not_morph_value] = do_not_morph_value
+        """
+        Predicts blocks in a pipeline
 
-                            del predictions_copy
+        A reader thread prefetches the features of the next blocks while the current
+        block is predicted, and a writer thread writes the finished blocks. Both queues
+        hold at most `queue_size` blocks, so memory does not grow with the image size.
 
-                            out_raster_object.write_array(predictions,
-                                                          j=j-jwo,
-                                                          i=i-iwo)
+        Args:
+            block_jobs (list): The blocks from `_get_block_jobs`.
+            out_raster_object (object): The output raster, or None if `write2blocks=True`.
+        """
 
-                            del predictions
+        read_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
 
-                        else:
+        stop_event = threading.Event()
+        errors = list()
 
-                            out_raster_object.write_array(
-                                pymorph.closerec(pymorph.closerec(np.uint8(mdl.predict(features).reshape(rw, cw)),
-                                                                  Bdil=pymorph.secross(r=3),
-                                                                  Bc=pymorph.secross(r=1)),
-                                                 Bdil=pymorph.secross(r=2),
-                                                 Bc=pymorph.secross(r=1))[ipadded:ipadded+n_rows,
-                                                                          jpadded:jpadded+n_cols],
-                                j=j-jwo,
-                                i=i-iwo)
+        def _reader():
 
-                    else:
+            band_info = None
 
-                        np_dtype = raster_tools.STORAGE_DICT_NUMPY[self.d_type]
+            try:
 
-                        out_raster_object.write_array(np_dtype(mdl.predict(features).reshape(n_rows,
-                                                                                             n_cols)),
-                                                      j=j-jwo,
-                                                      i=i-iwo)
+                if self.band_check != -1:
+                    band_info = raster_tools.ropen(self.input_image)
 
-            features = None
+                for block_job in block_jobs:
 
-            # Close the block file.
-            if self.write2blocks:
+                    if stop_event.is_set():
+                        break
 
-                out_raster_object.close_all()
-                out_raster_object = None
+                    logger.info('  Block {:,d} of {:,d} ...'.format(block_job['n_block'], block_job['n_blocks']))
 
-            if self.track_blocks and not self.write2blocks:
+                    block_features, null_samples = self._read_block_features(block_job, band_info)
 
-                self.record_list.append(n_block)
+                    read_queue.put((block_job, block_features, null_samples))
 
-                if os.path.isfile(self.record_keeping):
-                    os.remove(self.record_keeping)
+            except Exception as e:
 
-                self.dump(self.record_list,
-                          self.record_keeping)
+                logger.exception('  The block reader failed.')
+                errors.append(e)
+                stop_event.set()
 
-        # Close the file.
-        if not self.write2blocks:
+            finally:
 
-            if self.predict_probs:
+                if band_info is not None:
+                    band_info.close()
 
-                for cidx in range(0, len(mdl.classes_)):
+                read_queue.put(None)
 
-                    out_raster_object.get_band(cidx+1)
-                    out_raster_object.close_band()
+        def _writer():
 
-            out_raster_object.close_all()
-            out_raster_object = None
+            while True:
 
-        if isinstance(self.mask_background, str) or isinstance(self.mask_background, np.ndarray):
-            self._mask_background()
+                write_item = write_queue.get()
+
+                if write_item is None:
+                    break
+
+                # Drain the queue after an error.
+                if stop_event.is_set():
+                    continue
+
+                try:
+                    self._write_block(write_item[0], write_item[1], out_raster_object)
+                except Exception as e:
+
+                    logger.exception('  The block writer failed.')
+                    errors.append(e)
+                    stop_event.set()
+
+        reader_thread = threading.Thread(target=_reader)
+        writer_thread = threading.Thread(target=_writer)
+
+        reader_thread.daemon = True
+        writer_thread.daemon = True
+
+        reader_thread.start()
+        writer_thread.start()
+
+        read_item = False
+
+        try:
+
+            while True:
+
+                read_item = read_queue.get()
+
+                if read_item is None:
+                    break
+
+                # Drain the queue after an error.
+                if stop_event.is_set():
+                    continue
+
+                block_job, block_features, null_samples = read_item
+
+                if block_features is None:
+                    block_writes = None
+                else:
+
+                    try:
+                        block_writes = self._predict_block(block_job, block_features, null_samples)
+                    except Exception as e:
+
+                        logger.exception('  The block prediction failed.')
+                        errors.append(e)
+                        stop_event.set()
+
+                        continue
+
+                write_queue.put((block_job, block_writes))
+
+        finally:
+
+            # The loop exited early (e.g., on KeyboardInterrupt), so stop
+            #   the threads and unblock the reader until its sentinel.
+            if read_item is not None:
+
+                stop_event.set()
+
+                while read_queue.get() is not None:
+                    pass
+
+            write_queue.put(None)
+
+            reader_thread.join()
+            writer_thread.join()
+
+        if errors:
+            raise errors[0]
 
     def _set_indexing(self, start_i, start_j, rows, cols, iwo, jwo):
 
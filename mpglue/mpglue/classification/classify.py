@@ -107,6 +107,11 @@ def main():
     parser.add_argument('--v-jobs', dest='n_jobs_vars', help='The number of parallel jobs for loading image variables',
                         default=-1, type=int)
     parser.add_argument('--band-check', dest='band_check', help='The band to check for no data', default=-1, type=int)
+    parser.add_argument('--aoi', dest='aoi_file', help='A vector file of the valid-data boundary. Blocks outside are not read',
+                        default=None)
+    parser.add_argument('--skip-empty', dest='skip_empty',
+                        help='Whether to skip blocks that are no data in an overview of --band-check (or band 1)',
+                        action='store_true')
     parser.add_argument('--mask-background', dest='mask_background',
                         help='An image to use as a background mask, applied post-classification', default=None)
     parser.add_argument('--background-band', dest='background_band',
@@ -125,6 +130,9 @@ def main():
                         help='Whether to relax posterior probabilities', action='store_true')
     parser.add_argument('--write2blocks', dest='write2blocks',
                         help='Whether to write to individual blocks instead of one image', action='store_true')
+    parser.add_argument('--inference-engine', dest='inference_engine',
+                        help='The Random Forest inference engine (flat=compiled node arrays)', default='sklearn',
+                        choices=['sklearn', 'flat'])
     parser.add_argument('--version', dest='version',
                         help='Whether to print the version', action='store_true')
 
@@ -179,6 +187,8 @@ def main():
         clo.predict(args.input_image,
                     args.output_image,
                     band_check=args.band_check,
+                    aoi_file=args.aoi_file,
+                    skip_empty=args.skip_empty,
                     ignore_feas=args.ignore_feas,
                     in_model=args.input_model,
                     mask_background=args.mask_background,
@@ -190,6 +200,7 @@ def main():
                     col_block_size=args.col_block_size,
                     relax_probabilities=args.relax_probabilities,
                     write2blocks=args.write2blocks,
+                    inference_engine=args.inference_engine,
                     n_jobs=args.n_jobs,
                     n_jobs_vars=args.n_jobs_vars)
 
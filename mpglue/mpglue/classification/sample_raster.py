@@ -15,14 +15,14 @@ import subprocess
 from copy import copy
 import argparse
 import fnmatch
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, cpu_count
 
 from .. import raster_tools
 from .. import vector_tools
-from ..helpers import _iteration_parameters_values
 from ..errors import ArrayOffsetError, logger
 from .poly_to_points import poly_to_points
 from .error_matrix import error_matrix
+from .sample_store import STORE_EXT, write_samples
 
 # NumPy
 try:
@@ -44,50 +44,99 @@ except ImportError:
     raise ImportError('GDAL is not installed')
 
 
-def _sample_parallel(band_position,
-                     image_name,
-                     c_list,
-                     accuracy,
-                     feature_length):
+def _get_block_ids(x_offsets, y_offsets, block_size, cols):
+
+    """
+    Gets the raster block id of each pixel offset
+
+    Args:
+        x_offsets (1d array): The column offsets.
+        y_offsets (1d array): The row offsets.
+        block_size (tuple): The raster block size, as (block columns, block rows).
+        cols (int): The number of raster columns.
+
+    Returns:
+        The block ids, as a 1d array.
+    """
+
+    block_cols, block_rows = block_size
+
+    n_block_cols = int(np.ceil(cols / float(block_cols)))
+
+    return (y_offsets // block_rows) * n_block_cols + (x_offsets // block_cols)
+
+
+def _sample_windows(image_name,
+                    x_offsets,
+                    y_offsets,
+                    block_size):
+
+    """
+    Samples all image bands at pixel offsets, reading one multi-band window per raster block
+
+    Args:
+        image_name (str): The image to sample.
+        x_offsets (1d array): The column offsets.
+        y_offsets (1d array): The row offsets.
+        block_size (tuple): The raster block size, as (block columns, block rows).
+
+    Returns:
+        The sampled values, as a 2d array of [samples x bands]. Offsets outside of the image are -999.
+    """
 
     datasource = gdal.Open(image_name,
                            GA_ReadOnly)
 
-    band_object = datasource.GetRasterBand(band_position)
+    n_bands = datasource.RasterCount
+    rows = datasource.RasterYSize
+    cols = datasource.RasterXSize
 
-    logger.info('Band {:d} of {:d} ...'.format(band_position, datasource.RasterCount))
+    value_array = np.zeros((len(x_offsets), n_bands), dtype='float32') - 999.0
 
-    # 1d array to store image values.
-    value_list = np.zeros(feature_length, dtype='float32')
+    in_bounds = np.where((x_offsets >= 0) & (x_offsets < cols) & (y_offsets >= 0) & (y_offsets < rows))[0]
 
-    # Sort by feature index position.
-    for vi, values in enumerate(sorted(c_list)):
+    if len(in_bounds) == 0:
 
-        # values[1] = [x, y, x offset, y offset, label]
-        # values[1][2] = x offset position
-        # values[1][3] = y offset position
-        # pixel_value = image_info.read(i=values[1][3],
-        #                                  j=values[1][2],
-        #                                  rows=1,
-        #                                  cols=1,
-        #                                  d_type='float32')[0, 0]
-        try:
-            pixel_value = band_object.ReadAsArray(values[1][2], values[1][3], 1, 1)[0, 0]
-        except:
-            pixel_value = -999.0
+        datasource = None
+        return value_array
 
-        if not accuracy:
-            pixel_value = round(float(pixel_value), 4)
-        else:
-            pixel_value = int(pixel_value)
+    block_ids = _get_block_ids(x_offsets[in_bounds], y_offsets[in_bounds], block_size, cols)
+
+    # Sort the points by block.
+    block_order = np.argsort(block_ids, kind='mergesort')
+
+    point_index = in_bounds[block_order]
+    block_ids = block_ids[block_order]
+
+    __, block_starts = np.unique(block_ids, return_index=True)
+    block_ends = np.append(block_starts[1:], len(block_ids))
+
+    for block_start, block_end in zip(block_starts, block_ends):
+
+        block_points = point_index[block_start:block_end]
 
-        # Update the list with raster values.
-        value_list[vi] = pixel_value
+        block_x = x_offsets[block_points]
+        block_y = y_offsets[block_points]
+
+        # Read the window that covers the block points.
+        x_off = int(block_x.min())
+        y_off = int(block_y.min())
+
+        x_size = int(block_x.max()) - x_off + 1
+        y_size = int(block_y.max()) - y_off + 1
+
+        window = datasource.ReadRaster(x_off, y_off, x_size, y_size, buf_type=gdal.GDT_Float32)
+
+        if window is None:
+            continue
+
+        window = np.frombuffer(window, dtype='float32').reshape(n_bands, y_size, x_size)
+
+        value_array[block_points] = window[:, block_y - y_off, block_x - x_off].T
 
-    band_object = None
     datasource = None
 
-    return value_list
+    return value_array
 
 
 class SampleImage(object):
@@ -108,6 +157,8 @@ class SampleImage(object):
             Default is None.
         use_extent (Optional[bool])
         append_name (Optional[str]): A base name to append to the samples file name.
+        out_format (Optional[str]): The samples file format. Choices are ['txt', 'smp']. 'smp' writes
+            a binary sample store (see `sample_store`). Default is 'txt'.
         check_corrupted_bands (Optional[bool]): Whether to perform a corrupted band check. Default is True.
         verbose (Optional[int]): The level of verbosity for print statements. Default is 1.
     """
@@ -124,6 +175,7 @@ class SampleImage(object):
                  transform_xy_proj=None,
                  use_extent=True,
                  append_name=None,
+                 out_format='txt',
                  sql_expression_attr=None,
                  sql_expression_field='Id',
                  check_corrupted_bands=True,
@@ -140,6 +192,7 @@ class SampleImage(object):
         self.transform_xy_proj = transform_xy_proj
         self.use_extent = use_extent
         self.append_name = append_name
+        self.out_format = out_format
         self.sql_expression_attr = sql_expression_attr
         self.sql_expression_field = sql_expression_field
         self.check_corrupted_bands = check_corrupted_bands
@@ -151,17 +204,21 @@ class SampleImage(object):
 
         self.d_type = 'uint8' if self.field_type == 'int' else 'float32'
 
+        if self.out_format not in ['txt', 'smp']:
+
+            logger.error('  The output format should be txt or smp.')
+            raise NameError
+
+        # The accuracy report reads the samples as text.
+        if self.accuracy:
+            self.out_format = 'txt'
+
         if not os.path.isfile(self.points_file):
             raise IOError('\n{} does not exist. It should be a point shapefile.'.format(self.points_file))
 
         if not os.path.isfile(self.image_file):
             raise IOError('\n{} does not exist. It should be a raster image.'.format(self.image_file))
 
-        if self.neighbors and (self.n_jobs != 0):
-
-            logger.info('Cannot sample neighbors in parallel, so setting ``n_jobs`` to 0.')
-            self.n_jobs = 0
-
         self.d_name_points, f_name_points = os.path.split(self.points_file)
         self.f_base_points = os.path.splitext(f_name_points)[0]
 
@@ -273,6 +330,9 @@ class SampleImage(object):
         for nc in self.class_list:
             self.count_dict[nc] = 0
 
+        if self.out_format == 'smp':
+            self.data_file = '{}{}'.format(os.path.splitext(self.data_file)[0], STORE_EXT)
+
     def convert2points(self):
 
         """
@@ -387,8 +447,19 @@ class SampleImage(object):
         Writes samples to file
         """
 
-        df = pd.DataFrame(value_array, columns=headers)
-        df.to_csv(self.data_file, sep=',', index=False)
+        if self.out_format == 'smp':
+
+            write_samples(self.data_file,
+                          value_array[:, 0],
+                          value_array[:, 1],
+                          value_array[:, 2],
+                          value_array[:, 3:],
+                          headers)
+
+        else:
+
+            df = pd.DataFrame(value_array, columns=headers)
+            df.to_csv(self.data_file, sep=',', index=False)
 
     def fill_dictionary(self):
 
@@ -459,194 +530,138 @@ class SampleImage(object):
         The main image sampler
         """
 
-        # Convert position items to a list.
-        c_list = list(iteritems(self.coords_offsets))
+        # Sort by feature index position.
+        #   values = [x, y, x_off, y_off, pt_id]
+        c_list = [values for __, values in sorted(iteritems(self.coords_offsets))]
 
         # Get the number of sample points.
-        feature_length = len(self.coords_offsets)
-
-        if self.n_jobs != 0:
-
-            # Sample the image
-            value_arr = Parallel(n_jobs=self.n_jobs)(delayed(_sample_parallel)(f_bd,
-                                                                               self.image_file,
-                                                                               c_list,
-                                                                               self.accuracy,
-                                                                               feature_length)
-                                                     for f_bd in range(1, self.m_info.bands+1))
-
-            # Transpose the data to [samples x image layers].
-            value_arr = np.array(value_arr, dtype='float32').T
-
-            # Check for coordinates with no data.
-            idx = np.where(value_arr.mean(axis=1) != -999)[0]
-
-            # The order is the same as the point labels
-            #   because we iterate over the sorted (by
-            #   feature position) dictionary items
-            #   in both cases.
-
-            # nx2 coordinate array
-            xy_coordinates = np.zeros((feature_length, 3), dtype='float32')
-
-            # 1d of n length labels array
-            labels = np.zeros(feature_length, dtype='float32')
-
-            # Sort by feature index position and
-            #   get the x, y coordinates.
-            for vi, values in enumerate(sorted(c_list)):
+        feature_length = len(c_list)
 
-                # values[0] = feature index position
-                # values[1] = list of coordinate data
+        # nx3 array of index + x & y coordinates
+        xy_coordinates = np.zeros((feature_length, 3), dtype='float32')
 
-                x = values[1][0]
-                y = values[1][1]
+        # 1d of n length labels array
+        labels = np.zeros(feature_length, dtype='float32')
 
-                # Transform the x,y coordinates.
-                if isinstance(self.transform_xy_proj, int) or isinstance(self.transform_xy_proj, str):
+        x_offsets = np.zeros(feature_length, dtype='int64')
+        y_offsets = np.zeros(feature_length, dtype='int64')
 
-                    grid_envelope = dict(left=x,
-                                         right=x,
-                                         top=y,
-                                         bottom=y)
+        for vi, values in enumerate(c_list):
 
-                    ptr = vector_tools.TransformExtent(grid_envelope,
-                                                       self.m_info.projection,
-                                                       to_epsg=self.transform_xy_proj)
+            x = values[0]
+            y = values[1]
 
-                    x = ptr.left
-                    y = ptr.top
+            # Transform the x,y coordinates.
+            if isinstance(self.transform_xy_proj, int) or isinstance(self.transform_xy_proj, str):
 
-                # Fill index + x & y coordinates
-                xy_coordinates[vi] = [vi, x, y]
+                grid_envelope = dict(left=x,
+                                     right=x,
+                                     top=y,
+                                     bottom=y)
 
-                # Fill labels
-                labels[vi] = values[1][4]
+                ptr = vector_tools.TransformExtent(grid_envelope,
+                                                   self.m_info.projection,
+                                                   to_epsg=self.transform_xy_proj)
 
-            if np.any(idx):
+                x = ptr.left
+                y = ptr.top
 
-                # Remove coordinates with no data.
-                value_arr = value_arr[idx]
-                xy_coordinates = xy_coordinates[idx]
-                labels = labels[idx]
+            xy_coordinates[vi] = [vi, x, y]
 
-            try:
+            labels[vi] = values[4]
 
-                # Combine all the x,y coordinates,
-                #   data, and sample value.
-                value_arr = np.c_[xy_coordinates,
-                                  value_arr,
-                                  labels]
+            x_offsets[vi] = values[2]
+            y_offsets[vi] = values[3]
 
-            except ArrayOffsetError:
-                raise ArrayOffsetError('Check the projections and extents of the datasets.')
+        if np.any(x_offsets-1 > self.m_info.cols) or np.any(y_offsets-1 > self.m_info.rows):
+            raise ArrayOffsetError('Check the projections and extents of the datasets.')
 
-        else:
+        if self.neighbors:
 
-            # Create the array to write values to and
-            #   add three to columns -- one for the class
-            #   label, two for the x, y coordinates.
+            """
+            | |1| |
+            |4|x|2|
+            | |3| |
+                                1         2       3       4
             neighbor_offsets = [[0, -1], [1, 0], [0, 1], [-1, 0]]
+            """
 
-            value_arr = np.zeros((feature_length*self.updater, self.m_info.bands+4), dtype='float32')
-
-            logger.info('\nSampling {:,d} samples from {:d} image layers ...\n'.format(feature_length, self.m_info.bands))
-
-            ctr, pbar = _iteration_parameters_values(self.m_info.bands, feature_length)
-
-            to_delete = []
-
-            # Iterate over each band.
-            for f_bd in range(1, self.m_info.bands+1):
-
-                band = self.m_info.datasource.GetRasterBand(f_bd)
-
-                point_iter = 0      # necessary because of neighbors
-
-                # Iterate over each point.
-                #   values = [x, y, x_off, y_off, pt_id]
+            neighbor_offsets = np.array([[0, 0], [0, -1], [1, 0], [0, 1], [-1, 0]], dtype='int64')
 
-                # Sort by feature index position.
-                for vi, values in enumerate(sorted(c_list)):
+            # Each point is followed by its four neighbors.
+            x_offsets = (x_offsets[:, np.newaxis] + neighbor_offsets[:, 0]).ravel()
+            y_offsets = (y_offsets[:, np.newaxis] + neighbor_offsets[:, 1]).ravel()
 
-                    # Get the image offset indices.
-                    x_off = values[1][2]
-                    y_off = values[1][3]
+            xy_coordinates = np.repeat(xy_coordinates, self.updater, axis=0)
 
-                    if (x_off-1 > self.m_info.cols) or (y_off-1 > self.m_info.rows):
-                        raise ArrayOffsetError('Check the projections and extents of the datasets.')
+            xy_coordinates[:, 1] += np.tile(neighbor_offsets[:, 0], feature_length) * self.m_info.cellY
+            xy_coordinates[:, 2] += np.tile(neighbor_offsets[:, 1], feature_length) * -self.m_info.cellY
 
-                    # Get the image value.
-                    value = band.ReadAsArray(x_off, y_off, 1, 1)
+            labels = np.repeat(labels, self.updater)
 
-                    if isinstance(value, np.ndarray):
-                        value = np.float32(value[0, 0])
-                    else:
-                        continue
+        logger.info('\nSampling {:,d} samples from {:d} image layers ...\n'.format(feature_length, self.m_info.bands))
 
-                    if not self.accuracy:
-                        value = float(('{:.4f}'.format(value)))
-                    else:
-                        value = int(value)
+        block_size = tuple(self.m_info.datasource.GetRasterBand(1).GetBlockSize())
 
-                    # Update value the list.
-                    value_arr[point_iter, 0] = vi               # Index id
-                    value_arr[point_iter, 1:3] = values[1][:2]  # x,y coordinates
-                    value_arr[point_iter, f_bd+2] = value       # raster values
-                    value_arr[point_iter, -1] = values[1][4]    # class label
+        if self.n_jobs != 0:
 
-                    if self.neighbors:
+            # Split the points by block, so that
+            #   each block is read by one job.
+            block_ids = _get_block_ids(x_offsets, y_offsets, block_size, self.m_info.cols)
 
-                        """
-                        | |1| |
-                        |4|x|2|
-                        | |3| |
-                                            1         2       3       4
-                        neighbor_offsets = [[0, -1], [1, 0], [0, 1], [-1, 0]]
-                        """
+            n_chunks = cpu_count() if self.n_jobs < 0 else self.n_jobs
 
-                        for noff in range(1, self.updater):
+            block_chunks = np.array_split(np.unique(block_ids), n_chunks)
 
-                            if (x_off + neighbor_offsets[noff-1][0] >= self.m_info.cols) or \
-                                    (y_off + neighbor_offsets[noff-1][1] >= self.m_info.rows):
+            point_chunks = [np.where(np.in1d(block_ids, block_chunk))[0]
+                            for block_chunk in block_chunks if len(block_chunk) > 0]
 
-                                to_delete.append(point_iter + noff)
-                                self.count_arr[self.n_classes.index(values[1][4])] -= 1
+            value_chunks = Parallel(n_jobs=self.n_jobs)(delayed(_sample_windows)(self.image_file,
+                                                                                 x_offsets[point_chunk],
+                                                                                 y_offsets[point_chunk],
+                                                                                 block_size)
+                                                        for point_chunk in point_chunks)
 
-                                continue
+            value_arr = np.zeros((len(x_offsets), self.m_info.bands), dtype='float32')
 
-                            else:
+            for point_chunk, value_chunk in zip(point_chunks, value_chunks):
+                value_arr[point_chunk] = value_chunk
 
-                                value = band.ReadAsArray(x_off+neighbor_offsets[noff-1][0],
-                                                         y_off+neighbor_offsets[noff-1][1], 1, 1).astype(np.float32)[0, 0]
+        else:
 
-                            if not self.accuracy:
-                                value = float(('{:.4f}'.format(value)))
-                            else:
-                                value = int(value)
+            value_arr = _sample_windows(self.image_file,
+                                        x_offsets,
+                                        y_offsets,
+                                        block_size)
 
-                            # Write to array.
-                            value_arr[point_iter+noff, 0] = \
-                                values[1][0] + (neighbor_offsets[noff-1][0] * self.m_info.cellY)
+        no_data = np.all(value_arr == -999, axis=1)
 
-                            value_arr[point_iter+noff, 1] = \
-                                values[1][1] + (neighbor_offsets[noff-1][1] * -self.m_info.cellY)
+        if not self.accuracy:
+            value_arr = np.float32(np.round(np.float64(value_arr), 4))
+        else:
+            value_arr = np.float32(np.trunc(value_arr))
 
-                            value_arr[point_iter+noff, f_bd+1] = value
-                            value_arr[point_iter+noff, -1] = values[1][4]
+        if self.neighbors:
 
-                    point_iter += self.updater
+            # Remove neighbors outside of the image.
+            for label in labels[no_data]:
+                self.count_dict[int(label)] -= 1
 
-                    pbar.update(ctr)
-                    ctr += 1
+        # Remove coordinates with no data.
+        value_arr = value_arr[~no_data]
+        xy_coordinates = xy_coordinates[~no_data]
+        labels = labels[~no_data]
 
-                band.FlushCache()
-                band = None
+        try:
 
-            pbar.finish()
+            # Combine all the x,y coordinates,
+            #   data, and sample value.
+            value_arr = np.c_[xy_coordinates,
+                              value_arr,
+                              labels]
 
-            if to_delete:
-                value_arr = np.delete(value_arr, np.array(to_delete), axis=0)
+        except ArrayOffsetError:
+            raise ArrayOffsetError('Check the projections and extents of the datasets.')
 
         value_arr[np.isnan(value_arr) | np.isinf(value_arr)] = 0.
 
@@ -719,7 +734,8 @@ def sample_raster(points,
                   sql_expression_attr=None,
                   neighbors=False,
                   search_ext=None,
-                  n_jobs=0):
+                  n_jobs=0,
+                  out_format='txt'):
     
     """
     Samples an image, or imagery, using a point, or points, shapefile.
@@ -743,6 +759,8 @@ def sample_raster(points,
         neighbors (Optional[bool]): Whether to sample neighboring pixels. Default is False.
         search_ext (Optional[str list]): A list of file extensions to search. Default is ['tif'].
         n_jobs (Optional[int]): The number of parallel jobs. Default is 0.
+        out_format (Optional[str]): The samples file format, 'txt' or 'smp' (a binary sample store).
+            Default is 'txt'.
 
     Returns:
         None, writes results to ``out_dir``.
@@ -767,7 +785,8 @@ def sample_raster(points,
                          use_extent=use_extent,
                          neighbors=neighbors,
                          sql_expression_attr=sql_expression_attr,
-                         sql_expression_field=sql_expression_field)
+                         sql_expression_field=sql_expression_field,
+                         out_format=out_format)
 
         si.sample()
 
@@ -794,7 +813,8 @@ def sample_raster(points,
                              use_extent=use_extent,
                              neighbors=neighbors,
                              sql_expression_attr=sql_expression_attr,
-                             sql_expression_field=sql_expression_field)
+                             sql_expression_field=sql_expression_field,
+                             out_format=out_format)
 
             si.sample()
 
@@ -817,7 +837,8 @@ def sample_raster(points,
                              use_extent=use_extent,
                              neighbors=neighbors,
                              sql_expression_attr=sql_expression_attr,
-                             sql_expression_field=sql_expression_field)
+                             sql_expression_field=sql_expression_field,
+                             out_format=out_format)
 
             si.sample()
 
@@ -849,6 +870,9 @@ def _examples():
     # Query the <trees> and <shrubs> fields in <polys.shp> prior to sampling
     sample_raster -s /polys.shp -c CLASS -i /image.tif -o /out_dir --sql_field name --sql_attr trees shrubs
 
+    # Write a binary sample store (*_SAMPLES.smp) instead of text
+    sample_raster -s /pts.shp -i /some_image.tif -o /out_dir --format smp
+
     # compute the accuracy of some_image.tif
     sample_raster -s /pts.shp -i /some_image.tif --accuracy
 
@@ -875,6 +899,8 @@ def main():
     parser.add_argument('-j', '--n_jobs', dest='n_jobs', help='Number of parallel jobs', default=0, type=int)
     parser.add_argument('--sql_attr', dest='sql_attr', help='The SQL field attributes', default=[], nargs='+')
     parser.add_argument('--sql_field', dest='sql_field', help='The SQL class field', default='Id')
+    parser.add_argument('--format', dest='format', help='The samples file format', default='txt',
+                        choices=['txt', 'smp'])
     parser.add_argument('--options', dest='options', help='Whether to show sampling options', action='store_true')
 
     args = parser.parse_args()
@@ -891,7 +917,8 @@ def main():
 
     sample_raster(args.shapefile, args.input, out_dir=args.output, option=args.option, class_id=args.classid,
                   accuracy=args.accuracy, field_type=args.fieldtype, neighbors=args.neighbors,
-                  n_jobs=args.n_jobs, sql_expression_attr=args.sql_attr, sql_expression_field=args.sql_field)
+                  n_jobs=args.n_jobs, sql_expression_attr=args.sql_attr, sql_expression_field=args.sql_field,
+                  out_format=args.format)
 
     logger.info('\nEnd data & time -- (%s)\nTotal processing time -- (%.2gs)\n' %
                 (time.asctime(time.localtime(time.time())), (time.time()-start_time)))
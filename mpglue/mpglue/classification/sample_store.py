@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+
+"""
+A binary sample container
+
+A sample store holds the same samples as a ``*_SAMPLES.txt`` file:
+
+    Id (int64), X (float64), Y (float64) columns and a float32 [samples x (features + 1)]
+    matrix of the features followed by the response.
+
+The columns and the matrix are stored uncompressed after a JSON header,
+so they can be memory-mapped instead of parsed.
+"""
+
+from __future__ import division
+from builtins import int
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+from ..errors import logger
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError('NumPy is not installed')
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError('Pandas is not installed')
+
+
+STORE_EXT = '.smp'
+STORE_MAGIC = b'MPGSMP01'
+STORE_ALIGN = 64
+
+
+def _aligned(offset):
+    return int(np.ceil(offset / STORE_ALIGN) * STORE_ALIGN)
+
+
+def is_sample_store(file_name):
+
+    """
+    Checks whether a file is a sample store
+
+    Args:
+        file_name (str): The file to check.
+    """
+
+    if not isinstance(file_name, str) or not os.path.isfile(file_name):
+        return False
+
+    with open(file_name, 'rb') as f:
+        return f.read(len(STORE_MAGIC)) == STORE_MAGIC
+
+
+class SampleStore(object):
+
+    """
+    A memory-mapped sample store
+
+    Args:
+        file_name (str): The sample store file.
+        mode (Optional[str]): The memory map mode. Default is 'c', or copy-on-write, so arrays
+            can be modified in memory without changing the file.
+
+    Attributes:
+        headers (list): The column names, as (Id, X, Y, features..., response).
+        ids (1d array)
+        x (1d array)
+        y (1d array)
+        values (2d array): The features and the response, shaped [samples x (features + 1)].
+    """
+
+    def __init__(self, file_name, mode='c'):
+
+        if not is_sample_store(file_name):
+
+            logger.error('  {} is not a sample store.'.format(file_name))
+            raise TypeError
+
+        self.file_name = file_name
+
+        with open(file_name, 'rb') as f:
+
+            f.seek(len(STORE_MAGIC))
+
+            header_size = struct.unpack('<Q', f.read(8))[0]
+            header = json.loads(f.read(header_size).decode('utf-8'))
+
+        self.headers = header['headers']
+        self.n_samples = header['n_samples']
+        self.n_feas = header['n_feas']
+
+        arrays = dict()
+
+        for name, (offset, dtype, shape) in header['arrays'].items():
+
+            if self.n_samples == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(file_name, dtype=dtype, mode=mode, offset=offset, shape=tuple(shape))
+
+        self.ids = arrays['ids']
+        self.x = arrays['x']
+        self.y = arrays['y']
+        self.values = arrays['values']
+
+    @property
+    def features(self):
+        return self.values[:, :-1]
+
+    @property
+    def labels(self):
+        return self.values[:, -1]
+
+    def flush(self):
+
+        """Writes changes to a store opened with mode='r+'"""
+
+        for array in [self.ids, self.x, self.y, self.values]:
+
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def to_frame(self, x_label='X', y_label='Y', response_label='response'):
+
+        """
+        Returns the Id, X, Y and response columns as a DataFrame (the features are not copied)
+        """
+
+        return pd.DataFrame({self.headers[0]: self.ids,
+                             x_label: self.x,
+                             y_label: self.y,
+                             response_label: self.labels},
+                            columns=[self.headers[0], x_label, y_label, response_label])
+
+
+def write_samples(file_name, ids, x, y, values, headers):
+
+    """
+    Writes a sample store
+
+    Args:
+        file_name (str): The output file.
+        ids (1d array): The sample ids.
+        x (1d array): The x coordinates.
+        y (1d array): The y coordinates.
+        values (2d array): The features and the response, shaped [samples x (features + 1)].
+        headers (list): The column names, as (Id, X, Y, features..., response).
+    """
+
+    n_samples = values.shape[0]
+    n_feas = values.shape[1] - 1
+
+    if len(headers) != n_feas + 4:
+
+        logger.error('  The headers should have the Id, X, Y, {:d} feature and response names.'.format(n_feas))
+        raise ValueError
+
+    out_file = open_samples(file_name, n_samples, headers)
+
+    out_file.ids[:] = ids
+    out_file.x[:] = x
+    out_file.y[:] = y
+    out_file.values[:] = values
+
+    out_file.flush()
+
+
+def open_samples(file_name, n_samples, headers):
+
+    """
+    Creates a sample store to fill
+
+    Args:
+        file_name (str): The output file.
+        n_samples (int): The number of samples.
+        headers (list): The column names, as (Id, X, Y, features..., response).
+
+    Returns:
+        A writable `SampleStore`. Call `flush` when the arrays are filled.
+    """
+
+    headers = list(map(str, headers))
+    n_feas = len(headers) - 4
+
+    array_specs = [('ids', 'int64', [n_samples]),
+                   ('x', 'float64', [n_samples]),
+                   ('y', 'float64', [n_samples]),
+                   ('values', 'float32', [n_samples, n_feas+1])]
+
+    # The header size depends on the offsets, so reserve room for them first.
+    header = dict(headers=headers, n_samples=n_samples, n_feas=n_feas, arrays=dict())
+
+    header_size = len(json.dumps(header).encode('utf-8')) + 256
+
+    offset = _aligned(len(STORE_MAGIC) + 8 + header_size)
+
+    for name, dtype, shape in array_specs:
+
+        header['arrays'][name] = [offset, dtype, shape]
+
+        offset = _aligned(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+    header_bytes = json.dumps(header).encode('utf-8').ljust(header_size)
+
+    with open(file_name, 'wb') as f:
+
+        f.write(STORE_MAGIC)
+        f.write(struct.pack('<Q', header_size))
+        f.write(header_bytes)
+
+        f.truncate(offset)
+
+    return SampleStore(file_name, mode='r+')
+
+
+def convert_samples(text_file,
+                    out_file=None,
+                    x_label='X',
+                    y_label='Y',
+                    response_label='response',
+                    chunk_size=100000):
+
+    """
+    Converts a text samples file to a sample store
+
+    Args:
+        text_file (str): The comma-separated samples file, with X, Y, feature and response columns.
+        out_file (Optional[str]): The output sample store. Default is None, or `text_file` with the store extension.
+        x_label (Optional[str]): The x coordinate label. Default is 'X'.
+        y_label (Optional[str]): The y coordinate label. Default is 'Y'.
+        response_label (Optional[str]): The response label. Default is 'response'.
+        chunk_size (Optional[int]): The number of rows to read at a time. Default is 100000.
+
+    Returns:
+        The sample store file name
+    """
+
+    if not out_file:
+        out_file = '{}{}'.format(os.path.splitext(text_file)[0], STORE_EXT)
+
+    text_headers = pd.read_csv(text_file, sep=',', nrows=0).columns.tolist()
+
+    x_idx = text_headers.index(x_label)
+    y_idx = text_headers.index(y_label)
+    response_idx = text_headers.index(response_label)
+
+    id_label = text_headers[0] if x_idx > 0 else 'Id'
+    feature_labels = text_headers[y_idx+1:response_idx]
+
+    headers = [id_label, x_label, y_label] + feature_labels + [response_label]
+
+    with open(text_file, 'r') as f:
+        n_samples = max(0, sum([1 for __ in f]) - 1)
+
+    out_store = open_samples(out_file, n_samples, headers)
+
+    row = 0
+
+    for df in pd.read_csv(text_file, sep=',', chunksize=chunk_size):
+
+        n_rows = df.shape[0]
+
+        if x_idx > 0:
+            out_store.ids[row:row+n_rows] = df[id_label].values
+        else:
+            out_store.ids[row:row+n_rows] = np.arange(row, row+n_rows)
+
+        out_store.x[row:row+n_rows] = df[x_label].values
+        out_store.y[row:row+n_rows] = df[y_label].values
+        out_store.values[row:row+n_rows] = df[feature_labels + [response_label]].values
+
+        row += n_rows
+
+    out_store.flush()
+
+    if row != n_samples:
+
+        logger.error('  Expected {:,d} samples in {}, but read {:,d}.'.format(n_samples, text_file, row))
+        raise AssertionError
+
+    return out_file
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Convert text samples to a binary sample store',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('-s', '--samples', dest='samples', help='The text samples file(s) to convert', nargs='+')
+    parser.add_argument('-o', '--output', dest='output', help='The output sample store (one input only)', default=None)
+    parser.add_argument('--x-label', dest='x_label', help='The x column label', default='X')
+    parser.add_argument('--y-label', dest='y_label', help='The y column label', default='Y')
+    parser.add_argument('--response-label', dest='response_label', help='The response column label',
+                        default='response')
+
+    args = parser.parse_args()
+
+    if not args.samples:
+        sys.exit('No samples were given.')
+
+    for samples in args.samples:
+
+        out_file = convert_samples(samples,
+                                   out_file=args.output if len(args.samples) == 1 else None,
+                                   x_label=args.x_label,
+                                   y_label=args.y_label,
+                                   response_label=args.response_label)
+
+        logger.info('  Wrote {}'.format(out_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,27 @@ from ..stats._rolling_stats import rolling_stats
 
 import numpy as np
 
+try:
+    from ._ts_features import ts_features_block
+    TS_KERNEL_INSTALLED = True
+except ImportError:
+    TS_KERNEL_INSTALLED = False
+
+
+# Percentiles of the sorted series
+QUANTILES = dict(five=5,
+                 twenty_five=25,
+                 fifty=50,
+                 seventy_five=75,
+                 ninety_five=95)
+
+# Percentiles of the cumulative sum positions
+CUMULATIVE = dict(five_cumulative=5,
+                  twenty_five_cumulative=25,
+                  fifty_cumulative=50,
+                  seventy_five_cumulative=75,
+                  ninety_five_cumulative=95)
+
 
 def _nan_reshape(Xd, no_data):
 
@@ -203,6 +224,17 @@ def _slopes(X, axis=None, no_data=0):
                       _nan_reshape(X_min, no_data)))
 
 
+def _cumulative_index(pct, n_dims):
+
+    """
+    Gets the cumulative sum position at the nth percentile, limited to the last position
+    """
+
+    x_range = list(range(0, n_dims+1))
+
+    return min(int(np.ceil(np.percentile(x_range, pct))), n_dims-1)
+
+
 def _max_diff(X, axis=1, no_data=0):
 
     """
@@ -261,7 +293,79 @@ class TimeSeriesFeatures(object):
         self.ts_funcs = [(feature_name, self._func_dict[feature_name]) for feature_name in feature_list
                          if feature_name in self._func_dict]
 
-    def apply_features(self, X=None, ts_indices=None, append_features=True, **kwargs):
+    @property
+    def feature_names(self):
+        return [ts_func[0] for ts_func in self.ts_funcs]
+
+    @property
+    def n_features(self):
+        return sum([2 if feature_name == 'slopes' else 1 for feature_name in self.feature_names])
+
+    def _check_features(self):
+
+        if not isinstance(self.ts_funcs, list):
+
+            logger.error('  The features must be added with `add_features`.')
+            raise AttributeError
+
+    def _fill_features(self, X, out, no_data=0):
+
+        """
+        Computes all features of a time series array
+
+        The percentiles are taken from one partition of each series, and the
+        cumulative features from one cumulative sum.
+
+        Args:
+            X (2d array): The time series, shaped [samples x dimensions].
+            out (2d array): The output, shaped [features x samples].
+            no_data (Optional[int or float]): The value of non-finite features. Default is 0.
+        """
+
+        feature_names = self.feature_names
+
+        n_dims = X.shape[1]
+
+        pcts = sorted(set([QUANTILES[feature_name] for feature_name in feature_names
+                           if feature_name in QUANTILES]))
+
+        if pcts:
+            X_pcts = dict(zip(pcts, np.percentile(X, pcts, axis=1)))
+
+        if ('mean' in feature_names) or ('cv' in feature_names):
+            X_mean = X.mean(axis=1)
+
+        if any([feature_name in CUMULATIVE for feature_name in feature_names]):
+            X_cumsum = X.cumsum(axis=1)
+
+        fi = 0
+
+        for feature_name in feature_names:
+
+            if feature_name == 'mean':
+                out[fi] = X_mean
+            elif feature_name == 'cv':
+                out[fi] = X.std(axis=1) / X_mean
+            elif feature_name in QUANTILES:
+                out[fi] = X_pcts[QUANTILES[feature_name]]
+            elif feature_name in CUMULATIVE:
+                out[fi] = X_cumsum[:, _cumulative_index(CUMULATIVE[feature_name], n_dims)]
+            elif feature_name == 'slopes':
+
+                # Reshape to [dims x samples].
+                X_min, X_max = rolling_stats(X.T,
+                                             stat='slope',
+                                             window_size=15)
+
+                out[fi] = X_min
+                fi += 1
+                out[fi] = X_min
+
+            fi += 1
+
+        out[~np.isfinite(out)] = no_data
+
+    def apply_features(self, X=None, ts_indices=None, append_features=True, no_data=0):
 
         """
         Applies features to an array
@@ -270,59 +374,103 @@ class TimeSeriesFeatures(object):
             X (Optional[2d array]): The array to add features to.
             ts_indices (Optional[1-d array like]): A list of indices to index the time series. Default is None.
             append_features (Optional[bool]): Whether to append features to `X`. Default is True.
+            no_data (Optional[int or float]): The value of non-finite features. Default is 0.
+
+        Returns:
+            The features, shaped [samples x features], after the columns of `X` if `append_features`.
         """
 
-        if not isinstance(self.ts_funcs, list):
-            logger.error('  The features must be added with `add_features`.')
+        self._check_features()
 
-        if not append_features:
-            Xnew = None
+        if isinstance(ts_indices, np.ndarray) or isinstance(ts_indices, list):
+            X_ts = X[:, ts_indices]
+        else:
+            X_ts = X
 
-        for ts_func in self.ts_funcs:
+        n_cols = X.shape[1] if append_features else 0
 
-            if isinstance(ts_indices, np.ndarray) or isinstance(ts_indices, list):
+        # Preallocate the output rather than stacking each feature.
+        Xnew = np.empty((X.shape[0], n_cols + self.n_features), dtype=np.result_type(X.dtype, 'float32'))
 
-                if append_features:
+        if append_features:
+            Xnew[:, :n_cols] = X
 
-                    X = np.hstack((X,
-                                   ts_func[1](X[:, ts_indices],
-                                              **kwargs)))
+        self._fill_features(X_ts, Xnew[:, n_cols:].T, no_data=no_data)
 
-                else:
+        return Xnew
 
-                    if isinstance(Xnew, np.ndarray):
+    def apply_block(self, block, out=None, no_data=0, n_jobs=1):
 
-                        Xnew = np.hstack((Xnew,
-                                          ts_func[1](X[:, ts_indices],
-                                                     **kwargs)))
+        """
+        Applies features to a block of time series
 
-                    else:
+        Args:
+            block (3d array): The time series, shaped [dimensions x rows x columns].
+            out (Optional[3d array]): A C-contiguous float32 array to write the features to,
+                shaped [features x rows x columns]. Default is None.
+            no_data (Optional[int or float]): The value of non-finite features. Default is 0.
+            n_jobs (Optional[int]): The number of threads for the compiled kernel. Default is 1.
+
+        Returns:
+            The features as a float32 array, shaped [features x rows x columns].
+        """
 
-                        Xnew = ts_func[1](X[:, ts_indices],
-                                          **kwargs)
+        self._check_features()
 
-            else:
+        n_dims, rows, cols = block.shape
 
-                if append_features:
+        if not isinstance(out, np.ndarray):
+            out = np.empty((self.n_features, rows, cols), dtype='float32')
 
-                    X = np.hstack((X,
-                                   ts_func[1](X,
-                                              **kwargs)))
+        elif (out.shape != (self.n_features, rows, cols)) or (out.dtype != np.float32) or \
+                (not out.flags['C_CONTIGUOUS']):
 
-                else:
+            logger.error('  The output should be a C-contiguous float32 array shaped {}.'.format((self.n_features,
+                                                                                                 rows,
+                                                                                                 cols)))
+            raise ValueError
 
-                    if isinstance(Xnew, np.ndarray):
+        feature_names = self.feature_names
 
-                        Xnew = np.hstack((Xnew,
-                                          ts_func[1](X,
-                                                     **kwargs)))
+        if TS_KERNEL_INSTALLED and ('slopes' not in feature_names):
 
-                    else:
+            codes = np.empty(len(feature_names), dtype='intp')
+            params = np.zeros(len(feature_names), dtype='float64')
 
-                        Xnew = ts_func[1](X,
-                                          **kwargs)
+            for fi, feature_name in enumerate(feature_names):
+
+                if feature_name == 'mean':
+                    codes[fi] = 0
+                elif feature_name == 'cv':
+                    codes[fi] = 1
+                elif feature_name in QUANTILES:
+
+                    codes[fi] = 2
+                    params[fi] = QUANTILES[feature_name] / 100. * (n_dims - 1)
+
+                else:
+
+                    codes[fi] = 3
+                    params[fi] = _cumulative_index(CUMULATIVE[feature_name], n_dims)
+
+            # The sorted positions on both sides of each quantile
+            kth = np.unique([min(int(np.floor(param)) + offset, n_dims-1)
+                             for fi, param in enumerate(params) if codes[fi] == 2
+                             for offset in [0, 1]]).astype('intp')
+
+            # The kernel reads each pixel series contiguously.
+            ts_features_block(np.ascontiguousarray(block.transpose(1, 2, 0), dtype='float32'),
+                              codes,
+                              params,
+                              kth,
+                              out,
+                              no_data=no_data,
+                              n_jobs=n_jobs)
 
-        if append_features:
-            return X
         else:
-            return Xnew
+
+            self._fill_features(np.float32(block).reshape(n_dims, rows*cols).T,
+                                out.reshape(self.n_features, rows*cols),
+                                no_data=no_data)
+
+        return out
@@ -20,7 +20,10 @@ from joblib import Parallel, delayed
 import shutil
 import platform
 import subprocess
-from collections import OrderedDict
+import threading
+import multiprocessing as multi
+from multiprocessing.pool import ThreadPool
+from collections import deque, OrderedDict
 
 from . import vector_tools
 from .helpers import random_float, overwrite_file, check_and_create_dir, _iteration_parameters
@@ -1581,6 +1584,67 @@ class FileManager(DataChecks, RegisterDriver, DatasourceInfo):
                 else:
                     logger.error('\nFailed to write the array to file (issue not apparent).')
 
+    def write_bands(self, array2write, band_list, i=0, j=0):
+
+        """
+        Writes a 3d array to several bands with one dataset write.
+
+        Args:
+            array2write (ndarray): The [bands x rows x columns] array to write.
+            band_list (list): The band positions to write to, one per array layer.
+            i (Optional[int]): The starting row position to write to. Default is 0.
+            j (Optional[int]): The starting column position to write to. Default is 0.
+        """
+
+        if not isinstance(array2write, np.ndarray) or (len(array2write.shape) != 3):
+
+            logger.error('  The array must be a 3d ndarray.')
+            raise ValueError
+
+        if array2write.shape[0] != len(band_list):
+
+            logger.error('  The band list should have one band per array layer.')
+            raise ValueError
+
+        if not isinstance(i, int) or (i < 0):
+
+            logger.error('  The row index must be a positive integer.')
+            raise ValueError
+
+        if not isinstance(j, int) or (j < 0):
+
+            logger.error('  The column index must be a positive integer.')
+            raise ValueError
+
+        __, array_rows, array_cols = array2write.shape
+
+        if (i + array_rows > self.datasource.RasterYSize) or (j + array_cols > self.datasource.RasterXSize):
+
+            logger.error('\nThe array is larger than the file size, or the starting position spills over.\n')
+            raise ArrayShapeError
+
+        data_type = self.datasource.GetRasterBand(1).DataType
+
+        # The buffer is band-interleaved, in the file storage type.
+        array2write = np.ascontiguousarray(array2write,
+                                           dtype=STORAGE_DICT_NUMPY[gdal.GetDataTypeName(data_type).lower()])
+
+        write_error = self.datasource.WriteRaster(j,
+                                                  i,
+                                                  array_cols,
+                                                  array_rows,
+                                                  array2write.tobytes(),
+                                                  array_cols,
+                                                  array_rows,
+                                                  data_type,
+                                                  list(map(int, band_list)))
+
+        if write_error != 0:
+
+            logger.error(gdal.GetLastErrorMsg())
+            logger.error('\nFailed to write the bands to file.')
+            raise IOError
+
     def close_band(self):
 
         """Closes a band object"""
@@ -2944,83 +3008,121 @@ def gdal_get_band(datasource_b, band_position):
     return datasource_b.GetRasterBand(band_position)
 
 
-def _parallel_blocks(out_image,
-                     band_list,
-                     ii,
-                     jj,
-                     y_offset,
-                     x_offset,
-                     nn_rows,
-                     nn_cols,
-                     left,
-                     top,
-                     cellY,
-                     cellX,
-                     projection,
-                     **kwargs):
+class OccupancyIndex(object):
 
     """
-    Args:
-        out_image:
-        band_list:
-        ii:
-        jj:
-        y_offset:
-        x_offset:
-        n_rows:
-        n_cols:
-        **kwargs:
+    A coarse index of the valid-data footprint of an image
 
-    Returns:
+    Each index cell covers `cell_size` x `cell_size` pixels. The index is built once, by
+    rasterizing a boundary vector with every touched cell burned, or by reading one band
+    at the index resolution, which GDAL reads from the closest overview. An overview can
+    miss small areas of valid data, so the valid cells of a band index are grown by one cell.
 
+    Args:
+        image_info (object): An instance of ``ropen``.
+        band (Optional[int]): The band to read if `boundary_file` is not given. Default is 1.
+        no_data (Optional[int or float]): The 'no data' value of `band`. Default is 0.
+        cell_size (Optional[int]): The index cell size, in pixels. Default is 64.
+        boundary_file (Optional[str]): A vector file of the valid-data boundary. Default is None.
+
+    Examples:
+        >>> from mpglue import raster_tools
+        >>>
+        >>> with raster_tools.ropen('/image.tif') as i_info:
+        >>>     occupancy_index = raster_tools.OccupancyIndex(i_info, boundary_file='/aoi.shp')
+        >>>
+        >>> # Check a block before reading it
+        >>> occupancy_index.is_empty(0, 0, 1024, 1024)
     """
 
-    # out_info_tile = out_info.copy()
-    # out_info_tile.update_info(rows=nn_rows, cols=nn_cols,
-    #                           left=out_info.left+(jj*out_info.cellY),
-    #                           top=out_info.top-(ii*out_info.cellY))
+    def __init__(self, image_info, band=1, no_data=0, cell_size=64, boundary_file=None):
+
+        self.cell_size = cell_size
+
+        self.rows = int(np.ceil(image_info.rows / float(cell_size)))
+        self.cols = int(np.ceil(image_info.cols / float(cell_size)))
+
+        if isinstance(boundary_file, str):
+            self.occupied = self._rasterize_boundary(image_info, boundary_file)
+        else:
+            self.occupied = self._read_band(image_info, band, no_data)
+
+        # The summed-area table of occupied cells
+        self.cell_counts = np.zeros((self.rows+1, self.cols+1), dtype='int64')
+        self.cell_counts[1:, 1:] = np.int64(self.occupied).cumsum(axis=0).cumsum(axis=1)
+
+    def _rasterize_boundary(self, image_info, boundary_file):
+
+        orw = create_raster('none',
+                            None,
+                            in_memory=True,
+                            rows=self.rows,
+                            cols=self.cols,
+                            bands=1,
+                            projection=image_info.projection,
+                            cellY=image_info.cellY*self.cell_size,
+                            cellX=image_info.cellX*self.cell_size,
+                            left=image_info.left,
+                            top=image_info.top,
+                            storage='byte')
+
+        with vector_tools.vopen(boundary_file) as v_info:
+
+            gdal.RasterizeLayer(orw.datasource, [1], v_info.lyr, burn_values=[1], options=['ALL_TOUCHED=TRUE'])
+            occupied = orw.datasource.GetRasterBand(1).ReadAsArray(0, 0, self.cols, self.rows) > 0
+
+        v_info = None
+
+        gdal.Unlink('none')
+
+        return occupied
+
+    def _read_band(self, image_info, band, no_data):
+
+        band_object = image_info.datasource.GetRasterBand(band)
+
+        occupied = band_object.ReadAsArray(0, 0, image_info.cols, image_info.rows,
+                                           buf_xsize=self.cols, buf_ysize=self.rows) != no_data
+
+        band_object = None
 
-    d_name_, f_name_ = os.path.split(out_image)
-    f_base_, f_ext_ = os.path.splitext(f_name_)
+        # Grow the valid cells by one cell.
+        grown = occupied.copy()
 
-    d_name_ = os.path.join(d_name_, 'temp')
+        grown[1:] |= occupied[:-1]
+        grown[:-1] |= occupied[1:]
 
-    rsn = '{:f}'.format(abs(np.random.randn(1)[0]))[-4:]
+        occupied = grown.copy()
 
-    out_image_tile = os.path.join(d_name_, '{}_{}{}'.format(f_base_, rsn, f_ext_))
+        occupied[:, 1:] |= grown[:, :-1]
+        occupied[:, :-1] |= grown[:, 1:]
 
-    datasource = gdal_create(out_image_tile,
-                             driver_pp,
-                             nn_rows,
-                             nn_cols,
-                             1,
-                             STORAGE_DICT_GDAL['float32'],
-                             left,
-                             top,
-                             cellY,
-                             cellX,
-                             projection)
+        return occupied
 
-    band_object = gdal_get_band(datasource, 1)
+    def is_empty(self, i, j, n_rows, n_cols):
 
-    # out_raster = create_raster(out_image_tile, out_info_tile)
-    # out_raster.get_band(1)
+        """
+        Checks whether a block has no valid data
 
-    image_arrays = [gdal_read(image_infos_list[imi],
-                              band_list[imi],
-                              ii+y_offset[imi],
-                              jj+x_offset[imi],
-                              nn_rows,
-                              nn_cols) for imi in range(0, len(image_infos_list))]
+        Args:
+            i (int): The starting row.
+            j (int): The starting column.
+            n_rows (int): The number of rows.
+            n_cols (int): The number of columns.
 
-    output = block_func(image_arrays, **kwargs)
+        Returns:
+            True if no index cell under the block holds valid data
+        """
 
-    gdal_write(band_object, output)
+        r0 = min(max(i, 0) // self.cell_size, self.rows)
+        c0 = min(max(j, 0) // self.cell_size, self.cols)
+        r1 = min((max(i + n_rows, 0) + self.cell_size - 1) // self.cell_size, self.rows)
+        c1 = min((max(j + n_cols, 0) + self.cell_size - 1) // self.cell_size, self.cols)
 
-    band_object = gdal_close_band(band_object)
-    datasource = gdal_close_datasource(datasource)
+        if (r1 <= r0) or (c1 <= c0):
+            return True
 
-    return out_image_tile
+        return (self.cell_counts[r1, c1] - self.cell_counts[r0, c1] - self.cell_counts[r1, c0] + self.cell_counts[r0, c0]) == 0
 
 
 class BlockFunc(object):
@@ -3052,8 +3154,14 @@ class BlockFunc(object):
             Skip blocks that do not intersect ``boundary_file``.
         mask_file (Optional[str]): A file to use for block masking. Default is None.
             Recode blocks to binary 1 and 0 that intersect ``mask_file``.
-        n_jobs (Optional[int]): The number of blocks to process in parallel. Default is 1.
+        n_jobs (Optional[int]): The number of blocks to process in parallel. Default is 1. If -1,
+            use all available CPUs. Blocks are processed by a pool of threads, each reading through
+            its own GDAL handles, and the outputs are written to ``out_image`` by the calling thread.
+            Inputs that are not files on disk (e.g., in-memory rasters) cannot be reopened by the
+            threads, so they are processed serially.
         no_data_values (Optional[list]): A list of no data values for each image. Default is None.
+        occupancy_index (Optional[object]): An ``OccupancyIndex`` of ``proc_info``. Default is None.
+            Skip blocks that have no valid data, without reading them.
         kwargs (Optional[dict]): Function specific parameters.
 
     Returns:
@@ -3084,6 +3192,7 @@ class BlockFunc(object):
                  n_jobs=1,
                  close_files=True,
                  no_data_values=None,
+                 occupancy_index=None,
                  overwrite=False,
                  **kwargs):
 
@@ -3110,9 +3219,11 @@ class BlockFunc(object):
         self.n_jobs = n_jobs
         self.close_files = close_files
         self.no_data_values = no_data_values
+        self.occupancy_index = occupancy_index
         self.kwargs = kwargs
 
         self.out_attributes_dict = dict()
+        self.mask_array = None
 
         if not isinstance(self.d_types, list):
             self.d_types = ['byte'] * len(self.image_infos)
@@ -3133,6 +3244,14 @@ class BlockFunc(object):
             if os.path.isfile(self.out_image):
                 os.remove(self.out_image)
 
+        if self.n_jobs < 0:
+            self.n_jobs = multi.cpu_count()
+
+        if self.n_jobs not in [0, 1] and not all(map(self._is_file, self.image_infos)):
+
+            logger.warning('  In-memory inputs cannot be reopened by the block threads, so the blocks will be processed serially.')
+            self.n_jobs = 1
+
         if self.n_jobs in [0, 1]:
 
             if not self.proc_info:
@@ -3182,86 +3301,38 @@ class BlockFunc(object):
             logger.error('  The offset lists and input image info lists must be the same length.')
             raise LenError
 
-    def run(self):
-
-        global block_func, image_infos_list, driver_pp
-
-        if self.n_jobs in [0, 1]:
-
-            for imi in range(0, len(self.image_infos)):
-                if isinstance(self.band_list[imi], int):
-                    self.image_infos[imi].get_band(self.band_list[imi])
-
-            self._process_blocks()
-
-        else:
-
-            block_func = self.func
-            image_infos_list = self.image_infos
-
-            self._get_pairs()
-
-            dn, fn = os.path.split(self.out_image)
-
-            if not dn and not os.path.isabs(fn):
-                dn = os.path.join(os.path.abspath('.'), 'temp')
-            else:
-                check_and_create_dir(os.path.join(dn, 'temp'))
-
-            driver_pp = gdal_register(self.out_image)
-
-            tile_list = Parallel(n_jobs=self.n_jobs,
-                                 max_nbytes=None)(delayed(_parallel_blocks)(self.out_image,
-                                                                            self.band_list,
-                                                                            pair[0], pair[1],
-                                                                            self.y_offset,
-                                                                            self.x_offset,
-                                                                            pair[2], pair[3],
-                                                                            self.out_info.left+(pair[1]*self.out_info.cellY),
-                                                                            self.out_info.top-(pair[0]*self.out_info.cellY),
-                                                                            self.out_info.cellY,
-                                                                            self.out_info.cellX,
-                                                                            self.out_info.projection,
-                                                                            **self.kwargs) for pair in self.pairs)
-
-    def _get_pairs(self):
-
-        self.pairs = []
+    @staticmethod
+    def _is_file(image_info):
 
-        for i in range(0, self.proc_info.rows, self.block_rows):
+        """
+        Checks whether an input can be reopened from disk
+        """
 
-            n_rows = n_rows_cols(i, self.block_rows, self.proc_info.rows)
+        if isinstance(image_info, str):
+            return True
 
-            for j in range(0, self.proc_info.cols, self.block_cols):
+        file_name = getattr(image_info, 'file_name', None)
 
-                n_cols = n_rows_cols(j, self.block_cols, self.proc_info.cols)
+        return isinstance(file_name, str) and os.path.isfile(file_name)
 
-                self.pairs.append((i, j, n_rows, n_cols))
+    def run(self):
 
-    def _process_blocks(self):
+        if self.n_jobs in [0, 1]:
 
-        if self.write_array:
+            for imi in range(0, len(self.image_infos)):
+                if isinstance(self.band_list[imi], int):
+                    self.image_infos[imi].get_band(self.band_list[imi])
 
-            out_raster = create_raster(self.out_image,
-                                       self.out_info,
-                                       bigtiff=self.bigtiff)
+        self._process_blocks()
 
-        # n_blocks = 0
-        # for i in range(0, self.proc_info.rows, self.block_rows):
-        #     for j in range(0, self.proc_info.cols, self.block_cols):
-        #         n_blocks += 1
-        #
-        # n_block = 1
+    def _get_blocks(self):
 
-        if isinstance(self.print_statement, str):
-            logger.info(self.print_statement)
+        """
+        Yields the blocks to process, as (i, j, rows, columns, row padding, column padding)
 
-        # set widget and pbar
-        if not self.be_quiet:
-            ctr, pbar = _iteration_parameters(self.proc_info.rows, self.proc_info.cols,
-                                              self.block_rows, self.block_cols)
+        Blocks without valid data or outside of ``boundary_file`` are skipped.
+        """
 
-        # iterate over the images and get change pixels
         for i in range(0, self.proc_info.rows, self.block_rows):
 
             n_rows = n_rows_cols(i, self.block_rows, self.proc_info.rows)
@@ -3284,6 +3355,12 @@ class BlockFunc(object):
                     x_pad_minus = 0
                     x_pad_plus = 0
 
+                # Check the valid-data footprint before reading the block.
+                if self.occupancy_index is not None:
+
+                    if self.occupancy_index.is_empty(i, j, n_rows, n_cols):
+                        continue
+
                 if isinstance(self.boundary_file, str):
 
                     # Get the extent of the current block.
@@ -3293,129 +3370,253 @@ class BlockFunc(object):
                     if not vector_tools.intersects_boundary(self.extent_dict, self.boundary_file):
                         continue
 
-                # if not self.be_quiet:
-                #
-                #     if n_block == 1:
-                #         print 'Blocks 1--19 of {:,d} ...'.format(n_blocks)
-                #     elif n_block % 20 == 0:
-                #         n_block_ = n_block + 19 if n_blocks - n_block > 20 else n_blocks
-                #         print 'Block {:,d}--{:,d} of {:,d} ...'.format(n_block, n_block_, n_blocks)
-                #
-                #     n_block += 1
-                image_arrays = [self.image_infos[imi].read(bands2open=self.band_list[imi],
-                                                           i=i+self.y_offset[imi]-y_pad_minus,
-                                                           j=j+self.x_offset[imi]-x_pad_minus,
-                                                           rows=n_rows+y_pad_plus,
-                                                           cols=n_cols+x_pad_plus,
-                                                           d_type=self.d_types[imi])
-                                for imi in range(0, len(self.image_infos))]
+                yield i, j, n_rows, n_cols, (y_pad_minus, y_pad_plus), (x_pad_minus, x_pad_plus)
 
-                skip_block = False
+    def _rasterize_mask(self):
 
-                # Check for no data values.
-                if isinstance(self.no_data_values, list):
+        """Rasterizes ``mask_file`` once over the extent of ``proc_info``"""
 
-                    for no_data, im_block in zip(self.no_data_values, image_arrays):
+        orw = create_raster('none',
+                            None,
+                            in_memory=True,
+                            rows=self.proc_info.rows,
+                            cols=self.proc_info.cols,
+                            bands=1,
+                            projection=self.proc_info.projection,
+                            cellY=self.proc_info.cellY,
+                            cellX=self.proc_info.cellX,
+                            left=self.proc_info.left,
+                            top=self.proc_info.top,
+                            storage='byte')
 
-                        if isinstance(no_data, int) or isinstance(no_data, float):
+        with vector_tools.vopen(self.mask_file) as v_info:
 
-                            if im_block.max() == no_data:
+            gdal.RasterizeLayer(orw.datasource, [1], v_info.lyr, burn_values=[1])
+            self.mask_array = orw.datasource.GetRasterBand(1).ReadAsArray(0, 0, self.proc_info.cols, self.proc_info.rows)
 
-                                skip_block = True
-                                break
+        v_info = None
 
-                if skip_block:
-                    continue
+        gdal.Unlink('none')
 
-                if isinstance(self.mask_file, str):
+    def _process_block(self, image_infos, block):
 
-                    self.get_block_extent(i, j, n_rows, n_cols)
+        """
+        Reads and processes one block
 
-                    orw = create_raster('none',
-                                        None,
-                                        in_memory=True,
-                                        rows=n_rows,
-                                        cols=n_cols,
-                                        bands=1,
-                                        projection=self.proc_info.projection,
-                                        cellY=self.proc_info.cellY,
-                                        cellX=self.proc_info.cellX,
-                                        left=self.extent_dict['UL'][0],
-                                        top=self.extent_dict['UL'][1],
-                                        storage='byte')
+        Args:
+            image_infos (list): The ``ropen`` instances to read from.
+            block (tuple): A block from ``_get_blocks``.
 
-                    # Rasterize the vector at the current block.
-                    with vector_tools.vopen(self.mask_file) as v_info:
+        Returns:
+            The ``func`` output, or None if the block is 'no data'
+        """
 
-                        gdal.RasterizeLayer(orw.datasource, [1], v_info.lyr, burn_values=[1])
-                        block_array = orw.datasource.GetRasterBand(1).ReadAsArray(0, 0, n_cols, n_rows)
+        i, j, n_rows, n_cols, (y_pad_minus, y_pad_plus), (x_pad_minus, x_pad_plus) = block
 
-                        for imib, image_array in enumerate(image_arrays):
+        image_arrays = [image_infos[imi].read(bands2open=self.band_list[imi],
+                                              i=i+self.y_offset[imi]-y_pad_minus,
+                                              j=j+self.x_offset[imi]-x_pad_minus,
+                                              rows=n_rows+y_pad_plus,
+                                              cols=n_cols+x_pad_plus,
+                                              d_type=self.d_types[imi])
+                        for imi in range(0, len(image_infos))]
 
-                            image_array[block_array == 0] = 0
-                            image_arrays[imib] = image_array
+        # Check for no data values.
+        if isinstance(self.no_data_values, list):
 
-                    v_info = None
+            for no_data, im_block in zip(self.no_data_values, image_arrays):
 
-                    gdal.Unlink('none')
+                if isinstance(no_data, int) or isinstance(no_data, float):
 
-                output = self.func(image_arrays,
-                                   **self.kwargs)
+                    if im_block.max() == no_data:
+                        return None
 
-                if isinstance(output, tuple):
+        if isinstance(self.mask_file, str):
 
-                    if self.write_array:
+            block_array = self.mask_array[i:i+n_rows, j:j+n_cols]
 
-                        if output[0].shape[0] > 1:
+            for imib, image_array in enumerate(image_arrays):
 
-                            for obi, obb in enumerate(output[0]):
+                image_array[block_array == 0] = 0
+                image_arrays[imib] = image_array
 
-                                out_raster.write_array(obb,
-                                                       i=i,
-                                                       j=j,
-                                                       band=obi + 1)
+        return self.func(image_arrays,
+                         **self.kwargs)
 
-                        else:
+    def _write_output(self, out_raster, output, i, j):
 
-                            out_raster.write_array(output[0],
-                                                   i=i,
-                                                   j=j,
-                                                   band=1)
+        """Writes the output of one block and stores the other results"""
 
-                    # Get the other results.
-                    for ri in range(1, len(output)):
+        if isinstance(output, tuple):
 
-                        # self.kwargs[self.out_attributes[ri-1]] = output[ri]
+            if self.write_array:
 
-                        if self.out_attributes[ri-1] not in self.out_attributes_dict:
-                            self.out_attributes_dict[self.out_attributes[ri-1]] = [output[ri]]
-                        else:
-                            self.out_attributes_dict[self.out_attributes[ri-1]].append(output[ri])
+                if output[0].shape[0] > 1:
+
+                    for obi, obb in enumerate(output[0]):
+
+                        out_raster.write_array(obb,
+                                               i=i,
+                                               j=j,
+                                               band=obi + 1)
+
+                else:
+
+                    out_raster.write_array(output[0],
+                                           i=i,
+                                           j=j,
+                                           band=1)
+
+            # Get the other results.
+            for ri in range(1, len(output)):
 
+                if self.out_attributes[ri-1] not in self.out_attributes_dict:
+                    self.out_attributes_dict[self.out_attributes[ri-1]] = [output[ri]]
                 else:
+                    self.out_attributes_dict[self.out_attributes[ri-1]].append(output[ri])
+
+        else:
+
+            if self.write_array:
+
+                if len(output.shape) > 2:
+
+                    for obi, obb in enumerate(output):
+
+                        out_raster.write_array(obb,
+                                               i=i,
+                                               j=j,
+                                               band=obi+1)
+
+                else:
+
+                    out_raster.write_array(output,
+                                           i=i,
+                                           j=j,
+                                           band=1)
+
+    def _threaded_blocks(self):
+
+        """
+        Yields (block, output) pairs, in block order, from a thread pool
+
+        Each worker thread reads through its own ``ropen`` instances (i.e., its own GDAL
+        handles). At most 2 x ``n_jobs`` blocks are in flight at once.
+        """
+
+        thread_data = threading.local()
+        thread_infos = list()
+        thread_lock = threading.Lock()
+
+        def _open_images():
+
+            if not hasattr(thread_data, 'image_infos'):
+
+                thread_data.image_infos = [ropen(image_info if isinstance(image_info, str) else image_info.file_name)
+                                           for image_info in self.image_infos]
+
+                with thread_lock:
+                    thread_infos.append(thread_data.image_infos)
+
+            return thread_data.image_infos
+
+        def _worker(block):
+            return self._process_block(_open_images(), block)
+
+        pool = ThreadPool(processes=self.n_jobs)
+
+        pending = deque()
+
+        try:
+
+            for block in self._get_blocks():
+
+                pending.append((block, pool.apply_async(_worker, (block,))))
+
+                if len(pending) >= 2 * self.n_jobs:
+
+                    block, result = pending.popleft()
+
+                    yield block, result.get()
+
+            while pending:
+
+                block, result = pending.popleft()
+
+                yield block, result.get()
+
+            pool.close()
+
+        except:
+
+            pool.terminate()
+            raise
+
+        finally:
+
+            pool.join()
+
+            for image_infos in thread_infos:
+
+                for image_info in image_infos:
+                    image_info.close()
+
+    def _process_blocks(self):
 
-                    if self.write_array:
+        """
+        Processes the blocks, with ``n_jobs`` threads if ``n_jobs`` > 1
 
-                        if len(output.shape) > 2:
+        The outputs are written by the calling thread, in block order.
+        """
 
-                            for obi, obb in enumerate(output):
+        if not self.proc_info:
 
-                                out_raster.write_array(obb,
-                                                       i=i,
-                                                       j=j,
-                                                       band=obi+1)
+            if isinstance(self.image_infos[0], str):
+                self.proc_info = ropen(self.image_infos[0])
+            else:
+                self.proc_info = self.image_infos[0]
 
-                        else:
+        if self.write_array:
 
-                            out_raster.write_array(output,
-                                                   i=i,
-                                                   j=j,
-                                                   band=1)
+            out_raster = create_raster(self.out_image,
+                                       self.out_info,
+                                       bigtiff=self.bigtiff)
 
-                if not self.be_quiet:
+        else:
+            out_raster = None
 
-                    pbar.update(ctr)
-                    ctr += 1
+        if isinstance(self.print_statement, str):
+            logger.info(self.print_statement)
+
+        # Rasterize the mask once.
+        if isinstance(self.mask_file, str):
+            self._rasterize_mask()
+
+        # set widget and pbar
+        if not self.be_quiet:
+            ctr, pbar = _iteration_parameters(self.proc_info.rows, self.proc_info.cols,
+                                              self.block_rows, self.block_cols)
+
+        if self.n_jobs in [0, 1]:
+            block_outputs = ((block, self._process_block(self.image_infos, block)) for block in self._get_blocks())
+        else:
+            block_outputs = self._threaded_blocks()
+
+        output = None
+
+        for block, block_output in block_outputs:
+
+            if block_output is None:
+                continue
+
+            output = block_output
+
+            self._write_output(out_raster, output, block[0], block[1])
+
+            if not self.be_quiet:
+
+                pbar.update(ctr)
+                ctr += 1
 
         if self.out_attributes_dict:
 
@@ -3425,12 +3626,16 @@ class BlockFunc(object):
         if not self.be_quiet:
             pbar.finish()
 
+        self.mask_array = None
+
         if isinstance(self.out_image, str):
 
             if self.close_files:
 
                 for imi in range(0, len(self.image_infos)):
-                    self.image_infos[imi].close()
+
+                    if not isinstance(self.image_infos[imi], str):
+                        self.image_infos[imi].close()
 
                 self.out_info.close()
 
@@ -3450,6 +3655,40 @@ class BlockFunc(object):
                             'LR': [adj_right, adj_bottom]}
 
 
+def _stack_predictions(band_arrays, rows, cols, d_type, n_bands=None):
+
+    """
+    Stacks band arrays into the Scikit-learn prediction shape (i.e., samples x dimensions)
+
+    Each band is copied once, directly into the output array.
+
+    Args:
+        band_arrays (list or iterator): The 2d band arrays. Empty (None or 0d) arrays are filled with zeros.
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        d_type (str): The output data type.
+        n_bands (Optional[int]): The number of bands, required if `band_arrays` is an iterator.
+
+    Returns:
+        A 2d array, shaped [rows*cols x bands]
+    """
+
+    if n_bands is None:
+        n_bands = len(band_arrays)
+
+    stacked_array = np.empty((rows*cols, n_bands), dtype=d_type)
+
+    for bi, band_array in enumerate(band_arrays):
+
+        # Check for empty images.
+        if isinstance(band_array, np.ndarray) and band_array.shape:
+            stacked_array[:, bi] = band_array.ravel()
+        else:
+            stacked_array[:, bi] = 0
+
+    return stacked_array
+
+
 def _read_parallel(image, image_info, bands2open, y, x, rows2open, columns2open, n_jobs, d_type, predictions):
 
     """
@@ -3498,15 +3737,7 @@ def _read_parallel(image, image_info, bands2open, y, x, rows2open, columns2open,
                                           for band2open in bands2open)
 
     if predictions:
-
-        # Check for empty images.
-        band_arrays = [b_ if b_.shape else np.zeros((rows2open, columns2open), dtype=d_type) for b_ in band_arrays]
-
-        return np.array(band_arrays,
-                        dtype=d_type).reshape(len(bands2open),
-                                              rows2open,
-                                              columns2open).transpose(1, 2, 0).reshape(rows2open*columns2open,
-                                                                                       len(bands2open))
+        return _stack_predictions(band_arrays, rows2open, columns2open, d_type)
 
     else:
         return np.array(band_arrays, dtype=d_type).reshape(len(bands2open), rows2open, columns2open)
@@ -3680,23 +3911,25 @@ def read(image2open=None,
 
         if n_jobs in [0, 1]:
 
+            if predictions:
+
+                return _stack_predictions((i_info.datasource.GetRasterBand(band).ReadAsArray(j, i, ccols, rrows)
+                                           for band in bands2open),
+                                          rrows,
+                                          ccols,
+                                          d_type,
+                                          n_bands=len(bands2open))
+
             values = np.asarray([i_info.datasource.GetRasterBand(band).ReadAsArray(j, i, ccols, rrows)
                                  for band in bands2open], dtype=d_type)
 
             # values = struct.unpack('%d%s' % ((rows * cols * len(bands2open)), format_dict[i_info.storage.lower()]),
             #                        i_info.datasource.ReadRaster(yoff=i, xoff=j, xsize=cols, ysize=rows, band_list=bands2open))
 
-            if predictions:
-
-                return values.reshape(len(bands2open), rrows, ccols).transpose(1, 2, 0).reshape(rrows*ccols,
-                                                                                                len(bands2open))
-
+            if len(bands2open) == 1:
+                return values.reshape(rrows, ccols)
             else:
-
-                if len(bands2open) == 1:
-                    return values.reshape(rrows, ccols)
-                else:
-                    return values.reshape(len(bands2open), rrows, ccols)
+                return values.reshape(len(bands2open), rrows, ccols)
 
             # only close the image if it was opened internally
             # if isinstance(image2open, str):
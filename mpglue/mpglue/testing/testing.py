@@ -1,11 +1,19 @@
 #!/usr/bin/env python
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from mpglue import raster_tools
 from mpglue.data import landsat_gtiff, landsat_vrt
+from mpglue.classification._forest import FlatForest
+from mpglue.classification.sample_store import SampleStore, convert_samples, write_samples
+from mpglue.classification.ts_features import TimeSeriesFeatures
 
 import numpy as np
+import pandas as pd
+from sklearn import ensemble
 
 
 def _test_array(image, dtype='float64'):
@@ -111,5 +119,177 @@ class TestUM(unittest.TestCase):
         self.assertEqual(_test_object(landsat_vrt)[2], 235)
 
 
+class TestOccupancyIndex(unittest.TestCase):
+
+    def test_band_index(self):
+        """Test the empty block checks of a band occupancy index"""
+        with raster_tools.ropen(landsat_gtiff) as l_info:
+            occupancy_index = raster_tools.OccupancyIndex(l_info, cell_size=16)
+            rows = l_info.rows
+            cols = l_info.cols
+        l_info = None
+        self.assertEqual(occupancy_index.occupied.shape, (int(np.ceil(rows / 16.)), int(np.ceil(cols / 16.))))
+        for i, j, n_rows, n_cols in [(0, 0, rows, cols), (0, 0, 16, 16), (17, 33, 40, 25), (rows-5, cols-5, 5, 5)]:
+            cells = occupancy_index.occupied[i // 16:(i + n_rows + 15) // 16, j // 16:(j + n_cols + 15) // 16]
+            self.assertEqual(occupancy_index.is_empty(i, j, n_rows, n_cols), not cells.any())
+        self.assertTrue(occupancy_index.is_empty(rows, cols, 16, 16))
+
+
+def _block_sum(image_arrays):
+    return image_arrays[0].sum(axis=0)
+
+
+class TestBlockFunc(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def test_threaded_blocks(self):
+        """Test that threaded blocks give the same image as serial blocks"""
+        out_images = list()
+        for n_jobs in [1, 2, -1]:
+            out_image = os.path.join(self.out_dir, 'block_sum_{:d}.tif'.format(n_jobs))
+            with raster_tools.ropen(landsat_gtiff) as l_info:
+                o_info = l_info.copy()
+                o_info.update_info(bands=1, storage='float32')
+                bp = raster_tools.BlockFunc(_block_sum,
+                                            [l_info],
+                                            out_image,
+                                            o_info,
+                                            band_list=[list(range(1, l_info.bands+1))],
+                                            d_types=['float32'],
+                                            block_rows=64,
+                                            block_cols=48,
+                                            be_quiet=True,
+                                            n_jobs=n_jobs)
+                bp.run()
+            l_info = None
+            out_images.append(_test_array(out_image, dtype='float32'))
+        self.assertFalse(os.path.isdir(os.path.join(self.out_dir, 'temp')))
+        self.assertTrue(np.array_equal(out_images[0], out_images[1]))
+        self.assertTrue(np.array_equal(out_images[0], out_images[2]))
+        self.assertTrue(np.allclose(out_images[0], _test_array(landsat_gtiff, dtype='float32').sum(axis=0)))
+
+
+def _test_forest(model):
+
+    rng = np.random.RandomState(0)
+
+    X = rng.randn(2000, 20).astype('float32')
+    y = np.int64(X[:, 0] + X[:, 1] ** 2 > 1) + np.int64(X[:, 2] > 0.5) * 2 + 1
+
+    model.fit(X, y)
+
+    X_test = rng.randn(5000, 20).astype('float32')
+
+    return model, FlatForest(model, n_jobs=4), X_test
+
+
+class TestFlatForest(unittest.TestCase):
+
+    def test_rf_probas(self):
+        """Test the flat Random Forest probabilities"""
+        model, flat_model, X_test = _test_forest(ensemble.RandomForestClassifier(n_estimators=50,
+                                                                                 max_depth=25,
+                                                                                 min_samples_leaf=5,
+                                                                                 random_state=0))
+        self.assertTrue(np.array_equal(flat_model.predict_proba(X_test), model.predict_proba(X_test)))
+
+    def test_extra_trees_probas(self):
+        """Test the flat Extra Trees probabilities"""
+        model, flat_model, X_test = _test_forest(ensemble.ExtraTreesClassifier(n_estimators=20,
+                                                                               random_state=0))
+        self.assertTrue(np.array_equal(flat_model.predict_proba(X_test), model.predict_proba(X_test)))
+
+    def test_rf_labels(self):
+        """Test the flat Random Forest labels"""
+        model, flat_model, X_test = _test_forest(ensemble.RandomForestClassifier(n_estimators=50,
+                                                                                 random_state=0))
+        self.assertTrue(np.array_equal(flat_model.predict(X_test), model.predict(X_test)))
+
+
+class TestTimeSeriesFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.X = np.random.RandomState(0).uniform(.05, 1, size=(600, 30)).astype('float32')
+        self.ts_features = TimeSeriesFeatures()
+        self.ts_features.add_features(['ninety_five', 'mean', 'five', 'fifty_cumulative', 'cv', 'fifty'])
+
+    def test_features(self):
+        """Test the time series features against their separate computations"""
+        features = self.ts_features.apply_features(X=self.X, append_features=False)
+        self.assertEqual(features.shape, (600, 6))
+        self.assertTrue(np.array_equal(self.ts_features.apply_features(X=self.X)[:, 30:], features))
+        self.assertTrue(np.allclose(features[:, 0], np.percentile(self.X, 95, axis=1)))
+        self.assertTrue(np.allclose(features[:, 1], self.X.mean(axis=1)))
+        self.assertTrue(np.allclose(features[:, 2], np.percentile(self.X, 5, axis=1)))
+        self.assertTrue(np.allclose(features[:, 3], self.X.cumsum(axis=1)[:, 15]))
+        self.assertTrue(np.allclose(features[:, 4], self.X.std(axis=1) / self.X.mean(axis=1)))
+        self.assertTrue(np.allclose(features[:, 5], np.median(self.X, axis=1)))
+
+    def test_block(self):
+        """Test the block time series features"""
+        X = self.X.copy()
+        X[3, 10] = np.nan
+        block = np.ascontiguousarray(X.T.reshape(30, 20, 30))
+        features = self.ts_features.apply_features(X=X, append_features=False)
+        for n_jobs in [1, 2]:
+            block_features = self.ts_features.apply_block(block, n_jobs=n_jobs)
+            self.assertEqual(block_features.dtype, np.float32)
+            self.assertTrue(np.allclose(block_features, features.T.reshape(6, 20, 30), rtol=1e-5))
+        self.assertEqual(block_features[:, 0, 3].tolist(), [0, 0, 0, 0, 0, 0])
+
+
+def _test_samples():
+
+    rng = np.random.RandomState(0)
+
+    n_samples = 500
+
+    headers = ['Id', 'X', 'Y'] + ['image.{:d}'.format(b) for b in range(1, 6)] + ['response']
+
+    values = np.c_[np.arange(n_samples),
+                   rng.uniform(300000, 400000, size=(n_samples, 2)),
+                   np.float32(rng.uniform(0, 1, size=(n_samples, 5))),
+                   rng.randint(1, 5, size=n_samples)]
+
+    return headers, values
+
+
+class TestSampleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+        self.headers, self.values = _test_samples()
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def test_write(self):
+        """Test writing and reading a sample store"""
+        store_file = os.path.join(self.out_dir, 'test_SAMPLES.smp')
+        write_samples(store_file,
+                      self.values[:, 0], self.values[:, 1], self.values[:, 2], self.values[:, 3:],
+                      self.headers)
+        store = SampleStore(store_file)
+        self.assertEqual(store.headers, self.headers)
+        self.assertTrue(np.array_equal(store.ids, self.values[:, 0]))
+        self.assertTrue(np.array_equal(store.x, self.values[:, 1]))
+        self.assertTrue(np.array_equal(store.values, np.float32(self.values[:, 3:])))
+
+    def test_convert(self):
+        """Test converting a text samples file to a sample store"""
+        text_file = os.path.join(self.out_dir, 'test_SAMPLES.txt')
+        pd.DataFrame(self.values, columns=self.headers).to_csv(text_file, sep=',', index=False)
+        store = SampleStore(convert_samples(text_file))
+        df = pd.read_csv(text_file, sep=',')
+        self.assertEqual(store.headers, df.columns.tolist())
+        self.assertTrue(np.array_equal(store.y, df['Y'].values))
+        self.assertTrue(np.array_equal(store.values, np.float32(df.iloc[:, 3:].values)))
+
+
 if __name__ == '__main__':
     unittest.main()
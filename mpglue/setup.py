@@ -87,6 +87,7 @@ def get_console_dict():
     return {'console_scripts': ['change=mpglue.classification.change:main',
                                 'classify=mpglue.classification.classify:main',
                                 'sample-raster=mpglue.classification.sample_raster:main',
+                                'sample-store=mpglue.classification.sample_store:main',
                                 'reclassify=mpglue.classification.reclassify:main',
                                 'recode=mpglue.classification.recode:main',
                                 'raster-calc=mpglue.raster_calc:main',
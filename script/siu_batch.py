@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+This script classifies every region/city/year scene with a trained model, running
+the features, sampling and classification stages of all scenes from one CPU budget
+
+Scenes are read from <mosaics-dir>/<region>/<city>/<year>.tif and sampled with
+<samples-dir>/<region>/<city>/<year>.shp. Results go to <output-dir>/<region>/<city>/<year>,
+with the same layout as siu_test.py. The largest scenes are scheduled first, and a
+per-scene throughput report is written to <output-dir>/batch_report.csv.
+
+"""
+import os
+import csv
+import time
+
+import rasterio
+
+from make_plots import CITIES
+from siu_pipeline import Pipeline, add_test_stages
+
+
+YEARS = ['2015', '2016', '2017', '2018']
+
+
+def get_scenes(args):
+    scenes = []
+    cities = args.cities if args.cities else sorted(CITIES)
+    for city in cities:
+        for year in args.years:
+            scene = '{}/{}'.format(city, year)
+            tif = os.path.join(args.mosaics_dir, city, '{}.tif'.format(year))
+            shp = os.path.join(args.samples_dir, city, '{}.shp'.format(year))
+            if not os.path.isfile(tif) or not os.path.isfile(shp):
+                print("skip", scene, "(missing image or samples)")
+                continue
+            with rasterio.open(tif) as src:
+                pixels = src.width * src.height
+            scenes.append(dict(scene=scene, tif=tif, shp=shp, pixels=pixels,
+                               output=os.path.join(args.output_dir, city, year)))
+    # Largest scenes first, so they do not end up running alone at the end
+    return sorted(scenes, key=lambda s: s['pixels'], reverse=True)
+
+
+def report(pipeline, status, scenes, output_path):
+    rows = []
+    for scene in scenes:
+        names = [n for n in status if n.startswith(scene['scene'] + ':')]
+        timings = [pipeline.timings[n] for n in names if n in pipeline.timings]
+        states = sorted(set(status[n] for n in names))
+        if timings:
+            seconds = max(t[1] for t in timings) - min(t[0] for t in timings)
+        else:
+            seconds = 0.0
+        mpixels = scene['pixels'] / 1e6
+        rows.append([scene['scene'], '{:.2f}'.format(mpixels), '{:.1f}'.format(seconds),
+                     '{:.4f}'.format(mpixels / seconds) if seconds > 0 else '',
+                     '-'.join(states)])
+    header = ['scene', 'megapixels', 'seconds', 'megapixels_per_second', 'status']
+    print()
+    print('{:<28} {:>10} {:>10} {:>10}  {}'.format(*['scene', 'Mpx', 'seconds', 'Mpx/s', 'status']))
+    for row in rows:
+        print('{:<28} {:>10} {:>10} {:>10}  {}'.format(*row))
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    print("{} written".format(output_path))
+
+
+def main(args):
+    scenes = get_scenes(args)
+    if not scenes:
+        print("no scenes to process")
+        return
+    pipeline = Pipeline(cpus=args.cpus, keep_going=True)
+    for scene in scenes:
+        add_test_stages(pipeline, scene['tif'], scene['shp'], args.model,
+                        scene['output'], args.jobs, args.trees,
+                        args.max_depth, scene=scene['scene'])
+    start_time = time.time()
+    failed = None
+    try:
+        pipeline.run()
+    except RuntimeError as e:
+        failed = e
+    print("total time: {:.1f}s".format(time.time() - start_time))
+    report(pipeline, pipeline.status, scenes,
+           os.path.join(args.output_dir, 'batch_report.csv'))
+    if failed:
+        raise failed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Classify all region/city/year scenes with a trained model',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('model', help='path to the trained model (siu_train.py)')
+    parser.add_argument('trees', type=int, help='RF trees')
+    parser.add_argument('max_depth', type=int, help='RF max depth')
+    parser.add_argument('--mosaics-dir',
+                        default=os.path.join('data', 'conae', '_mosaicos'),
+                        help='path to scene mosaics dir')
+    parser.add_argument('--samples-dir',
+                        default=os.path.join('data', 'muestras'),
+                        help='path to test points shapefiles dir')
+    parser.add_argument('-o',
+                        '--output-dir',
+                        default=os.path.join('data', 'resultados'),
+                        help='path to output dir')
+    parser.add_argument('--cities', nargs='+', choices=sorted(CITIES),
+                        help='only process specific region/city')
+    parser.add_argument('--years', nargs='+', default=YEARS,
+                        help='years to process')
+    parser.add_argument('--cpus', type=int, default=0,
+                        help='total CPU budget shared by all scenes (0 = all)')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='parallel jobs of each stage')
+
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,548 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A small pipeline runner for the features -> sampling -> training -> classification chain
+
+Each stage is keyed by a hash of its parameters, the signatures (path, size, mtime) of
+its external input files and the keys of the stages it depends on. The key is written
+to a stamp file next to the stage output once the stage finishes, so a stage only
+reruns when something upstream changed, and a partial output (no stamp) is never reused.
+
+Stages call the spfeas and mpglue APIs directly. Each stage runs in its own child
+process (both libraries keep module-level state), and independent stages run
+concurrently as long as the sum of their jobs fits in the CPU budget.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import traceback
+import multiprocessing
+
+
+STAMP_EXT = '.stage.json'
+
+# Keyword arguments that only control resources and do not change a stage output
+RESOURCE_KWARGS = ['n_jobs']
+
+FEATURE_TRIGGERS = ['fourier', 'dmp', 'pantex', 'lbpm', 'gabor', 'hog', 'lac', 'ndvi', 'mean']
+FEATURE_BANDS = [1, 2, 3, 4]
+FEATURE_BLOCK = 8
+FEATURE_SCALES = [8, 16]
+
+
+def _feature_tag():
+
+    return 'BD{BD}_BK{BK}_SC{SC}_TR{TR}'.format(BD='-'.join(map(str, FEATURE_BANDS)),
+                                                 BK=FEATURE_BLOCK,
+                                                 SC='-'.join(map(str, FEATURE_SCALES)),
+                                                 TR='-'.join(FEATURE_TRIGGERS))
+
+
+def _base_name(file_name):
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def _file_signature(file_name):
+
+    """
+    Returns the (path, size, mtime) signature of a file, including the sidecar
+    files of a shapefile
+    """
+
+    if file_name.lower().endswith('.shp'):
+
+        base = os.path.splitext(file_name)[0]
+
+        file_names = [base + ext for ext in ['.shp', '.shx', '.dbf', '.prj'] if os.path.isfile(base + ext)]
+
+    else:
+        file_names = [file_name]
+
+    signature = list()
+
+    for fn in file_names:
+
+        st = os.stat(fn)
+
+        signature.append([os.path.abspath(fn), st.st_size, int(st.st_mtime)])
+
+    return signature
+
+
+class Stage(object):
+
+    """
+    A pipeline stage
+
+    Args:
+        name (str): The stage name.
+        func (object): The function to call.
+        kwargs (dict): The keyword arguments of ``func``. They are part of the stage key.
+        outputs (str list): The files written by the stage.
+        inputs (Optional[str list]): External input files (not written by another stage).
+        deps (Optional[Stage list]): The stages that must finish first.
+        cpus (Optional[int]): The number of CPUs the stage uses. If less than 1, the stage uses the whole budget.
+    """
+
+    def __init__(self, name, func, kwargs, outputs, inputs=None, deps=None, cpus=1):
+
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+        self.outputs = outputs
+        self.inputs = inputs if inputs else list()
+        self.deps = deps if deps else list()
+        self.cpus = cpus
+
+        self.key = None
+
+    @property
+    def stamp_file(self):
+        return self.outputs[0] + STAMP_EXT
+
+    def get_key(self):
+
+        """Returns the hash of the stage parameters, inputs and upstream keys"""
+
+        for input_file in self.inputs:
+
+            if not os.path.exists(input_file):
+
+                print('=>    Falta {}'.format(input_file))
+                raise IOError('{} does not exist.'.format(input_file))
+
+        key_dict = dict(func='{}.{}'.format(self.func.__module__, self.func.__name__),
+                        kwargs=dict([(k, v) for k, v in self.kwargs.items() if k not in RESOURCE_KWARGS]),
+                        inputs=[_file_signature(fn) for fn in self.inputs],
+                        deps=[dep.key for dep in self.deps])
+
+        return hashlib.sha1(json.dumps(key_dict, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def is_current(self):
+
+        """Checks whether all outputs exist and were written with the current key"""
+
+        if not all([os.path.exists(fn) for fn in self.outputs]) or not os.path.isfile(self.stamp_file):
+            return False
+
+        with open(self.stamp_file, 'r') as sf:
+
+            try:
+                return json.load(sf).get('key') == self.key
+            except ValueError:
+                return False
+
+    def write_stamp(self):
+
+        temp_file = self.stamp_file + '.tmp'
+
+        with open(temp_file, 'w') as sf:
+            json.dump(dict(stage=self.name, key=self.key, kwargs=self.kwargs, time=time.time()), sf, default=str)
+
+        os.replace(temp_file, self.stamp_file)
+
+    def remove_stamp(self):
+
+        if os.path.isfile(self.stamp_file):
+            os.remove(self.stamp_file)
+
+
+def _run_stage(func, kwargs):
+
+    try:
+        func(**kwargs)
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+
+class Pipeline(object):
+
+    """
+    Runs stages in dependency order, concurrently under a CPU budget
+
+    Args:
+        cpus (Optional[int]): The CPU budget. Default is the machine CPU count.
+        poll (Optional[float]): The number of seconds between checks on running stages.
+        keep_going (Optional[bool]): Whether to keep running the stages that do not depend on a failed stage.
+    """
+
+    def __init__(self, cpus=None, poll=1.0, keep_going=False):
+
+        self.cpus = cpus if cpus and (cpus > 0) else multiprocessing.cpu_count()
+        self.poll = poll
+        self.keep_going = keep_going
+
+        self.stages = list()
+        self.status = dict()
+        self.timings = dict()
+
+    def add(self, stage):
+
+        """Adds a stage and returns it"""
+
+        for dep in stage.deps:
+
+            if dep not in self.stages:
+                raise ValueError('The stage {} depends on {}, which was not added.'.format(stage.name, dep.name))
+
+        self.stages.append(stage)
+
+        return stage
+
+    def _stage_cpus(self, stage):
+        return min(stage.cpus, self.cpus) if stage.cpus > 0 else self.cpus
+
+    def run(self):
+
+        """
+        Runs the stages that are not current
+
+        Returns:
+            A dictionary of stage name -> 'current', 'done', 'failed' or 'skipped'
+        """
+
+        status = self.status = dict()
+
+        # Stages are added after their dependencies, so keys can be resolved in order.
+        for stage in self.stages:
+            stage.key = stage.get_key()
+
+        for stage in self.stages:
+
+            if stage.is_current():
+
+                print('=>    {}: ya generado'.format(stage.name))
+                status[stage.name] = 'current'
+
+        pending = [stage for stage in self.stages if stage.name not in status]
+        running = dict()
+        failed = False
+
+        while pending or running:
+
+            # Start every ready stage that fits in the CPU budget.
+            cpus_used = sum([self._stage_cpus(stage) for stage in running])
+
+            for stage in list(pending):
+
+                if failed and not self.keep_going:
+                    break
+
+                dep_status = [status.get(dep.name) for dep in stage.deps]
+
+                if any([s in ['failed', 'skipped'] for s in dep_status]):
+
+                    status[stage.name] = 'skipped'
+                    pending.remove(stage)
+                    continue
+
+                if not all([s in ['current', 'done'] for s in dep_status]):
+                    continue
+
+                stage_cpus = self._stage_cpus(stage)
+
+                if running and (cpus_used + stage_cpus > self.cpus):
+                    continue
+
+                print('=>    {}: iniciando ({:d} cpus)'.format(stage.name, stage_cpus))
+
+                stage.remove_stamp()
+
+                for output in stage.outputs:
+
+                    output_dir = os.path.dirname(output)
+
+                    if output_dir and not os.path.isdir(output_dir):
+                        os.makedirs(output_dir)
+
+                process = multiprocessing.Process(target=_run_stage, args=(stage.func, stage.kwargs))
+                process.start()
+
+                running[stage] = (process, time.time())
+                cpus_used += stage_cpus
+                pending.remove(stage)
+
+            if failed and not self.keep_going:
+
+                for stage in pending:
+                    status[stage.name] = 'skipped'
+
+                pending = list()
+
+            if not running:
+
+                if pending:
+
+                    # Nothing can start, so the remaining stages wait on stages that never ran.
+                    for stage in pending:
+                        status[stage.name] = 'skipped'
+
+                    pending = list()
+
+                break
+
+            for stage, (process, start_time) in list(running.items()):
+
+                process.join(self.poll / len(running))
+
+                if process.is_alive():
+                    continue
+
+                del running[stage]
+
+                missing = [fn for fn in stage.outputs if not os.path.exists(fn)]
+
+                if (process.exitcode == 0) and not missing:
+
+                    stage.write_stamp()
+                    status[stage.name] = 'done'
+                    self.timings[stage.name] = (start_time, time.time())
+
+                    print('=>    {}: terminado ({:.1f}s)'.format(stage.name, time.time() - start_time))
+
+                else:
+
+                    status[stage.name] = 'failed'
+                    failed = True
+
+                    print('=>    {}: fallo (codigo {}, faltan {})'.format(stage.name, process.exitcode, missing))
+
+        if failed:
+            raise RuntimeError('Failed stages: {}'.format(', '.join([k for k, v in status.items() if v == 'failed'])))
+
+        return status
+
+
+def compute_features(tif, out_dir, n_jobs):
+
+    from spfeas import spatial_features
+
+    spatial_features(tif,
+                     out_dir,
+                     triggers=FEATURE_TRIGGERS,
+                     band_positions=FEATURE_BANDS,
+                     block=FEATURE_BLOCK,
+                     scales=FEATURE_SCALES,
+                     stack=True,
+                     n_jobs=n_jobs)
+
+
+def sample_features(shp, vrt, out_dir, n_jobs):
+
+    from mpglue.classification.sample_raster import sample_raster
+
+    sample_raster(shp, vrt, out_dir=out_dir, n_jobs=n_jobs)
+
+
+def _classifier(samples, classifier_info, input_model=None, output_model=None):
+
+    from mpglue.classification.classify import Classify
+
+    clo = Classify()
+
+    # The same sample split as the ``classify`` defaults
+    clo.split(samples,
+              perc_samp=0.9,
+              perc_samp_each=0.0,
+              classes2remove=list(),
+              sample_weight=list(),
+              ignore_feas=list())
+
+    clo.construct(input_model=input_model,
+                  output_model=output_model,
+                  classifier_info=classifier_info)
+
+    return clo
+
+
+def train_model(samples, model, classifier_info):
+    _classifier(samples, classifier_info, output_model=model)
+
+
+def classify_image(vrt, output_image, samples, input_model, classifier_info, n_jobs, output_model=None):
+
+    clo = _classifier(samples, classifier_info, input_model=input_model, output_model=output_model)
+
+    clo.predict(vrt,
+                output_image,
+                ignore_feas=list(),
+                in_model=input_model,
+                background_band=2,
+                row_block_size=1024,
+                col_block_size=1024,
+                n_jobs=n_jobs,
+                n_jobs_vars=n_jobs)
+
+
+def _stage_name(name, scene):
+    return '{}:{}'.format(scene, name) if scene else name
+
+
+def add_scene_stages(pipeline, tif, shp, features_dir, sampling_dir, n_jobs, suffix, scene=None):
+
+    """
+    Adds the feature and sampling stages of a scene
+
+    Args:
+        pipeline (Pipeline)
+        tif (str): The image to compute features on.
+        shp (str): The points shapefile to sample.
+        features_dir (str): The feature output directory.
+        sampling_dir (str): The samples output directory.
+        n_jobs (int): The number of parallel jobs.
+        suffix (str): The stage name suffix (e.g., 'train').
+        scene (Optional[str]): A scene name to prefix the stage names with, for pipelines with several scenes.
+
+    Returns:
+        The feature stage and the sampling stage
+    """
+
+    tag = _feature_tag()
+
+    vrt = os.path.join(features_dir, '{}__{}.vrt'.format(_base_name(tif), tag))
+
+    samples = os.path.join(sampling_dir,
+                           '{}_points__{}__{}_SAMPLES.txt'.format(_base_name(shp), _base_name(tif), tag))
+
+    features = pipeline.add(Stage(_stage_name('features_{}'.format(suffix), scene),
+                                  compute_features,
+                                  dict(tif=os.path.abspath(tif), out_dir=features_dir, n_jobs=n_jobs),
+                                  [vrt],
+                                  inputs=[tif],
+                                  cpus=n_jobs))
+
+    sampling = pipeline.add(Stage(_stage_name('sampling_{}'.format(suffix), scene),
+                                  sample_features,
+                                  dict(shp=os.path.abspath(shp), vrt=vrt, out_dir=sampling_dir, n_jobs=n_jobs),
+                                  [samples],
+                                  inputs=[shp],
+                                  deps=[features],
+                                  cpus=n_jobs))
+
+    return features, sampling
+
+
+def _classifier_info(trees, max_depth):
+    return {'classifier': 'rf', 'trees': int(trees), 'max_depth': int(max_depth)}
+
+
+def _run_name(output, trees, max_depth):
+    return '{}_rf_t{}_d{}'.format(os.path.basename(os.path.normpath(output)), trees, max_depth)
+
+
+def add_train_stages(pipeline, tif, shp, output, n_jobs, trees, max_depth):
+
+    """
+    Adds the stages of ``siu_train.py``: features, sampling, training and classification of the training scene
+
+    Args:
+        pipeline (Pipeline)
+        tif (str): The training image.
+        shp (str): The training points shapefile.
+        output (str): The output directory.
+        n_jobs (int): The number of parallel jobs.
+        trees (int): The number of Random Forest trees.
+        max_depth (int): The Random Forest maximum depth.
+
+    Returns:
+        The training stage
+    """
+
+    run_name = _run_name(output, trees, max_depth)
+    classifier_info = _classifier_info(trees, max_depth)
+
+    features, sampling = add_scene_stages(pipeline,
+                                          tif,
+                                          shp,
+                                          os.path.join(output, 'features_train'),
+                                          os.path.join(output, 'sampling_train'),
+                                          n_jobs,
+                                          'train')
+
+    vrt = features.outputs[0]
+    samples = sampling.outputs[0]
+
+    model = os.path.join(output, 'model_train_rf_t{}_d{}'.format(trees, max_depth), '{}.txt'.format(run_name))
+
+    training = pipeline.add(Stage('training',
+                                  train_model,
+                                  dict(samples=samples, model=model, classifier_info=classifier_info),
+                                  [model],
+                                  deps=[sampling],
+                                  cpus=n_jobs))
+
+    output_image = os.path.join(output,
+                                'clasificacion_train_rf_t{}_d{}'.format(trees, max_depth),
+                                '{}.tif'.format(run_name))
+
+    pipeline.add(Stage('clasificacion_train',
+                       classify_image,
+                       dict(vrt=vrt,
+                            output_image=output_image,
+                            samples=samples,
+                            input_model=model,
+                            classifier_info=classifier_info,
+                            n_jobs=n_jobs),
+                       [output_image],
+                       deps=[features, training],
+                       cpus=n_jobs))
+
+    return training
+
+
+def add_test_stages(pipeline, tif, shp, model, output, n_jobs, trees, max_depth, model_stage=None, scene=None):
+
+    """
+    Adds the stages of ``siu_test.py``: features, sampling and classification of a test scene
+
+    Args:
+        pipeline (Pipeline)
+        tif (str): The test image.
+        shp (str): The test points shapefile.
+        model (str): The trained model file.
+        output (str): The output directory.
+        n_jobs (int): The number of parallel jobs.
+        trees (int): The number of Random Forest trees.
+        max_depth (int): The Random Forest maximum depth.
+        model_stage (Optional[Stage]): The stage that writes ``model``, if it runs in the same pipeline.
+        scene (Optional[str]): A scene name to prefix the stage names with.
+
+    Returns:
+        The classification stage
+    """
+
+    run_name = _run_name(output, trees, max_depth)
+
+    features, sampling = add_scene_stages(pipeline,
+                                          tif,
+                                          shp,
+                                          os.path.join(output, 'features_test'),
+                                          os.path.join(output, 'sampling_test'),
+                                          n_jobs,
+                                          'test',
+                                          scene=scene)
+
+    output_image = os.path.join(output,
+                                'clasificacion_test_rf_t{}_d{}'.format(trees, max_depth),
+                                '{}.tif'.format(run_name))
+
+    output_model = os.path.join(output, 'model_test_rf_t{}_d{}'.format(trees, max_depth), '{}.txt'.format(run_name))
+
+    return pipeline.add(Stage(_stage_name('clasificacion_test', scene),
+                              classify_image,
+                              dict(vrt=features.outputs[0],
+                                   output_image=output_image,
+                                   samples=sampling.outputs[0],
+                                   input_model=os.path.abspath(model),
+                                   classifier_info=_classifier_info(trees, max_depth),
+                                   n_jobs=n_jobs,
+                                   output_model=output_model),
+                              [output_image],
+                              inputs=[] if model_stage else [model],
+                              deps=[features, sampling, model_stage] if model_stage else [features, sampling],
+                              cpus=n_jobs))
@@ -2,6 +2,7 @@
 
 import setuptools
 from distutils.core import setup
+from distutils.extension import Extension
 import platform
 
 from Cython.Build import cythonize
@@ -69,6 +70,29 @@ def get_pyx_list():
     return ['spfeas/sphelpers/*.pyx']
 
 
+def get_openmp_args():
+
+    """Returns the OpenMP compile and link arguments"""
+
+    if platform.system() == 'Windows':
+        return ['/openmp'], []
+    elif platform.system() == 'Darwin':
+        # Apple Clang does not ship OpenMP, so the kernels run single-threaded.
+        return [], []
+    else:
+        return ['-fopenmp'], ['-fopenmp']
+
+
+def get_extensions():
+
+    compile_args, link_args = get_openmp_args()
+
+    return [Extension('*',
+                      get_pyx_list(),
+                      extra_compile_args=compile_args,
+                      extra_link_args=link_args)]
+
+
 def get_package_data():
 
     return {'': ['*.md', '*.txt'],
@@ -101,7 +125,7 @@ def setup_package():
                     author=author_file,
                     packages=get_packages(),
                     package_data=get_package_data(),
-                    ext_modules=cythonize(get_pyx_list()),
+                    ext_modules=cythonize(get_extensions()),
                     include_dirs=[np.get_include()],
                     cmdclass=dict(build_ext=build_ext),
                     zip_safe=False,
@@ -1,5 +1,5 @@
 from .spfeas import spatial_features
-from .test_spfeas import test_features
+from .test_spfeas import test_features, test_integral_mean, test_fourier, test_pantex, test_lacunarity, test_gabor, test_dmp, test_lsr, test_points
 
 from .data import test_image, \
     training_01_4m, training_02_4m, training_03_4m, training_04_4m, training_05_4m, \
@@ -12,6 +12,14 @@ from .version import __version__
 
 __all__ = ['spatial_features',
            'test_features',
+           'test_integral_mean',
+           'test_fourier',
+           'test_pantex',
+           'test_lacunarity',
+           'test_gabor',
+           'test_dmp',
+           'test_lsr',
+           'test_points',
            'test_image',
            'training_01_4m',
            'training_02_4m',
@@ -0,0 +1,189 @@
+from __future__ import division
+
+import os
+import time
+
+from .errors import logger
+from .spfunctions import feature_mean_integral
+from .sphelpers import _stats
+from .sphelpers.gabor_filter_bank import filter_bank
+from .paths import get_path
+
+import mpglue as gl
+
+import numpy as np
+
+
+SPFEAS_PATH = get_path()
+
+
+def _load_test_band(d_type='float32'):
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type=d_type)
+
+    del i_info
+
+    return np.ascontiguousarray(band)
+
+
+def _time_func(func, n_runs, *args, **kwargs):
+
+    """Returns the best time (in seconds) of `n_runs` calls"""
+
+    run_times = list()
+
+    for run in range(0, n_runs):
+
+        start_time = time.time()
+
+        func(*args, **kwargs)
+
+        run_times.append(time.time() - start_time)
+
+    return min(run_times)
+
+
+def benchmark_mean(scales=None, block=4, n_runs=3):
+
+    """
+    Benchmarks the window and integral (summed-area table) mean engines on the test image
+
+    Args:
+        scales (Optional[list]): The scales to time. Default is [8, 16, 32, 64].
+        block (Optional[int]): The block size. Default is 4.
+        n_runs (Optional[int]): The number of runs per scale. Default is 3.
+
+    Returns:
+        A dictionary of {scale: (window seconds, integral seconds)}.
+    """
+
+    if not scales:
+        scales = [8, 16, 32, 64]
+
+    band = _load_test_band()
+
+    timings = dict()
+
+    logger.info('  Scale  Window (s)  Integral (s)')
+
+    for scale in scales:
+
+        window_time = _time_func(_stats.feature_mean, n_runs, band, block, [scale], scale)
+        integral_time = _time_func(feature_mean_integral, n_runs, band, block, [scale], scale)
+
+        timings[scale] = (window_time, integral_time)
+
+        logger.info('  {:5d}  {:10.3f}  {:12.3f}'.format(scale, window_time, integral_time))
+
+    return timings
+
+
+def benchmark_pantex(scales=None, block=4, n_runs=3):
+
+    """
+    Benchmarks the co-occurrence matrix and incremental PanTex engines on the test image
+
+    Args:
+        scales (Optional[list]): The scales to time. Default is [8, 16, 32, 64].
+        block (Optional[int]): The block size. Default is 4.
+        n_runs (Optional[int]): The number of runs per scale. Default is 3.
+
+    Returns:
+        A dictionary of {scale: (GLCM seconds, incremental seconds)}.
+    """
+
+    if not scales:
+        scales = [8, 16, 32, 64]
+
+    band = _load_test_band(d_type='byte')
+
+    timings = dict()
+
+    logger.info('  Scale  GLCM (s)  Incremental (s)')
+
+    for scale in scales:
+
+        glcm_time = _time_func(_stats.feature_pantex, n_runs, band, block, [scale], scale, False)
+        incremental_time = _time_func(_stats.feature_pantex_incremental, n_runs, band, block, [scale], scale, False)
+
+        timings[scale] = (glcm_time, incremental_time)
+
+        logger.info('  {:5d}  {:8.3f}  {:15.3f}'.format(scale, glcm_time, incremental_time))
+
+    return timings
+
+
+def benchmark_lacunarity(scales=None, block=4, r=2, n_runs=3):
+
+    """
+    Benchmarks the per-window and box raster lacunarity engines on the test image
+
+    Args:
+        scales (Optional[list]): The scales to time. Default is [8, 16, 32, 64].
+        block (Optional[int]): The block size. Default is 4.
+        r (Optional[int]): The box size. Default is 2.
+        n_runs (Optional[int]): The number of runs per scale. Default is 3.
+
+    Returns:
+        A dictionary of {scale: (window seconds, box raster seconds)}.
+    """
+
+    if not scales:
+        scales = [8, 16, 32, 64]
+
+    # The `lac` trigger input is scaled to 0-31.
+    band = np.ascontiguousarray(_load_test_band(d_type='byte') // 8)
+
+    timings = dict()
+
+    logger.info('  Scale  Window (s)  Box raster (s)')
+
+    for scale in scales:
+
+        window_time = _time_func(_stats.feature_lacunarity, n_runs, band, block, [scale], scale, r)
+        raster_time = _time_func(_stats.feature_lacunarity_boxes, n_runs, band, block, [scale], scale, r)
+
+        timings[scale] = (window_time, raster_time)
+
+        logger.info('  {:5d}  {:10.3f}  {:14.3f}'.format(scale, window_time, raster_time))
+
+    return timings
+
+
+def benchmark_gabor(scales=None, n_runs=3):
+
+    """
+    Benchmarks the spatial and frequency domain Gabor filter banks on the test image
+
+    Args:
+        scales (Optional[list]): The scales to time. Default is [8, 16, 32, 64].
+        n_runs (Optional[int]): The number of runs per scale. Default is 3.
+
+    Returns:
+        A dictionary of {scale: (spatial seconds, FFT seconds)}.
+    """
+
+    if not scales:
+        scales = [8, 16, 32, 64]
+
+    band = _load_test_band(d_type='byte')
+
+    timings = dict()
+
+    logger.info('  Scale  Spatial (s)  FFT (s)')
+
+    for scale in scales:
+
+        spatial_time = _time_func(filter_bank, n_runs, band, [scale], fft_size=None)
+        fft_time = _time_func(filter_bank, n_runs, band, [scale])
+
+        timings[scale] = (spatial_time, fft_time)
+
+        logger.info('  {:5d}  {:11.3f}  {:7.3f}'.format(scale, spatial_time, fft_time))
+
+    return timings
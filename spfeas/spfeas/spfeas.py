@@ -17,6 +17,7 @@ import copy
 
 from .errors import logger
 from . import spprocess
+from . import sppoints
 from .sphelpers.sputilities import set_yaml_file
 
 from mpglue.raster_tools import DRIVER_DICT
@@ -75,6 +76,10 @@ class SPParameters(object):
                               stack_only=False,
                               neighbors=False,
                               n_jobs=-1,
+                              fused=False,
+                              n_threads=1,
+                              mean_engine='window',
+                              status_backend='sqlite',
                               reset=False,
                               image_min=-999.0,
                               image_max=-999.0,
@@ -82,7 +87,13 @@ class SPParameters(object):
                               section_size=1000,
                               gdal_cache=256,
                               overwrite=False,
-                              overviews=False)
+                              overviews=False,
+                              mosaic='vrt',
+                              tile_block=256,
+                              aoi_file=None,
+                              skip_empty=False,
+                              points=None,
+                              points_class='Id')
 
         # Set the features dictionary.
         self.features_dict = dict(ctr=1,
@@ -237,7 +248,11 @@ class SPParameters(object):
             setattr(self, k, v)
 
     def run(self):
-        spprocess.run(self)
+
+        if self.points:
+            sppoints.sample_points(self)
+        else:
+            spprocess.run(self)
         
 
 def spatial_features(input_image, output_dir, **kwargs):
@@ -266,6 +281,19 @@ def _examples():
     # Compute Structural Feature Sets on band 4, with pre-smoothing
     spfeas -i image.tif -o out_dir -bp 4 -sfs_th 10 -tr sfs --smooth 5
 
+    # Compute several features on bands 1-4, reading each section only once
+    spfeas -i image.tif -o out_dir -bp 1 2 3 4 --block 8 --scales 8 16 -tr fourier dmp pantex mean --fused
+
+    # Write the features to one tiled, compressed GeoTIFF, with 256x256 tiles that align with
+    #   the 1024x1024 blocks of `classify`
+    spfeas -i image.tif -o out_dir -bp 1 2 3 4 --block 8 --scales 8 16 -tr fourier dmp pantex mean --mosaic gtiff --tile-block 256
+
+    # Skip the sections outside of the city boundary, writing them as 'no data' without reading them
+    spfeas -i image.tif -o out_dir -bp 1 2 3 --block 8 --scales 8 16 -tr pantex mean --aoi boundary.shp
+
+    # Write the features of training points to a samples file, computing only the blocks under the points
+    spfeas -i image.tif -o out_dir -bp 1 2 3 --block 8 --scales 8 16 -tr pantex mean --points train.shp --points-class CLASS
+
     """)
 
 
@@ -381,12 +409,37 @@ def main():
                         action='store_true')
     parser.add_argument('--n-jobs', dest='n_jobs', help='The number of parallel jobs for sections',
                         default=-1, type=int)
+    parser.add_argument('--threads', dest='n_threads',
+                        help='The number of threads for the feature kernels (per parallel job)', default=1, type=int)
+    parser.add_argument('--mean-engine', dest='mean_engine',
+                        help='The mean and variance implementation (window=weighted windows, integral=summed-area tables)',
+                        default='window', choices=['window', 'integral'])
+    parser.add_argument('--fused', dest='fused',
+                        help='Whether to compute all triggers in one pass over each section', action='store_true')
+    parser.add_argument('--status-backend', dest='status_backend', help='The section progress backend',
+                        default='sqlite', choices=['sqlite', 'yaml'])
     parser.add_argument('--sect-size', dest='section_size', help='The section size', default=1000, type=int)
     parser.add_argument('--gdal-cache', dest='gdal_cache', help='The GDAL cache size (MB)', default=256, type=int)
     parser.add_argument('--reset', dest='reset', help='Whether to reset section memory', action='store_true')
     parser.add_argument('--overwrite', dest='overwrite', help='Whether to overwrite output files', action='store_true')
-    parser.add_argument('--overviews', dest='overviews', help='Whether to build pyramid overviews for the VRT mosaic',
+    parser.add_argument('--overviews', dest='overviews', help='Whether to build pyramid overviews for the mosaic',
+                        action='store_true')
+    parser.add_argument('--mosaic', dest='mosaic',
+                        help='The feature mosaic (vrt=VRT of the section tiles, gtiff=one tiled, compressed, pixel-interleaved GeoTIFF)',
+                        default='vrt', choices=['vrt', 'gtiff'])
+    parser.add_argument('--tile-block', dest='tile_block',
+                        help='The GeoTIFF mosaic tile size (a multiple of 16 that divides the classify --row-block and --col-block)',
+                        default=256, type=int)
+    parser.add_argument('--aoi', dest='aoi_file',
+                        help='A vector file of the valid-data boundary. Sections outside are written as no data without processing',
+                        default=None)
+    parser.add_argument('--skip-empty', dest='skip_empty',
+                        help='Whether to skip sections that are no data (0) in an overview of the first band',
                         action='store_true')
+    parser.add_argument('--points', dest='points',
+                        help='A point vector file. If given, only the features under the points are computed and written to a samples file',
+                        default=None)
+    parser.add_argument('--points-class', dest='points_class', help='The class field of --points', default='Id')
     parser.add_argument('--options', dest='options', help='Whether to show trigger options', action='store_true')
     parser.add_argument('--raster-options', dest='raster_options',
                         help='Whether to show available raster formats for writing', action='store_true')
@@ -437,6 +490,10 @@ def main():
                      stack_only=args.stack_only,
                      neighbors=args.neighbors,
                      n_jobs=args.n_jobs,
+                     fused=args.fused,
+                     n_threads=args.n_threads,
+                     mean_engine=args.mean_engine,
+                     status_backend=args.status_backend,
                      reset=args.reset,
                      image_min=args.image_min,
                      image_max=args.image_max,
@@ -444,7 +501,13 @@ def main():
                      section_size=args.section_size,
                      gdal_cache=args.gdal_cache,
                      overwrite=args.overwrite,
-                     overviews=args.overviews)
+                     overviews=args.overviews,
+                     mosaic=args.mosaic,
+                     tile_block=args.tile_block,
+                     aoi_file=args.aoi_file,
+                     skip_empty=args.skip_empty,
+                     points=args.points,
+                     points_class=args.points_class)
 
     logger.info('\nEnd data & time -- (%s)\nTotal processing time -- (%.2gs)\n' %
                 (time.asctime(time.localtime(time.time())), (time.time() - start_time)))
@@ -1,12 +1,10 @@
 from __future__ import division
 from builtins import int
 
-import itertools
-from joblib import Parallel, delayed
-
-from .sphelpers.gabor_filter_bank import prep_gabor
+from .sphelpers.gabor_filter_bank import filter_bank
 from .sphelpers import lsr
 from .sphelpers._stats import fill_labels, fill_key_points
+from .sphelpers._dmp import morphological_profiles
 
 from mpglue.stats._rolling_stats import rolling_stats
 
@@ -19,7 +17,6 @@ try:
     from skimage.color import rgb2rgbcie
     from skimage.segmentation import felzenszwalb
     from skimage.measure import regionprops
-    from skimage.morphology import reconstruction
 except ImportError:
     raise ImportError('Scikits-image must be installed')
 
@@ -33,6 +30,11 @@ try:
 except ImportError:
     raise ImportError('OpenCV must be installed')
 
+try:
+    from scipy.signal import fftconvolve
+except ImportError:
+    raise ImportError('SciPy must be installed')
+
 try:
     import matplotlib.pyplot as plt
 except ImportError:
@@ -184,131 +186,319 @@ def fourier_transform(ch_bd):
     return list(cv2.meanStdDev(psd1D))
 
 
-def feature_fourier(chBd, blk, scs, end_scale):
+def _get_radial_bins(rows, cols):
+
+    """
+    Returns the radial profile bins of a shifted rows x cols power spectrum, as in `azimuthal_avg`
+
+    The profile is the mean of each integer radius, excluding the smallest and largest radii.
+
+    Args:
+        rows (int): The window rows.
+        cols (int): The window columns.
+
+    Returns:
+        The flat pixel order (sorted by radius bin), the bin start positions, and the bin pixel counts.
+    """
+
+    y, x = np.indices((rows, cols))
+
+    # `azimuthal_avg` centers both axes on the columns.
+    center = (x.max() - x.min()) / 2.0
+
+    r_int = np.hypot(np.subtract(x, center), np.subtract(y, center)).astype(int).ravel()
+
+    r_values, r_counts = np.unique(r_int, return_counts=True)
+
+    if len(r_values) < 3:
+        return None, None, None
+
+    keep = (r_int > r_values[0]) & (r_int < r_values[-1])
+
+    pixel_order = np.where(keep)[0]
+    pixel_order = pixel_order[np.argsort(r_int[pixel_order], kind='mergesort')]
+
+    bin_counts = r_counts[1:-1]
+    bin_starts = np.concatenate(([0], np.cumsum(bin_counts)[:-1]))
+
+    return pixel_order, bin_starts, np.float64(bin_counts)
+
+
+def _get_fourier_stats(windows, radial_bins):
+
+    """
+    Returns the mean and standard deviation of the radial power spectrum profile for a stack of windows
+
+    Args:
+        windows (3d array): The windows, shaped [n_windows x rows x cols].
+        radial_bins (tuple): The output of `_get_radial_bins`.
+
+    Returns:
+        A 2d array, shaped [n_windows x 2].
+    """
+
+    pixel_order, bin_starts, bin_counts = radial_bins
+
+    n_windows = windows.shape[0]
+
+    if pixel_order is None:
+        return np.zeros((n_windows, 2), dtype='float64')
+
+    magnitude = np.abs(np.fft.fft2(np.float64(windows), axes=(1, 2)))
+
+    # Round-off from the batched FFT is set to zero, to
+    #   match the exact zeros of the per-window OpenCV DFT.
+    magnitude_tolerance = 1e-10 * (np.abs(windows).sum(axis=(1, 2)) + 1.0)
+
+    magnitude[magnitude < magnitude_tolerance[:, np.newaxis, np.newaxis]] = 0.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        magnitude_spectrum = 20.0 * np.log(np.float32(magnitude))
+
+        magnitude_spectrum = np.fft.fftshift(magnitude_spectrum, axes=(1, 2)).reshape(n_windows, -1)
+
+        radial_profile = np.add.reduceat(np.float64(magnitude_spectrum[:, pixel_order]), bin_starts, axis=1) / bin_counts
+
+        return np.column_stack((radial_profile.mean(axis=1), radial_profile.std(axis=1)))
+
+
+def feature_fourier(chBd, blk, scs, end_scale, max_window_pixels=4194304):
+
+    """
+    Computes the mean and standard deviation of the radial Fourier power spectrum of each block
+
+    All windows of a scale and size are gathered from a strided view and
+    transformed together, with the radial bins computed once per window size.
+
+    Args:
+        chBd (2d array): The image section.
+        blk (int): The block size.
+        scs (list): The scales.
+        end_scale (int): The largest scale.
+        max_window_pixels (Optional[int]): The maximum number of window pixels to transform at once.
+
+    Returns:
+        A 1d float32 array of (mean, std) pairs, ordered by block row, block column, and scale.
+    """
+
+    chBd = np.ascontiguousarray(chBd, dtype='float32')
 
     rows, cols = chBd.shape
     scales_half = int(end_scale / 2.0)
     scales_blk = end_scale - blk
-    out_len = 0
-    pix_ctr = 0
 
-    for i in range(0, rows-scales_blk, blk):
-        for j in range(0, cols-scales_blk, blk):
-            for k in scs:
-                out_len += 2
+    block_rows = np.arange(0, max(rows-scales_blk, 0), blk, dtype='int64')
+    block_cols = np.arange(0, max(cols-scales_blk, 0), blk, dtype='int64')
+
+    out_array = np.zeros((len(block_rows), len(block_cols), len(scs), 2), dtype='float32')
+
+    radial_bins = dict()
 
-    # set the output list
-    out_list = np.zeros(out_len, dtype='float32')
+    for ki, k in enumerate(scs):
 
-    for i in range(0, rows-scales_blk, blk):
+        k_half = int(k / 2.0)
 
-        for j in range(0, cols-scales_blk, blk):
+        r0 = block_rows + scales_half - k_half
+        c0 = block_cols + scales_half - k_half
 
-            for k in scs:
+        # Windows are truncated at the section edges.
+        r_sizes = np.minimum(k, rows - r0)
+        c_sizes = np.minimum(k, cols - c0)
 
-                k_half = int(k / 2.0)
+        for r_size in np.unique(r_sizes):
+
+            for c_size in np.unique(c_sizes):
+
+                if (r_size <= 0) or (c_size <= 0):
+                    continue
+
+                if (r_size, c_size) not in radial_bins:
+                    radial_bins[(r_size, c_size)] = _get_radial_bins(r_size, c_size)
+
+                row_idx = np.where(r_sizes == r_size)[0]
+                col_idx = np.where(c_sizes == c_size)[0]
+
+                # A [rows x cols x r_size x c_size] view of every window
+                window_view = np.lib.stride_tricks.as_strided(chBd,
+                                                              shape=(rows-r_size+1, cols-c_size+1, r_size, c_size),
+                                                              strides=chBd.strides*2)
+
+                chunk_rows = max(1, int(max_window_pixels / (len(col_idx) * r_size * c_size)))
+
+                for chunk_start in range(0, len(row_idx), chunk_rows):
+
+                    chunk_idx = row_idx[chunk_start:chunk_start+chunk_rows]
+
+                    windows = window_view[r0[chunk_idx][:, np.newaxis], c0[col_idx]]
+
+                    sts = _get_fourier_stats(windows.reshape(-1, r_size, c_size),
+                                             radial_bins[(r_size, c_size)])
+
+                    out_array[chunk_idx[:, np.newaxis], col_idx, ki] = sts.reshape(len(chunk_idx), len(col_idx), 2)
+
+    out_array[np.isnan(out_array) | np.isinf(out_array)] = 0.0
+
+    return out_array.ravel()
+
+
+def _integral_image(image):
+
+    """
+    Returns a summed-area table, padded with a leading row and column of zeros
+    """
 
-                ch_bd = chBd[i+scales_half-k_half:i+scales_half-k_half+k,
-                             j+scales_half-k_half:j+scales_half-k_half+k]
+    sat = np.zeros((image.shape[0]+1, image.shape[1]+1), dtype='float64')
+    sat[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
 
-                # get the Fourier Transform
-                dft = cv2.dft(np.float32(ch_bd), flags=cv2.DFT_COMPLEX_OUTPUT)
-                dft_shift = np.fft.fftshift(dft)
+    return sat
 
-                # get the Power Spectrum
-                magnitude_spectrum = 20.0 * np.log(cv2.magnitude(dft_shift[:, :, 0], dft_shift[:, :, 1]))
 
-                psd1D = azimuthal_avg(magnitude_spectrum)
+def _window_sums(sat, r0, r1, c0, c1):
 
-                sts = list(cv2.meanStdDev(psd1D))
+    """
+    Returns the sums of windows [r0:r1, c0:c1] from a summed-area table
 
-                # plt.subplot(121)
-                # plt.imshow(ch_bd, cmap='gray')
-                # plt.subplot(122)
-                # plt.imshow(magnitude_spectrum, interpolation='nearest')
-                # plt.show()
-                # print psd1D
-                # sys.exit()
+    Args:
+        sat (2d array): The summed-area table.
+        r0, r1 (1d array): The starting and ending rows.
+        c0, c1 (1d array): The starting and ending columns.
 
-                for st in sts:
+    Returns:
+        A 2d array of window sums, shaped [len(r0) x len(c0)].
+    """
 
-                    if np.isnan(st[0][0]):
-                        out_list[pix_ctr] = 0.0
-                    else:
-                        out_list[pix_ctr] = st[0][0]
+    return sat[r1[:, np.newaxis], c1] - sat[r0[:, np.newaxis], c1] - sat[r1[:, np.newaxis], c0] + sat[r0[:, np.newaxis], c0]
 
-                    pix_ctr += 1
 
-    out_list[np.isnan(out_list) | np.isinf(out_list)] = 0.0
+def _get_inverse_distance_weights(k):
 
-    return out_list
+    """
+    Returns the inverse of the `_stats._create_weights` distances for a k x k window
 
+    The window center has a distance of 0, so its weight is 0 (the `_stats` kernel skips it).
+    """
 
-def call_lsr(edoim_s, edmim_s, dx_s, dy_s, scs, end_scale):
+    ri, rj = np.mgrid[:k, :k].astype('float64')
 
-    scale_stats = list()
-    scales_half = int(end_scale / 2)
+    dist = np.sqrt((rj - k / 2.0)**2 + (ri - k / 2.0)**2)
 
-    for k in scs:
+    weights = np.zeros((k, k), dtype='float64')
+    weights[dist > 0] = 1.0 / dist[dist > 0]
 
-        if k != scs[-1]:
+    return weights
 
-            k_half = int(k / 2)
 
-            ifst = scales_half - k_half
-            isnd = scales_half - k_half + k
-        else:
-            ifst = None
-            isnd = None
+def feature_mean_integral(ch_bd, blk, scs, end_scale):
 
-        scale_stats += list(lsr.feature_lsr(edoim_s[ifst:isnd, ifst:isnd],
-                                            edmim_s[ifst:isnd, ifst:isnd],
-                                            dx_s[ifst:isnd, ifst:isnd],
-                                            dy_s[ifst:isnd, ifst:isnd]))
+    """
+    Computes the distance-weighted mean and the variance of each block with summed-area tables
 
-    return scale_stats
+    The output matches `_stats.feature_mean` within floating point tolerance. The sums of x and
+    x^2 come from summed-area tables, and the distance-weighted sum is one FFT correlation per
+    scale, so the cost of a window does not depend on the scale size.
 
+    Args:
+        ch_bd (2d array): The image section.
+        blk (int): The block size.
+        scs (list): The scales.
+        end_scale (int): The largest scale.
 
-def feature_lsr(ch_bd, blk, scs, end_scale):
+    Returns:
+        A 1d float32 array of (mean, variance) pairs, ordered by block row, block column, and scale.
+    """
 
     rows, cols = ch_bd.shape
-    out_list = list()
+    scales_half = int(end_scale / 2.0)
+    scales_blk = end_scale - blk
+
+    block_rows = np.arange(0, max(rows-scales_blk, 0), blk, dtype='int64')
+    block_cols = np.arange(0, max(cols-scales_blk, 0), blk, dtype='int64')
+
+    out_array = np.zeros((len(block_rows), len(block_cols), len(scs), 2), dtype='float32')
+
+    if (len(block_rows) == 0) or (len(block_cols) == 0):
+        return out_array.ravel()
+
+    ch_bd = np.float64(ch_bd)
+
+    is_finite = np.isfinite(ch_bd)
+
+    # Non-finite values are left out of the
+    #   weighted sum, but the variance is NaN.
+    ch_bd[~is_finite] = 0.0
+
+    sat_x = _integral_image(ch_bd)
+    sat_xx = _integral_image(ch_bd**2)
+    sat_nf = _integral_image(np.float64(~is_finite))
+
+    for ki, k in enumerate(scs):
+
+        k_half = int(k / 2.0)
+
+        r0 = block_rows + scales_half - k_half
+        c0 = block_cols + scales_half - k_half
+
+        # Windows are truncated at the section edges.
+        r1 = np.minimum(r0 + k, rows)
+        c1 = np.minimum(c0 + k, cols)
+
+        n_samps = np.float64(np.outer(r1 - r0, c1 - c0))
+
+        sum_x = _window_sums(sat_x, r0, r1, c0, c1)
+        sum_xx = _window_sums(sat_xx, r0, r1, c0, c1)
+        sum_nf = _window_sums(sat_nf, r0, r1, c0, c1)
+
+        # The weighted sum of every window, with zeros beyond
+        #   the section edges (i.e., the truncated weights).
+        ch_bd_pad = np.pad(ch_bd, ((0, k-1), (0, k-1)), mode='constant')
+
+        weighted_sum = fftconvolve(ch_bd_pad,
+                                   _get_inverse_distance_weights(k)[::-1, ::-1],
+                                   mode='valid')[r0[:, np.newaxis], c0]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            mu = weighted_sum / n_samps
+
+            block_var = np.maximum((sum_xx - 2.0 * mu * sum_x + n_samps * mu**2) / n_samps, 0.0)
+
+        block_var[sum_nf > 0] = np.nan
+
+        out_array[:, :, ki, 0] = mu
+        out_array[:, :, ki, 1] = block_var
+
+    return out_array.ravel()
+
+
+def feature_lsr(ch_bd, blk, scs, end_scale, n_threads=1):
+
+    """
+    Computes line support region features
+
+    The gradient is computed once over the section, and the windows of each
+    row are processed together.
+
+    Args:
+        ch_bd (2d array): The section.
+        blk (int): The block size.
+        scs (list): The scales.
+        end_scale (int): The last scale.
+        n_threads (Optional[int]): The number of threads. Default is 1.
+
+    Returns:
+        The line length entropy, mean line contrast, and line contrast entropy
+        of each block and scale, as a 1d array.
+    """
 
     edge_mag, edge_ori, deriv_x, deriv_y = grad_mag(ch_bd)
-    
-    for i in range(0, rows-(end_scale-blk), blk):
-
-        out_list += list(itertools.chain.from_iterable(Parallel(n_jobs=-1,
-                                                                max_nbytes=None)(delayed(call_lsr)(edge_ori[i:i+end_scale,
-                                                                                                            j:j+end_scale],
-                                                                                                   edge_mag[i:i+end_scale,
-                                                                                                            j:j+end_scale],
-                                                                                                   deriv_x[i:i+end_scale,
-                                                                                                           j:j+end_scale],
-                                                                                                   deriv_y[i:i+end_scale,
-                                                                                                           j:j+end_scale],
-                                                                                                   scs, end_scale)
-                                                                                 for j in range(0, cols-(end_scale-blk), blk))))
-
-        # for j in range(0, cols-(end_scale-blk), blk):
-        #
-        #
-        #     sts = Parallel(n_jobs=len(scs),
-        #                    max_nbytes=None)(delayed(call_lsr)(edge_ori[i+scales_half-int(k/2):i+scales_half-int(k/2)+k,
-        #                                                                j+scales_half-int(k/2):j+scales_half-int(k/2)+k],
-        #                                                       edge_mag[i+scales_half-int(k/2):i+scales_half-int(k/2)+k,
-        #                                                                j+scales_half-int(k/2):j+scales_half-int(k/2)+k],
-        #                                                       deriv_x[i+scales_half-int(k/2):i+scales_half-int(k/2)+k,
-        #                                                               j+scales_half-int(k/2):j+scales_half-int(k/2)+k],
-        #                                                       deriv_y[i+scales_half-int(k/2):i+scales_half-int(k/2)+k,
-        #                                                               j+scales_half-int(k/2):j+scales_half-int(k/2)+k])
-        #                                     for k in scs)
-        #
-        #     for st in sts:
-        #         for st_ in st:
-        #             out_list.append(st_)
-            
-    return out_list
+
+    return lsr.feature_lsr_section(edge_ori,
+                                   edge_mag,
+                                   deriv_x,
+                                   deriv_y,
+                                   blk, scs, end_scale,
+                                   n_threads=n_threads)
 
 
 def scale_rgb(layers, min_max, lidx):
@@ -455,7 +645,7 @@ def get_slopes(xv, yv):
     return ((xv*yv).mean(axis=1) - xv.mean() * yv.mean(axis=1)) / ((xv**2).mean() - (xv.mean())**2)
 
 
-def get_dmp(bd, image_min, image_max, ses=None):
+def get_dmp(bd, image_min, image_max, ses=None, n_threads=1):
 
     """
     Calculates the Differential Morphological Profile
@@ -465,6 +655,7 @@ def get_dmp(bd, image_min, image_max, ses=None):
         image_min (int or float)
         image_max (int or float)
         ses (Optional[list]): The structuring elements.
+        n_threads (Optional[int]): The number of threads for the reconstructions. Default is 1.
 
     Returns:
 
@@ -480,52 +671,19 @@ def get_dmp(bd, image_min, image_max, ses=None):
                                                   image_max),
                                         out_range=(0, 255)))
 
-    section_rows, section_cols = bd.shape
-
-    dmp_counter = 0
-
-    marker = bd.copy()
-    previous = bd.copy()
+    # Openings and closings by reconstruction,
+    #   shaped [2 x len(ses) x rows x columns]
+    openings, closings = np.int16(morphological_profiles(np.ascontiguousarray(bd), list(ses), n_threads=n_threads))
 
     # The DMP holder
-    # closings --> 1st len(ses) bands
-    # openings --> last len(ses) bands
-    dims = len(ses) * 2
-
-    dmp_array = np.empty((dims, section_rows, section_cols), dtype='uint8')
-
-    # Morphological opening
-    for se_size in ses:
-
-        se = cv2.getStructuringElement(cv2.MORPH_RECT, (se_size, se_size))
-
-        marker = cv2.erode(marker, se, iterations=1)
-
-        current = reconstruction(marker, bd, method='dilation', selem=se)
-
-        dmp_array[dmp_counter] = previous - current
+    # openings --> 1st len(ses) bands
+    # closings --> last len(ses) bands
+    dmp_array = np.empty((len(ses) * 2, bd.shape[0], bd.shape[1]), dtype='uint8')
 
-        previous = current.copy()
-
-        dmp_counter += 1
-
-    marker = bd.copy()
-    previous = bd.copy()
-
-    # Morphological closing
-    for se_size in ses:
-
-        se = cv2.getStructuringElement(cv2.MORPH_RECT, (se_size, se_size))
-
-        marker = cv2.dilate(marker, se, iterations=1)
-
-        current = reconstruction(marker, bd, method='erosion', selem=se)
-
-        dmp_array[dmp_counter] = current - previous
-
-        previous = current.copy()
-
-        dmp_counter += 1
+    # Differences with the previous level (the image for the first level),
+    #   wrapped to uint8 as before.
+    dmp_array[:len(ses)] = np.uint8(-np.diff(np.concatenate((np.int16(bd)[np.newaxis], openings)), axis=0))
+    dmp_array[len(ses):] = np.uint8(np.diff(np.concatenate((np.int16(bd)[np.newaxis], closings)), axis=0))
 
     return np.uint8(np.gradient(dmp_array, axis=0).mean(axis=0))
 
@@ -626,27 +784,4 @@ def convolve_gabor(bd, image_min, image_max, scales):
 
     # Each set of Gabor kernels
     #   has 8 orientations.
-    out_block = np.empty((8*len(scales),
-                          bd.shape[0],
-                          bd.shape[1]), dtype='uint8')
-
-    ki = 0
-
-    for scale in scales:
-
-        # Check for even or
-        #   odd scale size.
-        if scale % 2 == 0:
-            ssub = 1
-        else:
-            ssub = 0
-
-        gabor_kernels = prep_gabor(kernel_size=(scale-ssub, scale-ssub))
-
-        for kernel in gabor_kernels:
-
-            out_block[ki] = cv2.filter2D(bd, cv2.CV_8U, kernel)
-
-            ki += 1
-
-    return out_block
+    return filter_bank(bd, scales)
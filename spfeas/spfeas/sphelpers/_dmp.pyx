@@ -0,0 +1,330 @@
+# cython: profile=False
+# cython: cdivision=True
+# cython: boundscheck=False
+# cython: wraparound=False
+
+import cython
+cimport cython
+
+import numpy as np
+cimport numpy as np
+
+from cython.parallel import prange, threadid
+
+# OpenCV
+try:
+    import cv2
+except ImportError:
+    raise ImportError('OpenCV did not load')
+
+DTYPE_uint8 = np.uint8
+ctypedef np.uint8_t DTYPE_uint8_t
+
+DTYPE_int16 = np.int16
+ctypedef np.int16_t DTYPE_int16_t
+
+DTYPE_intp = np.intp
+ctypedef np.intp_t DTYPE_intp_t
+
+# Larger than any uint8 value
+DEF NO_NEIGHBOR = 256
+
+
+cdef inline DTYPE_int16_t _max_i16(DTYPE_int16_t a, DTYPE_int16_t b) nogil:
+    return a if a > b else b
+
+
+cdef inline DTYPE_int16_t _min_i16(DTYPE_int16_t a, DTYPE_int16_t b) nogil:
+    return a if a < b else b
+
+
+cdef void _window_max(DTYPE_int16_t[::1] values,
+                      DTYPE_int16_t[::1] prefix,
+                      DTYPE_int16_t[::1] suffix,
+                      Py_ssize_t n,
+                      Py_ssize_t width) nogil:
+
+    """
+    Sliding maximum (van Herk/Gil-Werman) of `width` values, in place
+
+    `values` holds n + width - 1 values, with neutral padding on both sides.
+    On return, values[x] is the maximum of the input values[x:x+width].
+    """
+
+    cdef:
+        Py_ssize_t x
+        Py_ssize_t n_padded = n + width - 1
+
+    for x in range(0, n_padded):
+
+        if x % width == 0:
+            prefix[x] = values[x]
+        else:
+            prefix[x] = _max_i16(prefix[x-1], values[x])
+
+    for x in range(n_padded-1, -1, -1):
+
+        if (x == n_padded - 1) or ((x + 1) % width == 0):
+            suffix[x] = values[x]
+        else:
+            suffix[x] = _max_i16(suffix[x+1], values[x])
+
+    for x in range(0, n):
+        values[x] = _max_i16(suffix[x], prefix[x+width-1])
+
+
+cdef void _reconstruct(DTYPE_uint8_t[:, ::1] marker,
+                       DTYPE_uint8_t[:, ::1] mask,
+                       Py_ssize_t radius,
+                       DTYPE_uint8_t[:, ::1] out,
+                       DTYPE_int16_t[::1] row_buffer,
+                       DTYPE_int16_t[::1] min_buffer,
+                       DTYPE_int16_t[::1] prefix,
+                       DTYPE_int16_t[::1] suffix,
+                       DTYPE_intp_t[::1] queue,
+                       DTYPE_uint8_t[::1] in_queue) nogil:
+
+    """
+    Grey-level reconstruction by dilation of `marker` under `mask`, with a
+    (2 x radius + 1) square neighborhood
+
+    The hybrid algorithm of Vincent (1993): a forward and a backward raster scan,
+    then a FIFO queue propagates from the pixels that can still raise a neighbor.
+    The scans take the maximum over the already scanned half of the square from
+    the column maxima of the previous rows and a sliding maximum along the row.
+
+    row_buffer, min_buffer, prefix, and suffix hold (columns + 2 x radius) values.
+    queue and in_queue hold one value per pixel.
+    """
+
+    cdef:
+        Py_ssize_t rows = mask.shape[0]
+        Py_ssize_t cols = mask.shape[1]
+        Py_ssize_t width = 2 * radius + 1
+        Py_ssize_t y, x, yy, xx, y0, y1, x0, x1, q, p
+        Py_ssize_t q_head = 0
+        Py_ssize_t q_size = 0
+        Py_ssize_t n_pixels = rows * cols
+        DTYPE_int16_t v, d, neighbor_min
+        DTYPE_uint8_t vp
+
+    for y in range(0, rows):
+        for x in range(0, cols):
+            out[y, x] = marker[y, x] if marker[y, x] < mask[y, x] else mask[y, x]
+
+    # Forward scan
+    for y in range(0, rows):
+
+        # Maxima of the previous rows, over the square columns
+        for x in range(0, cols + 2*radius):
+            row_buffer[x] = -1
+
+        if y > 0:
+
+            y0 = y - radius if y > radius else 0
+
+            for x in range(0, cols):
+
+                v = out[y0, x]
+
+                for yy in range(y0+1, y):
+                    v = _max_i16(v, out[yy, x])
+
+                row_buffer[x+radius] = v
+
+            _window_max(row_buffer, prefix, suffix, cols, width)
+
+        for x in range(0, cols):
+
+            v = _max_i16(row_buffer[x], out[y, x])
+
+            x0 = x - radius if x > radius else 0
+
+            for xx in range(x0, x):
+                v = _max_i16(v, out[y, xx])
+
+            out[y, x] = <DTYPE_uint8_t>_min_i16(v, mask[y, x])
+
+    for p in range(0, n_pixels):
+        in_queue[p] = 0
+
+    # Backward scan. A pixel is queued if it can still raise a scanned
+    #   neighbor q, i.e., out[q] < out[p] and out[q] < mask[q]. The
+    #   neighbor minima are tracked as maxima of the negated values.
+    for y in range(rows-1, -1, -1):
+
+        for x in range(0, cols + 2*radius):
+
+            row_buffer[x] = -1
+            min_buffer[x] = -NO_NEIGHBOR
+
+        if y < rows - 1:
+
+            y1 = y + radius + 1 if y + radius + 1 < rows else rows
+
+            for x in range(0, cols):
+
+                v = -1
+                d = -NO_NEIGHBOR
+
+                for yy in range(y+1, y1):
+
+                    v = _max_i16(v, out[yy, x])
+
+                    if out[yy, x] < mask[yy, x]:
+                        d = _max_i16(d, -out[yy, x])
+
+                row_buffer[x+radius] = v
+                min_buffer[x+radius] = d
+
+            _window_max(row_buffer, prefix, suffix, cols, width)
+            _window_max(min_buffer, prefix, suffix, cols, width)
+
+        for x in range(cols-1, -1, -1):
+
+            v = _max_i16(row_buffer[x], out[y, x])
+            neighbor_min = -min_buffer[x]
+
+            x1 = x + radius + 1 if x + radius + 1 < cols else cols
+
+            for xx in range(x+1, x1):
+
+                v = _max_i16(v, out[y, xx])
+
+                if out[y, xx] < mask[y, xx]:
+                    neighbor_min = _min_i16(neighbor_min, out[y, xx])
+
+            out[y, x] = <DTYPE_uint8_t>_min_i16(v, mask[y, x])
+
+            if neighbor_min < out[y, x]:
+
+                p = y * cols + x
+
+                queue[(q_head + q_size) % n_pixels] = p
+                q_size += 1
+                in_queue[p] = 1
+
+    # Propagate
+    while q_size > 0:
+
+        p = queue[q_head]
+        q_head = (q_head + 1) % n_pixels
+        q_size -= 1
+        in_queue[p] = 0
+
+        y = p // cols
+        x = p % cols
+
+        vp = out[y, x]
+
+        y0 = y - radius if y > radius else 0
+        y1 = y + radius + 1 if y + radius + 1 < rows else rows
+        x0 = x - radius if x > radius else 0
+        x1 = x + radius + 1 if x + radius + 1 < cols else cols
+
+        for yy in range(y0, y1):
+
+            for xx in range(x0, x1):
+
+                if (out[yy, xx] < vp) and (out[yy, xx] != mask[yy, xx]):
+
+                    out[yy, xx] = vp if vp < mask[yy, xx] else mask[yy, xx]
+
+                    q = yy * cols + xx
+
+                    # A queued pixel propagates its latest value when it is removed.
+                    if in_queue[q] == 0:
+
+                        queue[(q_head + q_size) % n_pixels] = q
+                        q_size += 1
+                        in_queue[q] = 1
+
+
+def morphological_profiles(DTYPE_uint8_t[:, ::1] bd, list ses, int n_threads=2):
+
+    """
+    Computes the opening and closing by reconstruction profiles
+
+    The markers are eroded (openings) or dilated (closings) by each square structuring
+    element in turn, starting from the previous marker, and reconstructed under the image
+    with the structuring element as the neighborhood. This gives the same reconstructions
+    as `skimage.morphology.reconstruction`. Closings are reconstructed by dilation of the
+    inverted image. The reconstructions are independent, so they run in parallel.
+
+    Args:
+        bd (2d array): The uint8 image.
+        ses (list): The (odd) structuring element sizes.
+        n_threads (Optional[int]): The number of threads. Default is 2.
+
+    Returns:
+        The reconstructions as a uint8 array, shaped [2 x len(ses) x rows x columns],
+        with the openings first.
+    """
+
+    cdef:
+        Py_ssize_t ji, tid
+        Py_ssize_t n_ses = len(ses)
+        Py_ssize_t rows = bd.shape[0]
+        Py_ssize_t cols = bd.shape[1]
+        Py_ssize_t max_radius = int(max(ses) / 2)
+        DTYPE_intp_t[::1] radii = np.array([int(se / 2) for se in ses] * 2, dtype='intp')
+        DTYPE_uint8_t[:, :, ::1] markers
+        DTYPE_uint8_t[:, :, ::1] masks
+        DTYPE_uint8_t[:, :, ::1] reconstructions
+
+    n_threads = max(1, min(n_threads, 2*n_ses))
+
+    cdef:
+        DTYPE_int16_t[:, ::1] row_buffers = np.empty((n_threads, cols + 2*max_radius), dtype='int16')
+        DTYPE_int16_t[:, ::1] min_buffers = np.empty((n_threads, cols + 2*max_radius), dtype='int16')
+        DTYPE_int16_t[:, ::1] prefixes = np.empty((n_threads, cols + 2*max_radius), dtype='int16')
+        DTYPE_int16_t[:, ::1] suffixes = np.empty((n_threads, cols + 2*max_radius), dtype='int16')
+        DTYPE_intp_t[:, ::1] queues = np.empty((n_threads, rows*cols), dtype='intp')
+        DTYPE_uint8_t[:, ::1] in_queues = np.empty((n_threads, rows*cols), dtype='uint8')
+
+    bd_array = np.asarray(bd)
+
+    markers_array = np.empty((2*n_ses, rows, cols), dtype='uint8')
+
+    # Morphological opening markers
+    marker = bd_array.copy()
+
+    for si, se_size in enumerate(ses):
+
+        marker = cv2.erode(marker, cv2.getStructuringElement(cv2.MORPH_RECT, (se_size, se_size)), iterations=1)
+        markers_array[si] = marker
+
+    # Morphological closing markers, inverted
+    marker = bd_array.copy()
+
+    for si, se_size in enumerate(ses):
+
+        marker = cv2.dilate(marker, cv2.getStructuringElement(cv2.MORPH_RECT, (se_size, se_size)), iterations=1)
+        markers_array[n_ses+si] = 255 - marker
+
+    markers = markers_array
+    masks = np.ascontiguousarray(np.array([bd_array, 255 - bd_array], dtype='uint8'))
+
+    reconstructions_array = np.empty((2*n_ses, rows, cols), dtype='uint8')
+    reconstructions = reconstructions_array
+
+    with nogil:
+
+        for ji in prange(0, 2*n_ses, schedule='dynamic', num_threads=n_threads):
+
+            tid = threadid()
+
+            _reconstruct(markers[ji],
+                         masks[ji // n_ses],
+                         radii[ji],
+                         reconstructions[ji],
+                         row_buffers[tid],
+                         min_buffers[tid],
+                         prefixes[tid],
+                         suffixes[tid],
+                         queues[tid],
+                         in_queues[tid])
+
+    reconstructions_array[n_ses:] = 255 - reconstructions_array[n_ses:]
+
+    return reconstructions_array.reshape(2, n_ses, rows, cols)
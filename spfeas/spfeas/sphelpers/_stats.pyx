@@ -15,7 +15,7 @@ from libc.math cimport atan, sqrt, sin, cos, floor, ceil
 # from libc.math cimport isnan as npy_isnan
 # from libc.math cimport isinf as npy_isinf
 
-# from cython.parallel import parallel, prange
+from cython.parallel import prange, threadid
 # from libc.math cimport isnan, isinf
 
 # OpenCV
@@ -172,6 +172,16 @@ cdef unsigned int _get_output_length(int rows,
     return out_len
 
 
+cdef inline Py_ssize_t _get_n_steps(int rows_cols, int scales_block, int block_size) nogil:
+
+    """Returns the number of block steps over rows (or columns)"""
+
+    if rows_cols <= scales_block:
+        return 0
+
+    return <Py_ssize_t>((rows_cols - scales_block - 1) / block_size) + 1
+
+
 cdef DTYPE_uint8_t _get_min(DTYPE_uint8_t[:, :] block, int rs, int cs) nogil:
 
     cdef:
@@ -741,6 +751,58 @@ cdef void _convolution(DTYPE_float32_t[:, :] block2convolve,
             out_convolved[bi+knrh, bj+knch] = kernel_sum
 
 
+cdef void _feature_gabor_row(DTYPE_float32_t[:, :, ::1] ch_bdka,
+                             Py_ssize_t i,
+                             int blk,
+                             DTYPE_uint16_t[::1] scs,
+                             int scales_half,
+                             int scales_block,
+                             int n_kernels,
+                             int cols,
+                             int scale_length,
+                             DTYPE_float32_t[:, :, ::1] dist_weights_stack,
+                             Py_ssize_t pix_ctr,
+                             DTYPE_float32_t[::1] out_list_) nogil:
+
+    """Computes the Gabor kernel statistics for one row of blocks"""
+
+    cdef:
+        Py_ssize_t j, ki, kl, scale_kernel
+        DTYPE_uint16_t k
+        unsigned int rs, cs, k_half
+        int bcr, bcc
+        DTYPE_float32_t[:, ::1] ch_bd, dw
+
+    for j from 0 <= j < cols-scales_block by blk:
+
+        scale_kernel = 0
+
+        for ki in range(0, scale_length):
+
+            k = scs[ki]
+            k_half = <int>(k / 2.)
+
+            rs = (scales_half - k_half + k) - (scales_half - k_half)
+            cs = (scales_half - k_half + k) - (scales_half - k_half)
+
+            for kl in range(0, n_kernels):
+
+                ch_bd = ch_bdka[scale_kernel,
+                                i+scales_half-k_half:i+scales_half-k_half+k,
+                                j+scales_half-k_half:j+scales_half-k_half+k]
+
+                bcr = ch_bd.shape[0]
+                bcc = ch_bd.shape[1]
+
+                dw = dist_weights_stack[scale_kernel, :rs, :cs]
+
+                _get_weighted_mean_var(ch_bd, dw, bcr, bcc, out_list_[pix_ctr:pix_ctr+2])
+
+                pix_ctr += 2
+
+                scale_kernel += 1
+
+
 cdef void _feature_gabor(DTYPE_float32_t[:, :, ::1] ch_bdka,
                          int blk,
                          DTYPE_uint16_t[::1] scs,
@@ -752,6 +814,7 @@ cdef void _feature_gabor(DTYPE_float32_t[:, :, ::1] ch_bdka,
                          int cols,
                          int scale_length,
                          int end_scale,
+                         int n_threads,
                          DTYPE_float32_t[::1] out_list_):
 
     """
@@ -762,32 +825,15 @@ cdef void _feature_gabor(DTYPE_float32_t[:, :, ::1] ch_bdka,
     """
 
     cdef:
-        Py_ssize_t i, j, ki, kl, pi, scale_kernel
+        Py_ssize_t ki, kl, ii, scale_kernel
         DTYPE_uint16_t k
         unsigned int rs, cs, k_half
-        DTYPE_float32_t[:, ::1] ch_bd
-
-        # list ch_bd_k = []
-        # np.ndarray[DTYPE_float32_t, ndim=3] ch_bdka_array = np.zeros((n_kernels, rows, cols), dtype='float32')
-        # DTYPE_float32_t[:, :, :] ch_bdka = np.zeros((n_kernels, rows, cols), dtype='float32')
-        # DTYPE_float32_t[:, :] ch_bd_gabor
-        # DTYPE_float32_t[:] sts
-        # list st
-        int pix_ctr = 0
-        # int knr = kernels[0].shape[0]
-        # int knc = kernels[0].shape[1]
-        # int knrh = <int>(knr / 2.)
-        # int knch = <int>(knc / 2.)
-        # DTYPE_float32_t[:, :] gkernel
-        # DTYPE_float32_t[:] out_values
         DTYPE_float32_t[:, :, ::1] dist_weights_stack = np.zeros((scale_length*n_kernels,
                                                                   end_scale*2,
                                                                   end_scale*2), dtype='float32')
-
-
-        int bcr, bcc
-        DTYPE_float32_t[::1] in_zs = np.zeros(2, dtype='float32')
-        DTYPE_float32_t[:, ::1] dist_weights, dw
+        DTYPE_float32_t[:, ::1] dist_weights
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t row_len = _get_n_steps(cols, scales_block, blk) * scale_length * n_kernels * 2
 
     scale_kernel = 0
 
@@ -809,49 +855,23 @@ cdef void _feature_gabor(DTYPE_float32_t[:, :, ::1] ch_bdka,
 
     with nogil:
 
-        for i from 0 <= i < rows-scales_block by blk:
-
-            for j from 0 <= j < cols-scales_block by blk:
-
-                scale_kernel = 0
-
-                for ki in range(0, scale_length):
-
-                    k = scs[ki]
-                    k_half = <int>(k / 2.)
-
-                    rs = (scales_half - k_half + k) - (scales_half - k_half)
-                    cs = (scales_half - k_half + k) - (scales_half - k_half)
-
-                    for kl in range(0, n_kernels):
-
-                        ch_bd = ch_bdka[scale_kernel,
-                                        i+scales_half-k_half:i+scales_half-k_half+k,
-                                        j+scales_half-k_half:j+scales_half-k_half+k]
-
-                        bcr = ch_bd.shape[0]
-                        bcc = ch_bd.shape[1]
-
-                        dw = dist_weights_stack[scale_kernel, :rs, :cs]
-
-                        # _convolution(ch_bd, gkernel, bcr, bcc, knr, knc, knrh, knch, ch_bd_gabor)
-
-                        _get_weighted_mean_var(ch_bd, dw, bcr, bcc, in_zs)
-                        # _get_angle_stats(ch_bd_gabor, bcr, bcc, in_zs)
-
-                        # _get_directional_weighted_mean_var(ch_bd_gabor, bcr, bcc, in_zs)
-
-                        # _get_moments(in_zs, sts)
-
-                        for pi in range(0, 2):
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
 
-                            out_list_[pix_ctr] = in_zs[pi]
-                            pix_ctr += 1
-
-                        scale_kernel += 1
+            _feature_gabor_row(ch_bdka,
+                               ii*blk,
+                               blk,
+                               scs,
+                               scales_half,
+                               scales_block,
+                               n_kernels,
+                               cols,
+                               scale_length,
+                               dist_weights_stack,
+                               ii*row_len,
+                               out_list_)
 
 
-def feature_gabor(DTYPE_float32_t[:, :, ::1] chbd, int blk, list scs, int end_scale, int n_kernels=8):
+def feature_gabor(DTYPE_float32_t[:, :, ::1] chbd, int blk, list scs, int end_scale, int n_kernels=8, int n_threads=1):
 
     cdef:
         Py_ssize_t i, j, ki, kl
@@ -883,6 +903,7 @@ def feature_gabor(DTYPE_float32_t[:, :, ::1] chbd, int blk, list scs, int end_sc
                    cols,
                    scale_length,
                    end_scale,
+                   n_threads,
                    out_list)
 
     return np.float32(out_list)
@@ -935,6 +956,8 @@ cdef void _feature_hog(DTYPE_float32_t[:, ::1] chbd,
         DTYPE_float32_t[::1] sts_ = sts.copy()
         DTYPE_float32_t[::1] hog_results
 
+    # HOG is computed by Scikit-image, which needs the GIL,
+    #   so the blocks are processed serially.
     for i from 0 <= i < rows-scales_block by blk:
 
         for j from 0 <= j < cols-scales_block by blk:
@@ -1022,21 +1045,17 @@ cdef void _feature_dmp(DTYPE_float32_t[:, ::1] chbd,
                        int rows,
                        int cols,
                        int scale_length,
+                       int n_threads,
                        DTYPE_float32_t[::1] out_list_):
 
     cdef:
-        Py_ssize_t i, j, ki, sti, block_rows, block_cols
+        Py_ssize_t ki, ii
         DTYPE_uint16_t k, k_half
         unsigned int rc_start, rc_end, rc
-        DTYPE_float32_t[:, ::1] ch_bd
-        int pix_ctr = 0
-        #DTYPE_float32_t[::1] sts = np.zeros(5, dtype='float32')
-        #DTYPE_float32_t[::1] sts_ = sts.copy()
-        #DTYPE_float32_t[::1] dmp_vector = np.zeros(1, dtype='float32')
-        #DTYPE_float32_t[::1] dmp_vector_ = dmp_vector.copy()
-        DTYPE_float32_t[:, ::1] dist_weights, dw
+        DTYPE_float32_t[:, ::1] dist_weights
         DTYPE_float32_t[:, :, ::1] dist_weights_stack = np.zeros((scale_length, end_scale*2, end_scale*2), dtype='float32')
-        DTYPE_float32_t[::1] in_zs = np.zeros(2, dtype='float32')
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t row_len = _get_n_steps(cols, scales_block, blk) * scale_length * 2
 
     for ki in range(0, scale_length):
 
@@ -1054,45 +1073,23 @@ cdef void _feature_dmp(DTYPE_float32_t[:, ::1] chbd,
 
     with nogil:
 
-        for i from 0 <= i < rows-scales_block by blk:
-
-            for j from 0 <= j < cols-scales_block by blk:
-
-                for ki in range(0, scale_length):
-
-                    k = scs[ki]
-
-                    k_half = <int>(k / 2.0)
-
-                    # Get the DMPS.
-                    ch_bd = chbd[i+scales_half-k_half:i+scales_half-k_half+k,
-                                 j+scales_half-k_half:j+scales_half-k_half+k]
-
-                    block_rows = ch_bd.shape[0]
-                    block_cols = ch_bd.shape[1]
-
-                    # Add the DMPs for the local scale.
-                    #dmp_vector_[...] = dmp_vector
-                    #_add_dmps(ch_bd, block_rows, block_cols, dmp_vector_)
+        # The weighted mean and variance of the DMPs
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
 
-                    dw = dist_weights_stack[ki, :block_rows, :block_cols]
-                    _get_weighted_mean_var(ch_bd, dw, block_rows, block_cols, in_zs)
+            _feature_mean_var_row(chbd,
+                                  ii*blk,
+                                  blk,
+                                  scs,
+                                  scales_half,
+                                  scales_block,
+                                  cols,
+                                  scale_length,
+                                  dist_weights_stack,
+                                  ii*row_len,
+                                  out_list_)
 
-                    #sts_[...] = sts
 
-                    # Get the DMP vector
-                    #   central moments.
-                    #_get_moments(dmp_vector_, sts_)
-
-                    # Fill the output.
-                    for sti in range(0, 2):
-
-                        out_list_[pix_ctr] = in_zs[sti]
-
-                        pix_ctr += 1
-
-
-def feature_dmp(DTYPE_float32_t[:, ::1] chbd, int blk, list scs, int end_scale):
+def feature_dmp(DTYPE_float32_t[:, ::1] chbd, int blk, list scs, int end_scale, int n_threads=1):
 
     cdef:
         int scales_half = <int>(end_scale / 2.0)
@@ -1114,6 +1111,7 @@ def feature_dmp(DTYPE_float32_t[:, ::1] chbd, int blk, list scs, int end_scale):
                  rows,
                  cols,
                  scale_length,
+                 n_threads,
                  out_list)
 
     return np.float32(out_list)
@@ -1829,6 +1827,82 @@ def feature_lbp(np.ndarray[DTYPE_uint8_t, ndim=2] chbd, int blk, list scs, int e
     return _feature_lbp(chbd, blk, scs, end_scale)
 
 
+cdef void _feature_lbpm_row(DTYPE_uint8_t[:, :, ::1] lbp_bd,
+                            Py_ssize_t i,
+                            int blk,
+                            DTYPE_uint16_t[:] scs,
+                            int scales_half,
+                            int scales_block,
+                            int rows,
+                            int cols,
+                            int scale_length,
+                            DTYPE_float32_t[::1] lbp_results,
+                            DTYPE_float32_t[::1] sts_,
+                            Py_ssize_t pix_ctr,
+                            DTYPE_float32_t[::1] out_list_) nogil:
+
+    """
+    Computes the LBP histogram moments for one row of blocks
+
+    lbp_results and sts_ are scratch arrays of the calling thread.
+    """
+
+    cdef:
+        Py_ssize_t j, ki, pc, bi, bj, sti
+        unsigned int k_half, k
+        int r0, c0, r1, c1, n_bins, bin_start, max_bin
+
+    for j from 0 <= j < cols-scales_block by blk:
+
+        for ki in range(0, scale_length):
+
+            k = scs[ki]
+
+            k_half = <int>(k / 2.0)
+
+            # The window bounds, clipped as a slice would be
+            r0 = i + scales_half - k_half
+            c0 = j + scales_half - k_half
+            r1 = _get_min_sample_i(r0+k, rows)
+            c1 = _get_min_sample_i(c0+k, cols)
+
+            # Get the histograms and concatenate. Each histogram
+            #   has the length of np.bincount(..., minlength=pc+2).
+            bin_start = 0
+
+            for pc in range(0, 3):
+
+                max_bin = pc + 1
+
+                for bi in range(r0, r1):
+                    for bj in range(c0, c1):
+
+                        if lbp_bd[pc, bi, bj] > max_bin:
+                            max_bin = lbp_bd[pc, bi, bj]
+
+                n_bins = max_bin + 1
+
+                for bi in range(bin_start, bin_start+n_bins):
+                    lbp_results[bi] = 0.
+
+                for bi in range(r0, r1):
+                    for bj in range(c0, c1):
+                        lbp_results[bin_start+lbp_bd[pc, bi, bj]] += 1.
+
+                bin_start += n_bins
+
+            for sti in range(0, 5):
+                sts_[sti] = 0.
+
+            _get_moments(lbp_results[:bin_start], sts_)
+
+            for sti in range(0, 5):
+
+                out_list_[pix_ctr] = sts_[sti]
+
+                pix_ctr += 1
+
+
 cdef void _feature_lbpm(DTYPE_uint8_t[:, ::1] chBd,
                         int blk,
                         DTYPE_uint16_t[:] scs,
@@ -1839,6 +1913,7 @@ cdef void _feature_lbpm(DTYPE_uint8_t[:, ::1] chBd,
                         int rows,
                         int cols,
                         int scale_length,
+                        int n_threads,
                         DTYPE_float32_t[::1] out_list_):
 
     """
@@ -1850,51 +1925,43 @@ cdef void _feature_lbpm(DTYPE_uint8_t[:, ::1] chBd,
     """
 
     cdef:
-        Py_ssize_t i, j, sti, ki
-        unsigned int pc, k_half, k
+        Py_ssize_t ii, tid
         DTYPE_uint8_t[:, :, ::1] lbp_bd
-        DTYPE_uint8_t[:, :, ::1] ch_bd
-        int pix_ctr = 0
-        DTYPE_float32_t[::1] sts = np.zeros(5, dtype='float32')
-        DTYPE_float32_t[::1] sts_ = sts.copy()
-        DTYPE_float32_t[::1] lbp_results
         DTYPE_uint8_t[::1] p_range = np.array([8, 16, 32], dtype='uint8')
         dict rdict	= {4: 1, 8: 1, 16: 2, 32: 4, 64: 8, 128: 16}
 
-    # get the LBP images
-    lbp_bd = np.ascontiguousarray(_set_lbp(chBd, rows, cols, p_range, rdict))
-
-    for i from 0 <= i < rows-scales_block by blk:
-
-        for j from 0 <= j < cols-scales_block by blk:
-
-            for ki in range(0, scale_length):
-
-                k = scs[ki]
-
-                k_half = <int>(k / 2.0)
-
-                ch_bd = np.ascontiguousarray(np.uint8(lbp_bd[:,
-                                                             i+scales_half-k_half:i+scales_half-k_half+k,
-                                                             j+scales_half-k_half:j+scales_half-k_half+k]))
+        # Scratch arrays for each thread
+        DTYPE_float32_t[:, ::1] lbp_results_t = np.zeros((n_threads, 256*3), dtype='float32')
+        DTYPE_float32_t[:, ::1] sts_t = np.zeros((n_threads, 5), dtype='float32')
 
-                # get histograms and concatenate
-                lbp_results = np.float32(np.ascontiguousarray(np.concatenate([np.bincount(np.uint8(ch_bd[pc]).flat,
-                                                                                          minlength=pc+2)
-                                                                              for pc in range(0, 3)])))
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t row_len = _get_n_steps(cols, scales_block, blk) * scale_length * 5
 
-                sts_[...] = sts
+    # get the LBP images
+    lbp_bd = np.ascontiguousarray(_set_lbp(chBd, rows, cols, p_range, rdict))
 
-                _get_moments(lbp_results, sts_)
+    with nogil:
 
-                for sti in range(0, 5):
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
 
-                    out_list_[pix_ctr] = sts_[sti]
+            tid = threadid()
 
-                    pix_ctr += 1
+            _feature_lbpm_row(lbp_bd,
+                              ii*blk,
+                              blk,
+                              scs,
+                              scales_half,
+                              scales_block,
+                              rows,
+                              cols,
+                              scale_length,
+                              lbp_results_t[tid],
+                              sts_t[tid],
+                              ii*row_len,
+                              out_list_)
 
 
-def feature_lbpm(np.ndarray[DTYPE_uint8_t, ndim=2] chbd, int blk, list scs, int end_scale):
+def feature_lbpm(np.ndarray[DTYPE_uint8_t, ndim=2] chbd, int blk, list scs, int end_scale, int n_threads=1):
 
     cdef:
         Py_ssize_t i, j, ki
@@ -1917,6 +1984,7 @@ def feature_lbpm(np.ndarray[DTYPE_uint8_t, ndim=2] chbd, int blk, list scs, int
                   rows,
                   cols,
                   scale_length,
+                  n_threads,
                   out_list)
 
     return np.float32(out_list)
@@ -2332,169 +2400,202 @@ cdef DTYPE_float32_t[:, ::1] _set_contrast_weights(int levels):
     return contrast_array
 
 
-cdef void _feature_pantex(DTYPE_uint8_t[:, ::1] chBd,
-                          int blk,
-                          DTYPE_uint16_t[::1] scs,
-                          int scales_half,
-                          int scales_block,
-                          int out_len,
-                          bint weighted,
-                          int rows,
-                          int cols,
-                          int scale_length,
-                          int levels,
-                          DTYPE_float32_t[::1] out_list_):
+cdef void _feature_pantex_row(DTYPE_uint8_t[:, ::1] chBd,
+                              Py_ssize_t i,
+                              int blk,
+                              DTYPE_uint16_t[::1] scs,
+                              int scales_half,
+                              int scales_block,
+                              bint weighted,
+                              int cols,
+                              int scale_length,
+                              int levels,
+                              DTYPE_float32_t[:] disp_vect,
+                              DTYPE_float32_t[:] dists,
+                              DTYPE_float32_t[:, ::1] contrast_weights,
+                              DTYPE_float32_t[:, :, :, ::1] P_,
+                              DTYPE_float32_t[:, :] angle_dist_sums_,
+                              DTYPE_float32_t[:, :, :, ::1] P_c,
+                              DTYPE_float32_t[:, :] angle_dist_sums_c,
+                              DTYPE_float32_t[:, :, :, ::1] glcm_normed_,
+                              DTYPE_float32_t[:, :, ::1] dist_weights_stack,
+                              DTYPE_float32_t[::1] in_zs,
+                              Py_ssize_t pix_ctr,
+                              DTYPE_float32_t[::1] out_list_) nogil:
 
     """
-    Calculates the Anisotropic Built-up Presence Index (PanTex)
+    Computes PanTex for one row of blocks
 
-    The GLCM code was adapted from the Scikit-image team
-    @ https://github.com/scikit-image/scikit-image/blob/master/skimage/feature/_texture.pyx
+    P_c, angle_dist_sums_c, glcm_normed_, and in_zs are scratch arrays of the calling thread.
     """
 
     cdef:
-        Py_ssize_t i, j, ki, block_rows, block_cols
+        Py_ssize_t j, ki, block_rows, block_cols
         DTYPE_uint16_t k
         int k_half
         DTYPE_uint8_t[:, ::1] ch_bd
-        DTYPE_float32_t pi = 3.14159265
         DTYPE_float32_t[:, :, :, ::1] glcm_mat
         DTYPE_float32_t con_min
-        Py_ssize_t pix_ctr = 0
-
-        # directions [E, NE, N, NW]
-        DTYPE_float32_t[:] disp_vect = np.array([0., pi / 6., pi / 4., pi / 3., pi / 2., (2. * pi) / 3.,
-                                                 (3. * pi) / 4., (5. * pi) / 6.], dtype='float32')
-
-        DTYPE_float32_t[:] dists = np.array([1, 2], dtype='float32')
-        DTYPE_float32_t[:, ::1] contrast_weights = _set_contrast_weights(levels)
-
-        DTYPE_float32_t[:, :, :, ::1] P_ = np.zeros((levels, levels, dists.shape[0], disp_vect.shape[0]),
-                                                    dtype='float32')
-
-        DTYPE_float32_t[:, :] angle_dist_sums_ = np.zeros((dists.shape[0], disp_vect.shape[0]),
-                                                          dtype='float32')
-
-        DTYPE_float32_t[:, :, :, ::1] glcm_normed_ = P_.copy()
-        DTYPE_float32_t[:, :, :, ::1] P_c = P_.copy()
-        DTYPE_float32_t[:, :] angle_dist_sums_c = angle_dist_sums_.copy()
-        DTYPE_float32_t[:] mean_var_values
-        DTYPE_float32_t[:, ::1] kernel_weight
-        DTYPE_float32_t[::1] in_zs = np.zeros(2, dtype='float32')
-        DTYPE_float32_t[:, ::1] dist_weights
-        list dist_weights_m = []
 
-    if weighted:
+    for j from 0 <= j < cols-scales_block by blk:
 
         for ki in range(0, scale_length):
 
             k = scs[ki]
+
             k_half = <int>(k / 2.)
-            rs = (scales_half - k_half + k) - (scales_half - k_half)
-            cs = (scales_half - k_half + k) - (scales_half - k_half)
 
-            dist_weights = np.empty((rs, cs), dtype='float32')
-            dist_weights_m.append(_create_weights(dist_weights, rs, cs))
+            ch_bd = chBd[i+scales_half-k_half:i+scales_half-k_half+k,
+                         j+scales_half-k_half:j+scales_half-k_half+k]
 
-        with nogil:
+            block_rows = ch_bd.shape[0]
+            block_cols = ch_bd.shape[1]
 
-            for i from 0 <= i < rows-scales_block by blk:
+            if _get_max(ch_bd, block_rows, block_cols) == 0:
+                con_min = 0.
+            else:
 
-                for j from 0 <= j < cols-scales_block by blk:
+                P_c[...] = P_
+                angle_dist_sums_c[...] = angle_dist_sums_
+                glcm_normed_[...] = P_
 
-                    for ki in range(0, scale_length):
+                glcm_mat = _greycomatrix(ch_bd,
+                                         dists,
+                                         disp_vect,
+                                         levels,
+                                         block_rows,
+                                         block_cols,
+                                         P_c,
+                                         angle_dist_sums_c,
+                                         glcm_normed_)
 
-                        k = scs[ki]
+                con_min = _glcm_contrast(glcm_mat, dists, disp_vect, levels, contrast_weights)
 
-                        k_half = <int>(k / 2.)
+            if weighted:
 
-                        ch_bd = chBd[i+scales_half-k_half:i+scales_half-k_half+k,
-                                     j+scales_half-k_half:j+scales_half-k_half+k]
+                _get_weighted_mean_var_byte(ch_bd,
+                                            dist_weights_stack[ki, :block_rows, :block_cols],
+                                            block_rows,
+                                            block_cols,
+                                            in_zs)
 
-                        block_rows = ch_bd.shape[0]
-                        block_cols = ch_bd.shape[1]
+                if not npy_isnan(con_min) and not npy_isinf(con_min):
+                    out_list_[pix_ctr] = con_min * in_zs[0]
 
-                        if _get_max(ch_bd, block_rows, block_cols) == 0:
-                            con_min = 0.
-                        else:
+            else:
 
-                            P_c[...] = P_
-                            angle_dist_sums_c[...] = angle_dist_sums_
-                            glcm_normed_[...] = P_
+                if not npy_isnan(con_min) and not npy_isinf(con_min):
+                    out_list_[pix_ctr] = con_min
 
-                            glcm_mat = _greycomatrix(ch_bd,
-                                                     dists,
-                                                     disp_vect,
-                                                     levels,
-                                                     block_rows,
-                                                     block_cols,
-                                                     P_c,
-                                                     angle_dist_sums_c,
-                                                     glcm_normed_)
+            pix_ctr += 1
 
-                            con_min = _glcm_contrast(glcm_mat,
-                                                     dists,
-                                                     disp_vect,
-                                                     levels,
-                                                     contrast_weights)
 
-                        with gil:
-                            kernel_weight = dist_weights_m[ki]
+cdef void _feature_pantex(DTYPE_uint8_t[:, ::1] chBd,
+                          int blk,
+                          DTYPE_uint16_t[::1] scs,
+                          int scales_half,
+                          int scales_block,
+                          int out_len,
+                          bint weighted,
+                          int rows,
+                          int cols,
+                          int scale_length,
+                          int levels,
+                          int n_threads,
+                          DTYPE_float32_t[::1] out_list_):
 
-                        _get_weighted_mean_var_byte(ch_bd, kernel_weight, block_rows, block_cols, in_zs)
+    """
+    Calculates the Anisotropic Built-up Presence Index (PanTex)
 
-                        if not npy_isnan(con_min) and not npy_isinf(con_min):
-                            out_list_[pix_ctr] = con_min * in_zs[0]
+    The GLCM code was adapted from the Scikit-image team
+    @ https://github.com/scikit-image/scikit-image/blob/master/skimage/feature/_texture.pyx
+    """
 
-                        pix_ctr += 1
+    cdef:
+        Py_ssize_t ki, ii, tid
+        DTYPE_uint16_t k
+        int k_half, rs, cs
+        DTYPE_float32_t pi = 3.14159265
 
-    else:
+        # directions [E, NE, N, NW]
+        DTYPE_float32_t[:] disp_vect = np.array([0., pi / 6., pi / 4., pi / 3., pi / 2., (2. * pi) / 3.,
+                                                 (3. * pi) / 4., (5. * pi) / 6.], dtype='float32')
 
-        with nogil:
+        DTYPE_float32_t[:] dists = np.array([1, 2], dtype='float32')
+        DTYPE_float32_t[:, ::1] contrast_weights = _set_contrast_weights(levels)
 
-            for i from 0 <= i < rows-scales_block by blk:
+        DTYPE_float32_t[:, :, :, ::1] P_ = np.zeros((levels, levels, dists.shape[0], disp_vect.shape[0]),
+                                                    dtype='float32')
 
-                for j from 0 <= j < cols-scales_block by blk:
+        DTYPE_float32_t[:, :] angle_dist_sums_ = np.zeros((dists.shape[0], disp_vect.shape[0]),
+                                                          dtype='float32')
 
-                    for ki in range(0, scale_length):
+        # Scratch arrays for each thread
+        DTYPE_float32_t[:, :, :, :, ::1] glcm_normed_t = np.zeros((n_threads,
+                                                                   levels,
+                                                                   levels,
+                                                                   dists.shape[0],
+                                                                   disp_vect.shape[0]), dtype='float32')
 
-                        k = scs[ki]
+        DTYPE_float32_t[:, :, :, :, ::1] P_t = glcm_normed_t.copy()
 
-                        k_half = <int>(k / 2.)
+        DTYPE_float32_t[:, :, ::1] angle_dist_sums_t = np.zeros((n_threads,
+                                                                 dists.shape[0],
+                                                                 disp_vect.shape[0]), dtype='float32')
 
-                        ch_bd = chBd[i+scales_half-k_half:i+scales_half-k_half+k,
-                                     j+scales_half-k_half:j+scales_half-k_half+k]
+        DTYPE_float32_t[:, ::1] in_zs_t = np.zeros((n_threads, 2), dtype='float32')
 
-                        block_rows = ch_bd.shape[0]
-                        block_cols = ch_bd.shape[1]
+        DTYPE_float32_t[:, ::1] dist_weights
+        DTYPE_float32_t[:, :, ::1] dist_weights_stack = np.zeros((scale_length, 1, 1), dtype='float32')
 
-                        if _get_max(ch_bd, block_rows, block_cols) == 0:
-                            con_min = 0.
-                        else:
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t row_len = _get_n_steps(cols, scales_block, blk) * scale_length
 
-                            P_c[...] = P_
-                            angle_dist_sums_c[...] = angle_dist_sums_
-                            glcm_normed_[...] = P_
+    if weighted:
 
-                            glcm_mat = _greycomatrix(ch_bd,
-                                                     dists,
-                                                     disp_vect,
-                                                     levels,
-                                                     block_rows,
-                                                     block_cols,
-                                                     P_c,
-                                                     angle_dist_sums_c,
-                                                     glcm_normed_)
+        dist_weights_stack = np.zeros((scale_length, scs[scale_length-1], scs[scale_length-1]), dtype='float32')
 
-                            con_min = _glcm_contrast(glcm_mat, dists, disp_vect, levels, contrast_weights)
+        for ki in range(0, scale_length):
 
-                        if not npy_isnan(con_min) and not npy_isinf(con_min):
-                            out_list_[pix_ctr] = con_min
+            k = scs[ki]
+            k_half = <int>(k / 2.)
+            rs = (scales_half - k_half + k) - (scales_half - k_half)
+            cs = (scales_half - k_half + k) - (scales_half - k_half)
 
-                        pix_ctr += 1
+            dist_weights = np.empty((rs, cs), dtype='float32')
+            dist_weights_stack[ki, :rs, :cs] = _create_weights(dist_weights, rs, cs)
 
+    with nogil:
 
-def feature_pantex(DTYPE_uint8_t[:, ::1] chbd, int blk, list scs, int end_scale, bint weighted, int levels=32):
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
+
+            tid = threadid()
+
+            _feature_pantex_row(chBd,
+                                ii*blk,
+                                blk,
+                                scs,
+                                scales_half,
+                                scales_block,
+                                weighted,
+                                cols,
+                                scale_length,
+                                levels,
+                                disp_vect,
+                                dists,
+                                contrast_weights,
+                                P_,
+                                angle_dist_sums_,
+                                P_t[tid],
+                                angle_dist_sums_t[tid],
+                                glcm_normed_t[tid],
+                                dist_weights_stack,
+                                in_zs_t[tid],
+                                ii*row_len,
+                                out_list_)
+
+
+def feature_pantex(DTYPE_uint8_t[:, ::1] chbd, int blk, list scs, int end_scale, bint weighted, int levels=32, int n_threads=1):
 
     cdef:
         Py_ssize_t i, j, ki
@@ -2518,81 +2619,446 @@ def feature_pantex(DTYPE_uint8_t[:, ::1] chbd, int blk, list scs, int end_scale,
                     cols,
                     scale_length,
                     levels,
+                    n_threads,
                     out_list)
 
     return np.float32(out_list)
 
 
-cdef DTYPE_float32_t[:, ::1] _create_weights(DTYPE_float32_t[:, ::1] dist_weights, int rs, int cs) nogil:
-
-    cdef:
-        Py_ssize_t ri, rj
-        DTYPE_float32_t rm = rs / 2.
-        DTYPE_float32_t cm = cs / 2.
-
-    for ri in range(0, rs):
-        for rj in range(0, cs):
-            dist_weights[ri, rj] = _euclidean_distance(cm, rm, float(rj), float(ri))
-
-    return dist_weights
 
+cdef void _pantex_column_sums(DTYPE_uint8_t[:, ::1] chBd,
+                              Py_ssize_t r0,
+                              Py_ssize_t r1,
+                              int cols,
+                              int levels,
+                              DTYPE_intp_t[:, ::1] offsets,
+                              DTYPE_int64_t[:, ::1] contrast_sums,
+                              DTYPE_int64_t[:, ::1] pair_counts,
+                              DTYPE_int64_t[::1] pixel_sums) nogil:
 
-cdef void feature_mean_float32(DTYPE_float32_t[:, ::1] ch_bd,
-                               unsigned int blk,
-                               DTYPE_uint16_t[::1] scs,
-                               unsigned int scales_half,
-                               unsigned int scales_block,
-                               unsigned int scale_length,
-                               DTYPE_float32_t[:, :, ::1] dist_weights_stack,
-                               DTYPE_float32_t[::1] in_zs,
-                               DTYPE_float32_t[::1] out_list_):
+    """
+    Sums the squared grey-level differences and the number of pixel pairs
+    of each offset, by origin column, over window rows [r0, r1)
+    """
 
     cdef:
-        Py_ssize_t i, j, ki, pix_ctr, pi
-        DTYPE_uint16_t k
-        unsigned int k_half, r_size, c_size
-        unsigned int rows = ch_bd.shape[0]
-        unsigned int cols = ch_bd.shape[1]
-        DTYPE_float32_t[:, ::1] block_chunk, dw
+        Py_ssize_t o, r, c, dr, dc, r_start, r_end, c_start, c_end
+        Py_ssize_t n_offsets = offsets.shape[0]
+        int gi, gj
 
-    pix_ctr = 0
+    contrast_sums[...] = 0
+    pair_counts[...] = 0
+    pixel_sums[...] = 0
 
-    with nogil:
+    for r in range(r0, r1):
+        for c in range(0, cols):
+            pixel_sums[c] += chBd[r, c]
 
-        for i from 0 <= i < rows-scales_block by blk:
+    for o in range(0, n_offsets):
 
-            for j from 0 <= j < cols-scales_block by blk:
+        dr = offsets[o, 0]
+        dc = offsets[o, 1]
 
-                for ki in range(0, scale_length):
+        # Both pixels of a pair must be within the window rows.
+        r_start = r0 - dr if dr < 0 else r0
+        r_end = r1 - dr if dr > 0 else r1
 
-                    k = scs[ki]
+        c_start = -dc if dc < 0 else 0
+        c_end = cols - dc if dc > 0 else cols
 
-                    k_half = <int>(k / 2.)
+        for r in range(r_start, r_end):
 
-                    #rc_start = scales_half - k_half
-                    #rc_end = scales_half - k_half + k
+            for c in range(c_start, c_end):
 
-                    #r_size = (i + rc_end) - (i + rc_start) if (i + rc_end) - (i + rc_start) <= rows else rows - (i + rc_start)
-                    #c_size = (j + rc_end) - (j + rc_start) if (j + rc_end) - (j + rc_start) <= cols else cols - (j + rc_start)
+                gi = chBd[r, c]
+                gj = chBd[r+dr, c+dc]
 
-                    block_chunk = ch_bd[i+scales_half-k_half:i+scales_half-k_half+k,
-                                        j+scales_half-k_half:j+scales_half-k_half+k]
+                if (gi < levels) and (gj < levels):
 
-                    r_size = block_chunk.shape[0]
-                    c_size = block_chunk.shape[1]
+                    contrast_sums[o, c] += (gi - gj) * (gi - gj)
+                    pair_counts[o, c] += 1
 
-                    dw = dist_weights_stack[ki, :r_size, :c_size]
 
-                    _get_weighted_mean_var(block_chunk, dw, r_size, c_size, in_zs)
+cdef void _slide_sums(DTYPE_int64_t[::1] column_sums,
+                      DTYPE_int64_t[::1] window_sums,
+                      Py_ssize_t idx,
+                      Py_ssize_t lo_prev,
+                      Py_ssize_t hi_prev,
+                      Py_ssize_t lo,
+                      Py_ssize_t hi) nogil:
 
-                    for pi in range(0, 2):
+    """
+    Moves a running sum from columns [lo_prev, hi_prev) to columns [lo, hi)
+    """
 
-                        out_list_[pix_ctr] = in_zs[pi]
+    cdef:
+        Py_ssize_t c
+        Py_ssize_t remove_end = lo if lo < hi_prev else hi_prev
+        Py_ssize_t add_start = hi_prev if hi_prev > lo else lo
+
+    # Remove the leaving columns.
+    for c in range(lo_prev, remove_end):
+        window_sums[idx] -= column_sums[c]
+
+    # Add the entering columns.
+    for c in range(add_start, hi):
+        window_sums[idx] += column_sums[c]
+
+
+cdef void _feature_pantex_incremental_row(DTYPE_uint8_t[:, ::1] chBd,
+                                          Py_ssize_t i,
+                                          int blk,
+                                          DTYPE_uint16_t[::1] scs,
+                                          int scales_half,
+                                          bint weighted,
+                                          int rows,
+                                          int cols,
+                                          Py_ssize_t n_block_cols,
+                                          int scale_length,
+                                          int levels,
+                                          DTYPE_intp_t[:, ::1] offsets,
+                                          DTYPE_int64_t[:, ::1] contrast_sums,
+                                          DTYPE_int64_t[:, ::1] pair_counts,
+                                          DTYPE_int64_t[::1] pixel_sums,
+                                          DTYPE_int64_t[:, ::1] window_sums,
+                                          DTYPE_intp_t[:, ::1] bounds,
+                                          DTYPE_float32_t[:, :, ::1] dist_weights_stack,
+                                          DTYPE_float32_t[::1] in_zs,
+                                          Py_ssize_t pix_ctr,
+                                          DTYPE_float32_t[::1] out_list_) nogil:
 
-                        pix_ctr += 1
+    """
+    Computes PanTex for one row of blocks, sliding each scale window across the columns
+
+    contrast_sums, pair_counts, pixel_sums, window_sums, bounds, and in_zs are scratch arrays
+    of the calling thread. window_sums holds the running (contrast, pair count) sums of each
+    offset, with the running pixel sum last, and bounds holds the columns they cover.
+    """
+
+    cdef:
+        Py_ssize_t jj, ki, o, r0, r1, c0, c1, lo, hi, dc
+        Py_ssize_t n_offsets = offsets.shape[0]
+        DTYPE_uint16_t k
+        int k_half
+        DTYPE_uint8_t[:, ::1] ch_bd
+        DTYPE_float32_t con_min, con
+
+    for ki in range(0, scale_length):
+
+        k = scs[ki]
+
+        k_half = <int>(k / 2.)
+
+        r0 = i + scales_half - k_half
+        r1 = r0 + k if r0 + k < rows else rows
+
+        _pantex_column_sums(chBd, r0, r1, cols, levels, offsets, contrast_sums, pair_counts, pixel_sums)
+
+        window_sums[...] = 0
+        bounds[...] = 0
+
+        for jj in range(0, n_block_cols):
+
+            c0 = jj * blk + scales_half - k_half
+            c1 = c0 + k if c0 + k < cols else cols
+
+            for o in range(0, n_offsets):
 
+                dc = offsets[o, 1]
+
+                # Origin columns of pairs with both pixels in the window
+                lo = c0 - dc if dc < 0 else c0
+                hi = c1 - dc if dc > 0 else c1
+
+                if hi < lo:
+                    hi = lo
+
+                if jj == 0:
+                    bounds[o, 0] = lo
+                    bounds[o, 1] = lo
+
+                _slide_sums(contrast_sums[o], window_sums[0], o, bounds[o, 0], bounds[o, 1], lo, hi)
+                _slide_sums(pair_counts[o], window_sums[1], o, bounds[o, 0], bounds[o, 1], lo, hi)
+
+                bounds[o, 0] = lo
+                bounds[o, 1] = hi
+
+            if jj == 0:
+                bounds[n_offsets, 0] = c0
+                bounds[n_offsets, 1] = c0
+
+            _slide_sums(pixel_sums, window_sums[2], 0, bounds[n_offsets, 0], bounds[n_offsets, 1], c0, c1)
+
+            bounds[n_offsets, 0] = c0
+            bounds[n_offsets, 1] = c1
+
+            if window_sums[2, 0] == 0:
+                con_min = 0.
+            else:
+
+                con_min = 1000000.
+
+                # The minimum contrast over all angle/distance pairs. Offsets
+                #   without pairs have no contrast, as in `_glcm_contrast`.
+                for o in range(0, n_offsets):
+
+                    if window_sums[1, o] > 0:
+
+                        con = <DTYPE_float32_t>(<DTYPE_float64_t>window_sums[0, o] / <DTYPE_float64_t>window_sums[1, o])
+                        con_min = _get_min_sample(con_min, con)
+
+            if weighted:
+
+                ch_bd = chBd[r0:r1, c0:c1]
+
+                _get_weighted_mean_var_byte(ch_bd,
+                                            dist_weights_stack[ki, :r1-r0, :c1-c0],
+                                            r1-r0,
+                                            c1-c0,
+                                            in_zs)
+
+                if not npy_isnan(con_min) and not npy_isinf(con_min):
+                    out_list_[pix_ctr+jj*scale_length+ki] = con_min * in_zs[0]
+
+            else:
 
-def feature_mean(DTYPE_float32_t[:, ::1] ch_bd, int blk, list scs, int end_scale):
+                if not npy_isnan(con_min) and not npy_isinf(con_min):
+                    out_list_[pix_ctr+jj*scale_length+ki] = con_min
+
+
+cdef void _feature_pantex_incremental(DTYPE_uint8_t[:, ::1] chBd,
+                                      int blk,
+                                      DTYPE_uint16_t[::1] scs,
+                                      int scales_half,
+                                      int scales_block,
+                                      bint weighted,
+                                      int rows,
+                                      int cols,
+                                      int scale_length,
+                                      int levels,
+                                      int n_threads,
+                                      DTYPE_float32_t[::1] out_list_):
+
+    """
+    Calculates PanTex from running co-occurrence sums
+
+    PanTex only needs the GLCM contrast, which for each angle/distance pair is the
+    mean squared grey-level difference of the (symmetric) pixel pairs. Instead of
+    building the co-occurrence matrix of every window, the squared differences and
+    pair counts are summed by column once per row of blocks, and each window
+    adds the entering columns and removes the leaving ones as it slides by `blk`.
+    """
+
+    cdef:
+        Py_ssize_t ki, ii, tid, a_idx, d_idx
+        DTYPE_uint16_t k
+        int k_half, rs, cs
+        DTYPE_float32_t pi = 3.14159265
+        DTYPE_float32_t angle, distance
+
+        # The same directions and distances as `_feature_pantex`
+        DTYPE_float32_t[:] disp_vect = np.array([0., pi / 6., pi / 4., pi / 3., pi / 2., (2. * pi) / 3.,
+                                                 (3. * pi) / 4., (5. * pi) / 6.], dtype='float32')
+
+        DTYPE_float32_t[:] dists = np.array([1, 2], dtype='float32')
+
+        Py_ssize_t n_offsets = disp_vect.shape[0] * dists.shape[0]
+
+        # (row, column) offsets, in the angle/distance order of `_glcm_loop`
+        DTYPE_intp_t[:, ::1] offsets = np.zeros((n_offsets, 2), dtype='intp')
+
+        # Scratch arrays for each thread
+        DTYPE_int64_t[:, :, ::1] contrast_sums_t = np.zeros((n_threads, n_offsets, cols), dtype='int64')
+        DTYPE_int64_t[:, :, ::1] pair_counts_t = np.zeros((n_threads, n_offsets, cols), dtype='int64')
+        DTYPE_int64_t[:, ::1] pixel_sums_t = np.zeros((n_threads, cols), dtype='int64')
+        DTYPE_int64_t[:, :, ::1] window_sums_t = np.zeros((n_threads, 3, n_offsets), dtype='int64')
+        DTYPE_intp_t[:, :, ::1] bounds_t = np.zeros((n_threads, n_offsets+1, 2), dtype='intp')
+        DTYPE_float32_t[:, ::1] in_zs_t = np.zeros((n_threads, 2), dtype='float32')
+
+        DTYPE_float32_t[:, ::1] dist_weights
+        DTYPE_float32_t[:, :, ::1] dist_weights_stack = np.zeros((scale_length, 1, 1), dtype='float32')
+
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t n_block_cols = _get_n_steps(cols, scales_block, blk)
+        Py_ssize_t row_len = n_block_cols * scale_length
+
+    for a_idx in range(0, disp_vect.shape[0]):
+
+        angle = disp_vect[a_idx]
+
+        for d_idx in range(0, dists.shape[0]):
+
+            distance = dists[d_idx]
+
+            offsets[a_idx*dists.shape[0]+d_idx, 0] = <int>(roundd(sin(angle) * distance))
+            offsets[a_idx*dists.shape[0]+d_idx, 1] = <int>(roundd(cos(angle) * distance))
+
+    if weighted:
+
+        dist_weights_stack = np.zeros((scale_length, scs[scale_length-1], scs[scale_length-1]), dtype='float32')
+
+        for ki in range(0, scale_length):
+
+            k = scs[ki]
+            k_half = <int>(k / 2.)
+            rs = (scales_half - k_half + k) - (scales_half - k_half)
+            cs = (scales_half - k_half + k) - (scales_half - k_half)
+
+            dist_weights = np.empty((rs, cs), dtype='float32')
+            dist_weights_stack[ki, :rs, :cs] = _create_weights(dist_weights, rs, cs)
+
+    with nogil:
+
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
+
+            tid = threadid()
+
+            _feature_pantex_incremental_row(chBd,
+                                            ii*blk,
+                                            blk,
+                                            scs,
+                                            scales_half,
+                                            weighted,
+                                            rows,
+                                            cols,
+                                            n_block_cols,
+                                            scale_length,
+                                            levels,
+                                            offsets,
+                                            contrast_sums_t[tid],
+                                            pair_counts_t[tid],
+                                            pixel_sums_t[tid],
+                                            window_sums_t[tid],
+                                            bounds_t[tid],
+                                            dist_weights_stack,
+                                            in_zs_t[tid],
+                                            ii*row_len,
+                                            out_list_)
+
+
+def feature_pantex_incremental(DTYPE_uint8_t[:, ::1] chbd, int blk, list scs, int end_scale, bint weighted, int levels=32, int n_threads=1):
+
+    """
+    Computes PanTex with running co-occurrence sums. The output is the same as `feature_pantex`.
+    """
+
+    cdef:
+        int scales_half = <int>(end_scale / 2.)
+        int scales_block = end_scale - blk
+        int rows = chbd.shape[0]
+        int cols = chbd.shape[1]
+        DTYPE_uint16_t[::1] scales_array = np.array(scs, dtype='uint16')
+        int scale_length = scales_array.shape[0]
+        unsigned int out_len = _get_output_length(rows, cols, scales_block, blk, scale_length, 1)
+        DTYPE_float32_t[::1] out_list = np.zeros(out_len, dtype='float32')
+
+    _feature_pantex_incremental(chbd,
+                                blk,
+                                scales_array,
+                                scales_half,
+                                scales_block,
+                                weighted,
+                                rows,
+                                cols,
+                                scale_length,
+                                levels,
+                                n_threads,
+                                out_list)
+
+    return np.float32(out_list)
+
+cdef DTYPE_float32_t[:, ::1] _create_weights(DTYPE_float32_t[:, ::1] dist_weights, int rs, int cs) nogil:
+
+    cdef:
+        Py_ssize_t ri, rj
+        DTYPE_float32_t rm = rs / 2.
+        DTYPE_float32_t cm = cs / 2.
+
+    for ri in range(0, rs):
+        for rj in range(0, cs):
+            dist_weights[ri, rj] = _euclidean_distance(cm, rm, float(rj), float(ri))
+
+    return dist_weights
+
+
+cdef void _feature_mean_var_row(DTYPE_float32_t[:, ::1] ch_bd,
+                                Py_ssize_t i,
+                                int blk,
+                                DTYPE_uint16_t[::1] scs,
+                                int scales_half,
+                                int scales_block,
+                                int cols,
+                                int scale_length,
+                                DTYPE_float32_t[:, :, ::1] dist_weights_stack,
+                                Py_ssize_t pix_ctr,
+                                DTYPE_float32_t[::1] out_list_) nogil:
+
+    """Computes the weighted mean and variance for one row of blocks"""
+
+    cdef:
+        Py_ssize_t j, ki
+        DTYPE_uint16_t k
+        int k_half, r_size, c_size
+        DTYPE_float32_t[:, ::1] block_chunk, dw
+
+    for j from 0 <= j < cols-scales_block by blk:
+
+        for ki in range(0, scale_length):
+
+            k = scs[ki]
+
+            k_half = <int>(k / 2.)
+
+            block_chunk = ch_bd[i+scales_half-k_half:i+scales_half-k_half+k,
+                                j+scales_half-k_half:j+scales_half-k_half+k]
+
+            r_size = block_chunk.shape[0]
+            c_size = block_chunk.shape[1]
+
+            dw = dist_weights_stack[ki, :r_size, :c_size]
+
+            _get_weighted_mean_var(block_chunk, dw, r_size, c_size, out_list_[pix_ctr:pix_ctr+2])
+
+            pix_ctr += 2
+
+
+cdef void feature_mean_float32(DTYPE_float32_t[:, ::1] ch_bd,
+                               unsigned int blk,
+                               DTYPE_uint16_t[::1] scs,
+                               unsigned int scales_half,
+                               unsigned int scales_block,
+                               unsigned int scale_length,
+                               DTYPE_float32_t[:, :, ::1] dist_weights_stack,
+                               int n_threads,
+                               DTYPE_float32_t[::1] out_list_):
+
+    cdef:
+        Py_ssize_t ii
+        int rows = ch_bd.shape[0]
+        int cols = ch_bd.shape[1]
+        Py_ssize_t n_block_rows = _get_n_steps(rows, scales_block, blk)
+        Py_ssize_t row_len = _get_n_steps(cols, scales_block, blk) * scale_length * 2
+
+    # Each row of blocks has a fixed
+    #   position in the output.
+    with nogil:
+
+        for ii in prange(0, n_block_rows, schedule='dynamic', num_threads=n_threads):
+
+            _feature_mean_var_row(ch_bd,
+                                  ii*blk,
+                                  blk,
+                                  scs,
+                                  scales_half,
+                                  scales_block,
+                                  cols,
+                                  scale_length,
+                                  dist_weights_stack,
+                                  ii*row_len,
+                                  out_list_)
+
+
+def feature_mean(DTYPE_float32_t[:, ::1] ch_bd, int blk, list scs, int end_scale, int n_threads=1):
 
     cdef:
         Py_ssize_t i, j, ki
@@ -2605,7 +3071,6 @@ def feature_mean(DTYPE_float32_t[:, ::1] ch_bd, int blk, list scs, int end_scale
         unsigned int k, k_half, rc_start, rc_end, rc
         DTYPE_float32_t[:, :, ::1] dist_weights_stack = np.zeros((scale_length, end_scale*2, end_scale*2), dtype='float32')
         DTYPE_float32_t[:, ::1] dist_weights
-        DTYPE_float32_t[::1] in_zs = np.zeros(2, dtype='float32')
         unsigned int out_len = _get_output_length(rows, cols, scales_block, blk, scale_length, 2)
         DTYPE_float32_t[::1] out_list = np.zeros(out_len, dtype='float32')
 
@@ -2630,7 +3095,7 @@ def feature_mean(DTYPE_float32_t[:, ::1] ch_bd, int blk, list scs, int end_scale
                          scales_block,
                          scale_length,
                          dist_weights_stack,
-                         in_zs,
+                         n_threads,
                          out_list)
 
     return np.float32(out_list)
@@ -2817,6 +3282,9 @@ cdef void _feature_lacunarity(DTYPE_uint8_t[:, ::1] chunk_block,
         Py_ssize_t pixel_counter = 0
         DTYPE_uint8_t[:, ::1] ch_bd
 
+    # The `zs` scratch array is shared by every window
+    #   (and is not cleared), so windows are processed
+    #   serially and in order.
     with nogil:
 
         for i from 0 <= i < rows-scales_block by blk:
@@ -2872,6 +3340,368 @@ def feature_lacunarity(DTYPE_uint8_t[:, ::1] chunk_block, int blk, list scales,
     return np.float32(out_list)
 
 
+cdef void _sliding_max_uint8(DTYPE_uint8_t[::1] values,
+                             Py_ssize_t n,
+                             int width,
+                             DTYPE_uint8_t[::1] prefix,
+                             DTYPE_uint8_t[::1] suffix,
+                             DTYPE_uint8_t[::1] out) nogil:
+
+    """
+    Sliding maximum (van Herk/Gil-Werman), where out[x] is the maximum of values[x:x+width]
+    """
+
+    cdef:
+        Py_ssize_t x
+
+    for x in range(0, n):
+
+        if x % width == 0:
+            prefix[x] = values[x]
+        else:
+            prefix[x] = _get_max_sample_int(prefix[x-1], values[x])
+
+    for x in range(n-1, -1, -1):
+
+        if (x == n - 1) or ((x + 1) % width == 0):
+            suffix[x] = values[x]
+        else:
+            suffix[x] = _get_max_sample_int(suffix[x+1], values[x])
+
+    for x in range(0, n-width+1):
+        out[x] = _get_max_sample_int(suffix[x], prefix[x+width-1])
+
+
+cdef void _sliding_min_uint8(DTYPE_uint8_t[::1] values,
+                             Py_ssize_t n,
+                             int width,
+                             DTYPE_uint8_t[::1] prefix,
+                             DTYPE_uint8_t[::1] suffix,
+                             DTYPE_uint8_t[::1] out) nogil:
+
+    """
+    Sliding minimum (van Herk/Gil-Werman), where out[x] is the minimum of values[x:x+width]
+    """
+
+    cdef:
+        Py_ssize_t x
+
+    for x in range(0, n):
+
+        if x % width == 0:
+            prefix[x] = values[x]
+        else:
+            prefix[x] = _get_min_sample_int(prefix[x-1], values[x])
+
+    for x in range(n-1, -1, -1):
+
+        if (x == n - 1) or ((x + 1) % width == 0):
+            suffix[x] = values[x]
+        else:
+            suffix[x] = _get_min_sample_int(suffix[x+1], values[x])
+
+    for x in range(0, n-width+1):
+        out[x] = _get_min_sample_int(suffix[x], prefix[x+width-1])
+
+
+cdef void _box_rasters(DTYPE_uint8_t[:, ::1] chunk_block,
+                       int r,
+                       DTYPE_uint8_t[:, ::1] row_max,
+                       DTYPE_uint8_t[:, ::1] row_min,
+                       DTYPE_uint8_t[::1] values,
+                       DTYPE_uint8_t[::1] prefix,
+                       DTYPE_uint8_t[::1] suffix,
+                       DTYPE_uint8_t[::1] column_out,
+                       DTYPE_uint8_t[:, ::1] box_max,
+                       DTYPE_uint8_t[:, ::1] box_min,
+                       DTYPE_uint8_t[:, ::1] box_mass) nogil:
+
+    """
+    Computes the maximum, minimum, and differential box count of the r x r box
+    that starts at every pixel of the section
+
+    The row and column buffers hold max(rows, columns) values.
+    """
+
+    cdef:
+        Py_ssize_t rows = chunk_block.shape[0]
+        Py_ssize_t cols = chunk_block.shape[1]
+        Py_ssize_t box_rows = box_max.shape[0]
+        Py_ssize_t box_cols = box_max.shape[1]
+        Py_ssize_t y, x
+
+    # Along the rows
+    for y in range(0, rows):
+
+        _sliding_max_uint8(chunk_block[y], cols, r, prefix, suffix, row_max[y])
+        _sliding_min_uint8(chunk_block[y], cols, r, prefix, suffix, row_min[y])
+
+    # Along the columns
+    for x in range(0, box_cols):
+
+        for y in range(0, rows):
+            values[y] = row_max[y, x]
+
+        _sliding_max_uint8(values, rows, r, prefix, suffix, column_out)
+
+        for y in range(0, box_rows):
+            box_max[y, x] = column_out[y]
+
+        for y in range(0, rows):
+            values[y] = row_min[y, x]
+
+        _sliding_min_uint8(values, rows, r, prefix, suffix, column_out)
+
+        for y in range(0, box_rows):
+            box_min[y, x] = column_out[y]
+
+    # The same box count as `max_box_number`. `_get_max` starts
+    #   from -255, which is 1 as uint8, so the maxima are at least 1.
+    for y in range(0, box_rows):
+        for x in range(0, box_cols):
+
+            box_mass[y, x] = <DTYPE_uint8_t>(<int>(ceil(float(_get_max_sample_int(1, box_max[y, x])) / r)) -
+                                             <int>(ceil(float(box_min[y, x]) / r)) + 1)
+
+
+cdef DTYPE_float32_t _lacunarity_boxes(DTYPE_uint8_t[:, ::1] chunk_sub,
+                                       DTYPE_uint8_t[:, ::1] box_mass,
+                                       Py_ssize_t y0,
+                                       Py_ssize_t x0,
+                                       int window_max,
+                                       int window_min,
+                                       int r,
+                                       DTYPE_float32_t[::1] zs) nogil:
+
+    """
+    The lacunarity of `_lacunarity`, with the box counts of full r x r boxes
+    taken from the section box raster (the window starts at y0, x0)
+    """
+
+    cdef:
+        int rows_ = chunk_sub.shape[0]
+        int cols_ = chunk_sub.shape[1]
+
+        int maxw = (window_max - window_min) + 1
+
+        int n_rows_ = <int>(ceil(float(rows_) / r))
+        int n_cols_ = <int>(ceil(float(cols_) / r))
+
+        int ns = <int>(float(n_rows_) * float(n_cols_))
+
+        # The arrays share the `zs` scratch array, as in `_lacunarity`.
+        DTYPE_float32_t[::1] nsr = zs[:ns]
+
+        int maxww = maxw + 1
+
+        DTYPE_float32_t[::1] nqr = zs[:maxww]
+
+        int nn = 0
+        Py_ssize_t mm, n, dd
+        int rr_rows, rr_cols
+        DTYPE_uint8_t[:, ::1] w
+        int m
+
+        DTYPE_float32_t smn, l2_sum
+        DTYPE_float32_t[::1] l1 = zs[:ns]
+        DTYPE_float32_t[::1] l2 = zs[:ns]
+        DTYPE_float32_t ns_rp
+
+    for mm from 0 <= mm < rows_ by r:
+
+        rr_rows = n_rows_cols(mm, r, rows_)
+
+        for n from 0 <= n < cols_ by r:
+
+            rr_cols = n_rows_cols(n, r, cols_)
+
+            if (rr_rows == r) and (rr_cols == r):
+                m = box_mass[y0+mm, x0+n]
+            else:
+
+                # Boxes clipped by the window edge
+                w = chunk_sub[mm:mm+rr_rows, n:n+rr_cols]
+                m = max_box_number(w, rr_rows, rr_cols)
+
+            nsr[nn] = m
+
+            nqr[m] += 1
+
+            nn += 1
+
+    _div1d(nqr, maxww, float(ns))
+
+    for dd in range(0, ns):
+
+        ns_rp = nsr[dd]
+
+        l1[dd] = pow2(ns_rp) * nqr[<int>ns_rp]
+        l2[dd] = ns_rp * nqr[<int>ns_rp]
+
+    smn = _get_sum1d(l2, ns)
+    l2_sum = pow2(smn)
+
+    if l2_sum != 0:
+        return _get_sum1d(l1, ns) / l2_sum
+    else:
+        return 0.
+
+
+cdef void _feature_lacunarity_boxes(DTYPE_uint8_t[:, ::1] chunk_block,
+                                    int blk,
+                                    DTYPE_uint16_t[::1] scales,
+                                    int scales_half,
+                                    int scales_block,
+                                    int rows,
+                                    int cols,
+                                    int r,
+                                    int scale_length,
+                                    DTYPE_uint8_t[:, ::1] box_max,
+                                    DTYPE_uint8_t[:, ::1] box_min,
+                                    DTYPE_uint8_t[:, ::1] box_mass,
+                                    DTYPE_float32_t[::1] zs,
+                                    DTYPE_float32_t[::1] out_list_):
+
+    cdef:
+        Py_ssize_t i, j, ki, cr, cc, bi, bj, y0, x0
+        unsigned int k, k_half
+        Py_ssize_t pixel_counter = 0
+        DTYPE_uint8_t[:, ::1] ch_bd
+        DTYPE_uint8_t window_max, window_min
+
+    # The `zs` scratch array is shared by every window
+    #   (and is not cleared), so windows are processed
+    #   serially and in order.
+    with nogil:
+
+        for i from 0 <= i < rows-scales_block by blk:
+
+            for j from 0 <= j < cols-scales_block by blk:
+
+                for ki in range(0, scale_length):
+
+                    k = scales[ki]
+                    k_half = <int>(k / 2.)
+
+                    y0 = i + scales_half - k_half
+                    x0 = j + scales_half - k_half
+
+                    ch_bd = chunk_block[y0:y0+k, x0:x0+k]
+
+                    cr = ch_bd.shape[0]
+                    cc = ch_bd.shape[1]
+
+                    # Windows that are tiled by full boxes get
+                    #   their range from the box maxima and minima.
+                    #   The maximum starts at 1, as in `_get_max`.
+                    if (cr % r == 0) and (cc % r == 0):
+
+                        window_max = 1
+                        window_min = 255
+
+                        for bi from 0 <= bi < cr by r:
+                            for bj from 0 <= bj < cc by r:
+
+                                window_max = _get_max_sample_int(window_max, box_max[y0+bi, x0+bj])
+                                window_min = _get_min_sample_int(window_min, box_min[y0+bi, x0+bj])
+
+                    else:
+
+                        window_max = _get_max(ch_bd, cr, cc)
+                        window_min = _get_min(ch_bd, cr, cc)
+
+                    if window_max == 0:
+                        out_list_[pixel_counter] = 0
+                    else:
+                        out_list_[pixel_counter] = _lacunarity_boxes(ch_bd,
+                                                                     box_mass,
+                                                                     y0,
+                                                                     x0,
+                                                                     window_max,
+                                                                     window_min,
+                                                                     r,
+                                                                     zs)
+
+                    pixel_counter += 1
+
+
+def feature_lacunarity_boxes(DTYPE_uint8_t[:, ::1] chunk_block, int blk, list scales, int end_scale, int r=2):
+
+    """
+    Computes lacunarity, with the same results as `feature_lacunarity`
+
+    The maximum, minimum, and box count of every r x r box are computed once per section with
+    sliding (van Herk/Gil-Werman) filters, so overlapping windows and scales share them
+    instead of recounting their boxes.
+
+    Args:
+        chunk_block (2d array): The uint8 section.
+        blk (int): The block size.
+        scales (list): The scales.
+        end_scale (int): The largest scale.
+        r (Optional[int]): The box size. Default is 2.
+
+    Returns:
+        The features as a 1d float32 array
+    """
+
+    cdef:
+        int rows = chunk_block.shape[0]
+        int cols = chunk_block.shape[1]
+        int scales_half = end_scale / 2
+        int scales_block = end_scale - blk
+        DTYPE_uint16_t[::1] scale_array = np.array(scales, dtype='uint16')
+        int scale_length = scale_array.shape[0]
+        DTYPE_float32_t[::1] zs = np.zeros((end_scale*2)*(end_scale*2), dtype='float32')
+        unsigned int out_len = _get_output_length(rows, cols, scales_block, blk, scale_length, 1)
+        DTYPE_float32_t[::1] out_list = np.zeros(out_len, dtype='float32')
+        int box_rows = max(rows - r + 1, 0)
+        int box_cols = max(cols - r + 1, 0)
+        int n_values = max(rows, cols)
+        DTYPE_uint8_t[:, ::1] row_max = np.zeros((rows, cols), dtype='uint8')
+        DTYPE_uint8_t[:, ::1] row_min = np.zeros((rows, cols), dtype='uint8')
+        DTYPE_uint8_t[::1] values = np.zeros(n_values, dtype='uint8')
+        DTYPE_uint8_t[::1] prefix = np.zeros(n_values, dtype='uint8')
+        DTYPE_uint8_t[::1] suffix = np.zeros(n_values, dtype='uint8')
+        DTYPE_uint8_t[::1] column_out = np.zeros(n_values, dtype='uint8')
+        DTYPE_uint8_t[:, ::1] box_max = np.zeros((box_rows, box_cols), dtype='uint8')
+        DTYPE_uint8_t[:, ::1] box_min = np.zeros((box_rows, box_cols), dtype='uint8')
+        DTYPE_uint8_t[:, ::1] box_mass = np.zeros((box_rows, box_cols), dtype='uint8')
+
+    if (box_rows > 0) and (box_cols > 0):
+
+        with nogil:
+
+            _box_rasters(chunk_block,
+                         r,
+                         row_max,
+                         row_min,
+                         values,
+                         prefix,
+                         suffix,
+                         column_out,
+                         box_max,
+                         box_min,
+                         box_mass)
+
+    _feature_lacunarity_boxes(chunk_block,
+                              blk,
+                              scale_array,
+                              scales_half,
+                              scales_block,
+                              rows,
+                              cols,
+                              r,
+                              scale_length,
+                              box_max,
+                              box_min,
+                              box_mass,
+                              zs,
+                              out_list)
+
+    return np.float32(out_list)
+
+
 # cdef azimuthal_avg(image, center=None):
 #
 #     """
@@ -59,6 +59,147 @@ def prep_gabor(n_orientations=32, sigma=3., lambd=10., gamma=.5, psi=1., kernel_
     return kernels
 
 
+# Kernels at least this size are applied in the frequency domain.
+GABOR_FFT_SIZE = 11
+
+# Gabor kernels, by kernel size
+_GABOR_KERNELS = dict()
+
+# Frequency responses of the kernels, by (DFT rows, DFT columns, kernel size)
+_GABOR_SPECTRA = dict()
+
+
+def gabor_kernel_size(scale):
+
+    """Returns the (odd) Gabor kernel size of a scale"""
+
+    return scale - 1 if scale % 2 == 0 else scale
+
+
+def get_gabor_kernels(kernel_size):
+
+    """
+    Gets the Gabor kernels of a kernel size, which are only built once
+
+    Args:
+        kernel_size (int): The Gabor kernel size.
+    """
+
+    if kernel_size not in _GABOR_KERNELS:
+        _GABOR_KERNELS[kernel_size] = prep_gabor(kernel_size=(kernel_size, kernel_size))
+
+    return _GABOR_KERNELS[kernel_size]
+
+
+def _get_gabor_spectra(dft_rows, dft_cols, kernel_size):
+
+    """
+    Gets the (packed) frequency responses of the Gabor kernels for a DFT size
+
+    Only the spectra of the most recent DFT size are kept, as
+    sections of an image mostly have the same size.
+    """
+
+    key = (dft_rows, dft_cols, kernel_size)
+
+    if key not in _GABOR_SPECTRA:
+
+        if any([spectra_key[:2] != (dft_rows, dft_cols) for spectra_key in _GABOR_SPECTRA]):
+            _GABOR_SPECTRA.clear()
+
+        spectra = list()
+
+        for kernel in get_gabor_kernels(kernel_size):
+
+            kernel_padded = np.zeros((dft_rows, dft_cols), dtype='float32')
+            kernel_padded[:kernel_size, :kernel_size] = kernel
+
+            spectra.append(cv2.dft(kernel_padded))
+
+        _GABOR_SPECTRA[key] = spectra
+
+    return _GABOR_SPECTRA[key]
+
+
+def filter_bank(bd, scales, fft_size=GABOR_FFT_SIZE):
+
+    """
+    Filters an image with the Gabor kernels of each scale
+
+    Kernels smaller than `fft_size` are applied with `cv2.filter2D`. The image is
+    transformed once for all larger kernels, and each of those responses is one
+    spectrum product and an inverse transform. The borders are reflected like
+    `cv2.filter2D`, and responses are rounded and clipped to 8-bit the same way,
+    apart from rare rounding ties.
+
+    Args:
+        bd (2d array): The uint8 image.
+        scales (1d array like): The scales, one kernel bank each.
+        fft_size (Optional[int]): The smallest kernel size to apply in the frequency domain.
+            If None, all kernels are applied with `cv2.filter2D`. Default is `GABOR_FFT_SIZE`.
+
+    Returns:
+        The responses as a uint8 array, shaped [scales x orientations x rows x columns],
+        with the scales and orientations flattened.
+    """
+
+    rows, cols = bd.shape
+
+    kernel_sizes = [gabor_kernel_size(scale) for scale in scales]
+    n_kernels = len(get_gabor_kernels(kernel_sizes[0]))
+
+    out_block = np.empty((n_kernels*len(scales), rows, cols), dtype='uint8')
+
+    fft_sizes = [kernel_size for kernel_size in kernel_sizes
+                 if isinstance(fft_size, int) and (kernel_size >= fft_size)]
+
+    if fft_sizes:
+
+        # Pad with the largest kernel half-width so every
+        #   kernel fits, without wrapping around.
+        pad = int((max(fft_sizes) - 1) / 2)
+
+        dft_rows = cv2.getOptimalDFTSize(rows + 2*pad)
+        dft_cols = cv2.getOptimalDFTSize(cols + 2*pad)
+
+        bd_padded = cv2.copyMakeBorder(np.float32(bd),
+                                       pad,
+                                       dft_rows - rows - pad,
+                                       pad,
+                                       dft_cols - cols - pad,
+                                       cv2.BORDER_REFLECT_101)
+
+        bd_spectrum = cv2.dft(bd_padded)
+
+    ki = 0
+
+    for kernel_size in kernel_sizes:
+
+        if kernel_size in fft_sizes:
+
+            offset = pad - int((kernel_size - 1) / 2)
+
+            for kernel_spectrum in _get_gabor_spectra(dft_rows, dft_cols, kernel_size):
+
+                # Cross-correlation, as `cv2.filter2D`
+                response = cv2.idft(cv2.mulSpectrums(bd_spectrum, kernel_spectrum, 0, conjB=True),
+                                    flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+
+                out_block[ki] = np.clip(np.rint(response[offset:offset+rows, offset:offset+cols]), 0, 255)
+
+                ki += 1
+
+        else:
+
+            for kernel in get_gabor_kernels(kernel_size):
+
+                out_block[ki] = cv2.filter2D(bd, cv2.CV_8U, kernel)
+
+                ki += 1
+
+    return out_block
+
+
 def visualize(out_fig, cmap, grid_rows, grid_cols, **kwargs):
 
     import matplotlib.pyplot as plt
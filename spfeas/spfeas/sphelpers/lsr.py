@@ -6,6 +6,8 @@ Adapted from Anil Cheriyadat's MATLAB code
 from __future__ import absolute_import, division
 from builtins import int
 
+from multiprocessing.pool import ThreadPool
+
 from . import _lsr
 
 try:
@@ -267,3 +269,351 @@ def feature_lsr(orientation, magnitude, x_deriv, y_deriv):
     feas[(np.isnan(feas))] = 0.
 
     return feas
+
+
+# The `BinQ` bin edges. The shifted set has 7 edges, from 22.5 to 360. Its bins 1-6
+#   are grouped first, and then the (337.5, 360] and (0, 22.5] wrap around.
+ORIENTATION_BINS = list(range(0, 360+45, 45))
+SHIFTED_BINS = list(np.linspace(22.5, 360, num=int(np.floor((360-22.5)/45.))))
+
+LENGTH_BINS = list(range(5, 200+4, 4))
+CONTRAST_BINS = list(np.linspace(0, 10, num=int(np.floor(10./.5))))
+
+# The edge magnitude threshold, and the minimum region size
+MAG_THRESH = .5
+LSR_THRESH = 5
+
+
+def _window_crops(rows, cols, blk, scs, end_scale):
+
+    """
+    Gets the section crops of each window and scale, in the order of `feature_lsr` calls
+
+    Returns:
+        A list, by window row, of (row start, row end, column start, column end) crops
+    """
+
+    scales_half = int(end_scale / 2)
+
+    crops = list()
+
+    for i in range(0, rows-(end_scale-blk), blk):
+
+        row_crops = list()
+
+        for j in range(0, cols-(end_scale-blk), blk):
+
+            window_rows = min(end_scale, rows-i)
+            window_cols = min(end_scale, cols-j)
+
+            for k in scs:
+
+                if k != scs[-1]:
+
+                    ifst = scales_half - int(k / 2)
+                    isnd = ifst + k
+
+                else:
+
+                    ifst = 0
+                    isnd = end_scale
+
+                row_crops.append((i+min(ifst, window_rows),
+                                  i+min(isnd, window_rows),
+                                  j+min(ifst, window_cols),
+                                  j+min(isnd, window_cols)))
+
+        crops.append(row_crops)
+
+    return crops
+
+
+def _orientation_bins(orientation, magnitude):
+
+    """
+    Gets the `BinQ` bins of the edge pixels
+
+    Returns:
+        The bins (1-8) of the first set, the bins (1-6) of the shifted set, and
+        the wrap around of the shifted set, or 0 where a pixel is not in a bin.
+    """
+
+    orientation = np.where(orientation < 0, orientation + 360., orientation)
+
+    edges = magnitude > MAG_THRESH
+
+    bins = np.searchsorted(ORIENTATION_BINS, orientation)
+    bins[~edges | (bins >= len(ORIENTATION_BINS))] = 0
+
+    shifted_bins = np.searchsorted(SHIFTED_BINS, orientation)
+    shifted_bins[~edges | (shifted_bins >= len(SHIFTED_BINS))] = 0
+
+    wrap = edges & (((orientation > 337.5) & (orientation <= 360)) | ((orientation > 0) & (orientation <= 22.5)))
+
+    return np.uint8(bins), np.uint8(shifted_bins), np.uint8(wrap)
+
+
+def _crop_features(crops, bin_sets, contrast):
+
+    """
+    Computes the line support region features of a list of crops
+
+    The edge images of each crop (one per non-empty bin, in `BinQ` order) are stacked
+    into one image, with zero rows between them, so that a single skeletonize, distance
+    transform, and label call covers all of them. The gaps keep each edge image independent,
+    because the thinning only looks at 3x3 neighbors and only pixels 2 away from a skeleton
+    are used.
+
+    Args:
+        crops (list): The (row start, row end, column start, column end) crops.
+        bin_sets (list): The section bins, the number of bins, and the bin set (0 or 1)
+            of each group of bins, in `BinQ` order.
+        contrast (2d array): The section line contrast, max(|dx|, |dy|).
+
+    Returns:
+        The features, shaped [crops x 3].
+    """
+
+    gap = 2
+    n_crops = len(crops)
+
+    crop_rows = np.array([r1 - r0 for r0, r1, c0, c1 in crops], dtype='int64')
+    crop_cols = np.array([c1 - c0 for r0, r1, c0, c1 in crops], dtype='int64')
+
+    width = max(1, crop_cols.max())
+
+    features = np.zeros((n_crops, 3), dtype='float64')
+
+    # The edge image tiles, as (crop, bin set)
+    tile_crops = list()
+    tile_sets = list()
+
+    stack = list()
+
+    for ci, (r0, r1, c0, c1) in enumerate(crops):
+
+        for bin_set, n_bins, si in bin_sets:
+
+            crop_bins = bin_set[r0:r1, c0:c1]
+
+            for k in np.flatnonzero(np.bincount(crop_bins.ravel(), minlength=n_bins+1)[1:n_bins+1]) + 1:
+
+                tile = np.zeros((crop_rows[ci]+gap, width), dtype='bool')
+                tile[:crop_rows[ci], :crop_cols[ci]] = crop_bins == k
+
+                stack.append(tile)
+                tile_crops.append(ci)
+                tile_sets.append(si)
+
+    if not stack:
+        return features
+
+    tile_crops = np.array(tile_crops, dtype='int64')
+    tile_sets = np.array(tile_sets, dtype='int64')
+
+    # The first row of each tile
+    tile_rows = crop_rows[tile_crops] + gap
+    tile_starts = np.cumsum(tile_rows) - tile_rows
+    tile_of_row = np.repeat(np.arange(tile_rows.shape[0]), tile_rows)
+
+    stack = np.concatenate(stack, axis=0)
+
+    valid = np.zeros(stack.shape, dtype='bool')
+
+    for ti in range(0, tile_rows.shape[0]):
+        valid[tile_starts[ti]:tile_starts[ti]+tile_rows[ti]-gap, :crop_cols[tile_crops[ti]]] = True
+
+    # Create independent edges
+    __, edge_img = cv2.threshold(np.uint8(skeletonize(stack)), 0, 1, cv2.THRESH_BINARY_INV)
+    edge_img = cv2.distanceTransform(edge_img, cv2.DIST_L1, 3)
+
+    # Label the edges. The labels of each tile follow the labels of the previous tiles,
+    #   in the order that `BinQ` numbers the regions.
+    labels = lab_img((edge_img == 2) & valid, connectivity=1).ravel()
+
+    # The region pixels, by label, in row-major order
+    pixels = np.flatnonzero(labels)
+
+    if pixels.shape[0] == 0:
+        return features
+
+    pixels = pixels[np.argsort(labels[pixels], kind='mergesort')]
+    pixel_labels = labels[pixels]
+
+    starts = np.flatnonzero(np.r_[True, pixel_labels[1:] != pixel_labels[:-1]])
+    counts = np.diff(np.r_[starts, pixels.shape[0]])
+
+    tiles = tile_of_row[pixels // width]
+    label_tiles = tiles[starts]
+
+    # `BinQ` skips the last label of each tile, and regions of `LSR_THRESH` or fewer pixels.
+    is_region = np.r_[label_tiles[1:] == label_tiles[:-1], False] & (counts > LSR_THRESH)
+
+    keep = np.repeat(is_region, counts)
+
+    pixels = pixels[keep]
+    tiles = tiles[keep]
+
+    counts = counts[is_region]
+
+    if counts.shape[0] == 0:
+        return features
+
+    starts = np.cumsum(counts) - counts
+
+    y = pixels // width - tile_starts[tiles]
+    x = pixels % width
+
+    regions = np.repeat(np.arange(counts.shape[0]), counts)
+    region_tiles = tiles[starts]
+    region_crops = tile_crops[region_tiles]
+
+    crop_of_pixel = tile_crops[tiles]
+
+    # The line length, from the zero and second coefficients of the FFT of x*y
+    xy = np.float64(x * y)
+    phase = 4. * np.pi * (np.arange(xy.shape[0]) - np.repeat(starts, counts)) / np.repeat(counts, counts)
+
+    llen = np.float32(2. * (np.hypot(np.add.reduceat(xy * np.cos(phase), starts),
+                                     np.add.reduceat(xy * np.sin(phase), starts)) +
+                            np.abs(np.add.reduceat(xy, starts))) / counts)
+
+    r0s = np.array([r0 for r0, r1, c0, c1 in crops], dtype='int64')
+    c0s = np.array([c0 for r0, r1, c0, c1 in crops], dtype='int64')
+
+    lcon = np.maximum.reduceat(contrast[r0s[crop_of_pixel] + y, c0s[crop_of_pixel] + x], starts)
+
+    # Each crop pixel holds the region of the last tile that covers it, in each bin set.
+    crop_offsets = np.cumsum(crop_rows * crop_cols) - crop_rows * crop_cols
+
+    keys = crop_offsets[crop_of_pixel] + y * crop_cols[crop_of_pixel] + x
+
+    n_keys = int((crop_rows * crop_cols).sum())
+
+    pixel_sets = tile_sets[tiles]
+
+    owners = list()
+
+    for si in [0, 1]:
+
+        set_keys = keys[pixel_sets == si]
+        set_regions = regions[pixel_sets == si]
+
+        order = np.lexsort((set_regions, set_keys))
+
+        set_keys = set_keys[order]
+        last = np.r_[set_keys[1:] != set_keys[:-1], True]
+
+        set_owners = np.full(n_keys, -1, dtype='int64')
+        set_owners[set_keys[last]] = set_regions[order][last]
+
+        owners.append(set_owners)
+
+    # The first region of each crop, which `_lsr.get_features` also votes for
+    #   in place of a missing region
+    first_regions = np.full(n_crops, -1, dtype='int64')
+    first_regions[region_crops[::-1]] = np.arange(counts.shape[0])[::-1]
+
+    key_crops = np.repeat(np.arange(n_crops), crop_rows * crop_cols)
+
+    has_region = (owners[0] >= 0) | (owners[1] >= 0)
+
+    owners = [set_owners[has_region] for set_owners in owners]
+    first_regions = first_regions[key_crops[has_region]]
+
+    lengths = [np.where(set_owners >= 0, llen[set_owners], 0) for set_owners in owners]
+    owners = [np.where(set_owners >= 0, set_owners, first_regions) for set_owners in owners]
+
+    is_vote = (owners[0] != first_regions) | (owners[1] != first_regions)
+
+    pixel_votes = np.where(lengths[0] > lengths[1], 1, -1)[is_vote]
+
+    votes = np.zeros(counts.shape[0], dtype='int64')
+
+    np.add.at(votes, owners[0][is_vote], pixel_votes)
+    np.add.at(votes, owners[1][is_vote], -pixel_votes)
+
+    selected = votes > 0
+
+    region_crops = region_crops[selected]
+    llen = llen[selected]
+    lcon = lcon[selected]
+
+    n_regions = np.bincount(region_crops, minlength=n_crops)
+
+    for fi, bin_count in [(0, np.float64(np.searchsorted(LENGTH_BINS, llen))),
+                          (2, np.float64(np.searchsorted(CONTRAST_BINS, lcon)))]:
+
+        bin_sums = np.bincount(region_crops, weights=bin_count, minlength=n_crops)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pmf = bin_count / bin_sums[region_crops]
+
+        features[:, fi] = -np.bincount(region_crops, weights=pmf * np.log(pmf + 1e-5), minlength=n_crops)
+        features[bin_sums == 0, fi] = 0
+
+    features[:, 1] = np.bincount(region_crops, weights=lcon, minlength=n_crops) / np.maximum(n_regions, 1)
+
+    features[np.isnan(features)] = 0
+
+    return features
+
+
+def feature_lsr_section(orientation, magnitude, x_deriv, y_deriv, blk, scs, end_scale, n_threads=1):
+
+    """
+    Computes line support region features of every window of a section
+
+    The features match `feature_lsr` of each window and scale, but the edge images
+    of each window row go through one skeletonize, distance transform, and label call,
+    and the region statistics are computed without a per-region loop.
+
+    Args:
+        orientation (2d array): The gradient orientation.
+        magnitude (2d array): The gradient magnitude.
+        x_deriv (2d array): The x derivatives.
+        y_deriv (2d array): The y derivatives.
+        blk (int): The block size.
+        scs (list): The scales.
+        end_scale (int): The last scale.
+        n_threads (Optional[int]): The number of window rows to process in parallel. Default is 1.
+
+    Returns:
+        The line length entropy, mean line contrast, and line contrast entropy of each
+        window and scale, as a 1d float32 array.
+    """
+
+    rows, cols = magnitude.shape
+
+    bins, shifted_bins, wrap = _orientation_bins(orientation, magnitude)
+
+    # The wrap around is the last bin of the shifted set.
+    bin_sets = [(bins, len(ORIENTATION_BINS)-1, 0),
+                (shifted_bins, len(SHIFTED_BINS)-1, 1),
+                (wrap, 1, 1)]
+
+    contrast = np.maximum(np.abs(x_deriv), np.abs(y_deriv))
+
+    crops = _window_crops(rows, cols, blk, scs, end_scale)
+
+    if not crops or not crops[0]:
+        return np.zeros(0, dtype='float32')
+
+    def _row_features(row_crops):
+        return _crop_features(row_crops, bin_sets, contrast)
+
+    if n_threads > 1:
+
+        pool = ThreadPool(processes=min(n_threads, len(crops)))
+
+        try:
+            features = pool.map(_row_features, crops)
+        finally:
+
+            pool.close()
+            pool.join()
+
+    else:
+        features = [_row_features(row_crops) for row_crops in crops]
+
+    return np.float32(np.concatenate(features, axis=0)).ravel()
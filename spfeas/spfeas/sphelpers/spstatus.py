@@ -0,0 +1,478 @@
+#!/usr/bin/env python
+
+from __future__ import division
+from future.utils import viewitems
+
+import os
+import json
+import sqlite3
+
+from ..errors import logger
+from .sputilities import ManageStatus
+
+
+STATUS_BACKENDS = ['sqlite', 'yaml']
+
+# Run-level keys of the YAML status layout
+META_KEYS = ['ALL_FINISHED', 'BAND_ORDER', 'SECTION_SIZE', 'TILE_TOKENS']
+
+
+def _file_stamp(tile_file):
+
+    """
+    Gets the byte size and the modification time, in microseconds, of a file
+    """
+
+    file_stat = os.stat(tile_file)
+
+    return file_stat.st_size, int(file_stat.st_mtime * 1e6)
+
+
+def get_tile_token(tile_file):
+
+    """
+    Gets the integrity token of a tile write
+
+    Every write to a tile updates its modification time, so a tile that was deleted,
+    truncated, or written after its last recorded write no longer matches its token.
+
+    Args:
+        tile_file (str): The tile that was written.
+
+    Returns:
+        The token, as '<file bytes>:<modification time in microseconds>'
+    """
+
+    return '{:d}:{:d}'.format(*_file_stamp(tile_file))
+
+
+def check_tile_token(tile_file, token):
+
+    """
+    Checks a tile against the token of its last write, without reading the pixels
+
+    Args:
+        tile_file (str): The tile to check.
+        token (str): The token, from `get_tile_token`.
+
+    Returns:
+        True if the tile exists with the byte size and modification time of its last write
+    """
+
+    if not os.path.isfile(tile_file):
+        return False
+
+    try:
+        file_size, file_time = [int(token_part) for token_part in token.split(':')]
+    except:
+        return False
+
+    return _file_stamp(tile_file) == (file_size, file_time)
+
+
+class ProgressStore(object):
+
+    """
+    A base class for section processing progress backends
+
+    Progress is stored as one item per (tile, trigger, band), with a status of
+    'unprocessed', 'complete', or 'corrupt', plus run-level meta values
+    (ALL_FINISHED, BAND_ORDER, SECTION_SIZE) and the integrity token of the
+    last write to each tile.
+
+    Args:
+        batch_size (Optional[int]): The number of item updates to buffer before they are stored.
+    """
+
+    def __init__(self, batch_size=100):
+
+        self.batch_size = batch_size
+        self._buffer = list()
+        self._token_buffer = dict()
+
+    def get_meta(self, key, default=None):
+        raise NotImplementedError
+
+    def set_meta(self, key, value):
+        raise NotImplementedError
+
+    def add_items(self, items):
+
+        """
+        Adds (tile, trigger, band) items as 'unprocessed', keeping the status of existing items
+        """
+
+        raise NotImplementedError
+
+    def get_items(self, statuses=None):
+
+        """
+        Gets (tile, trigger, band, status) items
+
+        Args:
+            statuses (Optional[list]): The statuses to query. Default is all.
+        """
+
+        raise NotImplementedError
+
+    def get_tokens(self):
+
+        """Gets the tile integrity tokens, as a {tile: token} dictionary"""
+
+        raise NotImplementedError
+
+    def clear(self):
+
+        """Removes all items and tokens"""
+
+        raise NotImplementedError
+
+    def _store_items(self, items, tokens):
+        raise NotImplementedError
+
+    def update_items(self, items, tokens=None):
+
+        """
+        Updates the status of (tile, trigger, band, status) items, storing them in batches
+
+        Args:
+            items (list): The (tile, trigger, band, status) items.
+            tokens (Optional[dict]): The integrity tokens of the tiles that were written, as {tile: token}.
+        """
+
+        self._buffer += list(items)
+
+        if tokens:
+            self._token_buffer.update(tokens)
+
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+
+        """Stores the buffered item updates"""
+
+        if self._buffer or self._token_buffer:
+
+            self._store_items(self._buffer, self._token_buffer)
+
+            self._buffer = list()
+            self._token_buffer = dict()
+
+    def to_dict(self):
+
+        """Returns the progress in the YAML status layout"""
+
+        status_dict = dict()
+
+        for key in ['ALL_FINISHED', 'BAND_ORDER', 'SECTION_SIZE']:
+
+            value = self.get_meta(key)
+
+            if value is not None:
+                status_dict[key] = value
+
+        tokens = self.get_tokens()
+
+        if tokens:
+            status_dict['TILE_TOKENS'] = tokens
+
+        for tile, trigger, band, status in self.get_items():
+            status_dict.setdefault(tile, dict())['{TR}-{BD}'.format(TR=trigger, BD=band)] = status
+
+        return status_dict
+
+    def load(self, progress):
+
+        """
+        Copies the meta values, items, and tokens of another progress store
+
+        The section size is copied last, so an interrupted copy is
+        treated as a new run and does not skip any item.
+
+        Args:
+            progress (`ProgressStore` object): The store to copy.
+        """
+
+        items = progress.get_items()
+
+        self.add_items([(tile, trigger, band) for tile, trigger, band, status in items])
+        self.update_items(items, tokens=progress.get_tokens())
+        self.flush()
+
+        for key in ['ALL_FINISHED', 'BAND_ORDER', 'SECTION_SIZE']:
+
+            value = progress.get_meta(key)
+
+            if value is not None:
+                self.set_meta(key, value)
+
+    def export_yaml(self, yaml_file):
+
+        """
+        Exports the progress to a YAML status file
+
+        Args:
+            yaml_file (str): The YAML file to write.
+        """
+
+        self.flush()
+
+        mts = ManageStatus()
+        mts.status_dict = self.to_dict()
+        mts.dump_status(yaml_file)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+class SQLiteProgress(ProgressStore):
+
+    """
+    A class to manage the processing progress with SQLite
+
+    Updates are written in transactions, so concurrent runs on the
+    same output directory wait on each other instead of corrupting the file.
+
+    Args:
+        db_file (str): The SQLite file.
+        batch_size (Optional[int]): The number of item updates to buffer before they are stored.
+        timeout (Optional[float]): The number of seconds to wait on a locked database.
+    """
+
+    def __init__(self, db_file, batch_size=100, timeout=60.0):
+
+        super(SQLiteProgress, self).__init__(batch_size=batch_size)
+
+        self.db_file = db_file
+
+        self.conn = sqlite3.connect(self.db_file, timeout=timeout)
+
+        self.conn.execute('PRAGMA journal_mode=WAL')
+
+        with self.conn:
+
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+            self.conn.execute('CREATE TABLE IF NOT EXISTS progress (tile TEXT, trigger TEXT, band TEXT, status TEXT, '
+                              'PRIMARY KEY (tile, trigger, band))')
+
+            self.conn.execute('CREATE INDEX IF NOT EXISTS progress_status ON progress (status)')
+
+            self.conn.execute('CREATE TABLE IF NOT EXISTS tokens (tile TEXT PRIMARY KEY, token TEXT)')
+
+    def get_meta(self, key, default=None):
+
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            return default
+
+        return json.loads(row[0])
+
+    def set_meta(self, key, value):
+
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    def add_items(self, items):
+
+        with self.conn:
+
+            self.conn.executemany("INSERT OR IGNORE INTO progress (tile, trigger, band, status) "
+                                  "VALUES (?, ?, ?, 'unprocessed')",
+                                  [(tile, trigger, str(band)) for tile, trigger, band in items])
+
+    def get_items(self, statuses=None):
+
+        self.flush()
+
+        if statuses:
+
+            return self.conn.execute('SELECT tile, trigger, band, status FROM progress '
+                                     'WHERE status IN ({})'.format(', '.join(['?']*len(statuses))),
+                                     tuple(statuses)).fetchall()
+
+        else:
+            return self.conn.execute('SELECT tile, trigger, band, status FROM progress').fetchall()
+
+    def get_tokens(self):
+
+        self.flush()
+
+        return dict(self.conn.execute('SELECT tile, token FROM tokens').fetchall())
+
+    def clear(self):
+
+        self._buffer = list()
+        self._token_buffer = dict()
+
+        with self.conn:
+
+            self.conn.execute('DELETE FROM progress')
+            self.conn.execute('DELETE FROM tokens')
+
+    def _store_items(self, items, tokens):
+
+        # The statuses and tokens are stored in one transaction.
+        with self.conn:
+
+            self.conn.executemany('INSERT OR REPLACE INTO progress (tile, trigger, band, status) VALUES (?, ?, ?, ?)',
+                                  [(tile, trigger, str(band), status) for tile, trigger, band, status in items])
+
+            self.conn.executemany('INSERT OR REPLACE INTO tokens (tile, token) VALUES (?, ?)',
+                                  list(viewitems(tokens)))
+
+    def close(self):
+
+        if self.conn is not None:
+
+            self.flush()
+
+            self.conn.close()
+            self.conn = None
+
+
+class YAMLProgress(ProgressStore):
+
+    """
+    A class to manage the processing progress with the YAML status file
+
+    Args:
+        status_file (str): The YAML status file.
+        batch_size (Optional[int]): The number of item updates to buffer before the file is rewritten.
+    """
+
+    def __init__(self, status_file, batch_size=100):
+
+        super(YAMLProgress, self).__init__(batch_size=batch_size)
+
+        self.status_file = status_file
+
+        self.mts = ManageStatus()
+
+        if os.path.isfile(self.status_file):
+
+            self.mts.load_status(self.status_file)
+
+            if not isinstance(self.mts.status_dict, dict):
+
+                logger.error('The YAML file already existed, but was not properly stored and saved.\nPlease remove and re-run.')
+                raise AttributeError
+
+        else:
+            self.mts.status_dict = dict()
+
+    def get_meta(self, key, default=None):
+        return self.mts.status_dict.get(key, default)
+
+    def set_meta(self, key, value):
+
+        self.mts.status_dict[key] = value
+        self.mts.dump_status(self.status_file)
+
+    def add_items(self, items):
+
+        for tile, trigger, band in items:
+            self.mts.status_dict.setdefault(tile, dict()).setdefault('{TR}-{BD}'.format(TR=trigger, BD=band), 'unprocessed')
+
+        self.mts.dump_status(self.status_file)
+
+    def get_items(self, statuses=None):
+
+        self.flush()
+
+        items = list()
+
+        for tile, tile_dict in viewitems(self.mts.status_dict):
+
+            if isinstance(tile_dict, dict) and (tile not in META_KEYS):
+
+                for item_key, status in viewitems(tile_dict):
+
+                    if statuses and (status not in statuses):
+                        continue
+
+                    trigger, band = item_key.split('-', 1)
+
+                    items.append((tile, trigger, band, status))
+
+        return items
+
+    def get_tokens(self):
+
+        self.flush()
+
+        return dict(self.mts.status_dict.get('TILE_TOKENS', dict()))
+
+    def clear(self):
+
+        self._buffer = list()
+        self._token_buffer = dict()
+
+        for tile in [k for k, v in viewitems(self.mts.status_dict)
+                     if isinstance(v, dict) and ((k not in META_KEYS) or (k == 'TILE_TOKENS'))]:
+
+            del self.mts.status_dict[tile]
+
+        self.mts.dump_status(self.status_file)
+
+    def _store_items(self, items, tokens):
+
+        for tile, trigger, band, status in items:
+            self.mts.status_dict.setdefault(tile, dict())['{TR}-{BD}'.format(TR=trigger, BD=band)] = status
+
+        if tokens:
+            self.mts.status_dict.setdefault('TILE_TOKENS', dict()).update(tokens)
+
+        self.mts.dump_status(self.status_file)
+
+    def export_yaml(self, yaml_file):
+
+        self.flush()
+
+        if os.path.abspath(yaml_file) != os.path.abspath(self.status_file):
+            self.mts.dump_status(yaml_file)
+
+
+def get_progress_store(parameter_object):
+
+    """
+    Opens the progress backend of a run
+
+    Args:
+        parameter_object (class)
+
+    Returns:
+        A `ProgressStore` object
+    """
+
+    if parameter_object.status_backend == 'sqlite':
+
+        db_file = parameter_object.status_file.replace('.yaml', '.db')
+
+        seed_yaml = (not os.path.isfile(db_file)) and os.path.isfile(parameter_object.status_file)
+
+        progress = SQLiteProgress(db_file)
+
+        # Continue the progress of earlier runs that used the YAML status file.
+        if seed_yaml:
+
+            logger.info('  Loading the progress of {} ...'.format(parameter_object.status_file))
+
+            progress.load(YAMLProgress(parameter_object.status_file))
+
+        return progress
+
+    elif parameter_object.status_backend == 'yaml':
+        return YAMLProgress(parameter_object.status_file)
+    else:
+
+        logger.error('  The status backend should be one of {}.'.format(', '.join(STATUS_BACKENDS)))
+        raise NameError
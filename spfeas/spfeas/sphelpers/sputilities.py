@@ -152,6 +152,14 @@ def parameter_checks(parameter_object):
             logger.error('The `smooth` parameter should be an odd number.')
             raise ValueError
 
+    # GeoTIFF tiles must be a multiple of 16.
+    if parameter_object.mosaic == 'gtiff':
+
+        if (parameter_object.tile_block <= 0) or (parameter_object.tile_block % 16 != 0):
+
+            logger.error('The `tile_block` parameter should be a multiple of 16.')
+            raise ValueError
+
     # Ensure the smallest scale is
     #   >= 16 when using Gabor.
     # if 'gabor' in parameter_object.triggers:
@@ -0,0 +1,492 @@
+"""
+Samples features at training points, computing only the output blocks under the points
+"""
+
+from __future__ import division
+from builtins import int
+
+import os
+import copy
+import multiprocessing as multi
+from collections import OrderedDict
+
+from .errors import logger
+from .sphelpers import sputilities
+from .sphelpers.gabor_filter_bank import gabor_kernel_size
+from . import spprocess
+from . import spsplit
+
+# MpGlue
+try:
+    from mpglue import raster_tools, vector_tools
+except:
+    logger.error('MpGlue must be installed')
+    raise ImportError
+
+# NumPy
+try:
+    import numpy as np
+except:
+    logger.error('NumPy must be installed')
+    raise ImportError
+
+# Pandas
+try:
+    import pandas as pd
+except:
+    logger.error('Pandas must be installed')
+    raise ImportError
+
+
+# Triggers that depend on the whole section (e.g., morphological reconstruction,
+#   key point detection, segmentation, or section normalization). Their sections
+#   are computed in full, but only the sections that have points. SFS carries its
+#   line histogram from one window to the next, so it depends on the traversal.
+SECTION_TRIGGERS = ['dmp', 'lsr', 'orb', 'saliency', 'seg', 'sfs']
+
+# The pixel radius of the section filters that are applied before the block statistics
+TRIGGER_CONTEXT = dict(grad=2,
+                       lbp=5,
+                       lbpm=5)
+
+# The number of output block rows and columns that are computed together
+CHUNK_BLOCKS = 32
+
+
+def get_context(parameter_object):
+
+    """
+    Gets the number of pixels, beyond the block windows, that the current trigger needs
+
+    Args:
+        parameter_object (class)
+
+    Returns:
+        The context size, as a multiple of the block size, or None if the trigger needs the whole section.
+    """
+
+    if (parameter_object.trigger in SECTION_TRIGGERS) or parameter_object.equalize or parameter_object.equalize_adapt:
+        return None
+
+    if parameter_object.trigger == 'gabor':
+        context = int(gabor_kernel_size(parameter_object.scales[-1]) / 2)
+    else:
+        context = TRIGGER_CONTEXT.get(parameter_object.trigger, 0)
+
+    if parameter_object.smooth > 0:
+        context += int(parameter_object.smooth / 2)
+
+    # Keep the window on the block grid of the section.
+    return int(np.ceil(context / float(parameter_object.block))) * parameter_object.block
+
+
+def get_window(block_bounds, context, parameter_object, n_rows, n_cols):
+
+    """
+    Gets the section window that covers a range of output blocks
+
+    Args:
+        block_bounds (tuple): The (first row, last row + 1, first column, last column + 1) output blocks.
+        context (int): The window context, from `get_context`.
+        parameter_object (class)
+        n_rows (int): The section rows.
+        n_cols (int): The section columns.
+
+    Returns:
+        The window (start row, end row, start column, end column), relative to the section
+    """
+
+    if context is None:
+        return 0, n_rows, 0, n_cols
+
+    r0, r1, c0, c1 = block_bounds
+
+    blk = parameter_object.block
+    end_scale = parameter_object.scales[-1]
+
+    # The section clips the windows of its last blocks, so the window is clipped the same way.
+    return max(0, r0*blk - context), \
+           min(n_rows, (r1 - 1)*blk + end_scale + context), \
+           max(0, c0*blk - context), \
+           min(n_cols, (c1 - 1)*blk + end_scale + context)
+
+
+def _get_tiles(image_info, parameter_object):
+
+    """Gets the (start row, start column, rows, columns, output rows, output columns) of each section"""
+
+    tiles = list()
+
+    for i_sect, j_sect in parameter_object.section_idx_pairs:
+
+        n_rows = raster_tools.n_rows_cols(i_sect, parameter_object.sect_row_size, image_info.rows)
+        n_cols = raster_tools.n_rows_cols(j_sect, parameter_object.sect_col_size, image_info.cols)
+
+        out_rows, out_cols = spsplit.get_out_dims(n_rows, n_cols, parameter_object)
+
+        tiles.append((i_sect, j_sect, n_rows, n_cols, out_rows, out_cols))
+
+    return tiles
+
+
+def locate_points(image_info, parameter_object, x, y):
+
+    """
+    Finds the output tile and block of each point, as the VRT mosaic of the tiles samples it
+
+    Args:
+        image_info (`rinfo` object)
+        parameter_object (class)
+        x (1d array): The x coordinates.
+        y (1d array): The y coordinates.
+
+    Returns:
+        Whether each point is within the mosaic, the tile index (-1 if no tile covers the point),
+        the block row, and the block column of each point
+    """
+
+    tiles = _get_tiles(image_info, parameter_object)
+
+    blk = float(parameter_object.block)
+
+    # The mosaic starts at the first (upper left) tile.
+    o_info = sputilities.get_output_info_tile(image_info,
+                                              image_info.copy(),
+                                              parameter_object,
+                                              0,
+                                              0,
+                                              tiles[0][4],
+                                              tiles[0][5])
+
+    mosaic_rows = max([i_sect / blk + out_rows for i_sect, j_sect, n_rows, n_cols, out_rows, out_cols in tiles])
+    mosaic_cols = max([j_sect / blk + out_cols for i_sect, j_sect, n_rows, n_cols, out_rows, out_cols in tiles])
+
+    # `ropen` stores the (positive) pixel width as `cellY`.
+    cell_size = abs(o_info.cellY)
+
+    left = o_info.left
+    top = o_info.top
+    right = left + mosaic_cols * cell_size
+    bottom = top - mosaic_rows * cell_size
+
+    within = (x > left) & (x < right) & (y > bottom) & (y < top)
+
+    x_offsets = np.zeros(len(x), dtype='int64')
+    y_offsets = np.zeros(len(y), dtype='int64')
+
+    for pi in np.where(within)[0]:
+
+        __, __, x_offsets[pi], y_offsets[pi] = vector_tools.get_xy_offsets(image_list=[left, top, right, bottom,
+                                                                                       o_info.cellX, o_info.cellY],
+                                                                           x=float(x[pi]),
+                                                                           y=float(y[pi]),
+                                                                           check_position=False)
+
+    tile_index = np.zeros(len(x), dtype='int64') - 1
+    block_rows = np.zeros(len(x), dtype='int64')
+    block_cols = np.zeros(len(x), dtype='int64')
+
+    # Where tiles overlap, the last tile is on top of the mosaic.
+    for ti, (i_sect, j_sect, n_rows, n_cols, out_rows, out_cols) in enumerate(tiles):
+
+        tile_rows = np.int64(np.floor(y_offsets + 0.5 - i_sect / blk))
+        tile_cols = np.int64(np.floor(x_offsets + 0.5 - j_sect / blk))
+
+        in_tile = within & (tile_rows >= 0) & (tile_rows < out_rows) & (tile_cols >= 0) & (tile_cols < out_cols)
+
+        tile_index[in_tile] = ti
+        block_rows[in_tile] = tile_rows[in_tile]
+        block_cols[in_tile] = tile_cols[in_tile]
+
+    return within, tile_index, block_rows, block_cols
+
+
+def _get_work_items(parameter_dicts, tile_index, block_rows, block_cols):
+
+    """
+    Groups the points into (section counter, block bounds, parameter keys, point indices,
+    block rows, block columns) work items
+    """
+
+    section_keys = [key for key in parameter_dicts if get_context(sputilities.dict2class(parameter_dicts[key])) is None]
+    window_keys = [key for key in parameter_dicts if key not in section_keys]
+
+    work_items = list()
+
+    for ti in np.unique(tile_index[tile_index >= 0]):
+
+        tile_points = np.where(tile_index == ti)[0]
+
+        if section_keys:
+
+            work_items.append((ti+1,
+                               None,
+                               section_keys,
+                               tile_points,
+                               block_rows[tile_points],
+                               block_cols[tile_points]))
+
+        if window_keys:
+
+            chunk_ids = (block_rows[tile_points] // CHUNK_BLOCKS) * (block_cols.max() // CHUNK_BLOCKS + 1) + \
+                        block_cols[tile_points] // CHUNK_BLOCKS
+
+            for chunk_id in np.unique(chunk_ids):
+
+                chunk_points = tile_points[chunk_ids == chunk_id]
+
+                chunk_rows = block_rows[chunk_points]
+                chunk_cols = block_cols[chunk_points]
+
+                work_items.append((ti+1,
+                                   (chunk_rows.min(), chunk_rows.max()+1, chunk_cols.min(), chunk_cols.max()+1),
+                                   window_keys,
+                                   chunk_points,
+                                   chunk_rows,
+                                   chunk_cols))
+
+    return work_items
+
+
+def _init_worker(parameter_dicts):
+
+    """
+    Initializes a worker process with the per-trigger/band parameters
+
+    Args:
+        parameter_dicts (dict): The parameter dictionaries, keyed by (trigger, band position).
+    """
+
+    global point_parameters
+
+    point_parameters = parameter_dicts
+
+
+def _sample_work_item(work_item):
+
+    """
+    Computes the features of the blocks of a work item
+
+    Args:
+        work_item (tuple): The work item, from `_get_work_items`.
+
+    Returns:
+        The point indices and a list of (parameter key, [points x features] array)
+    """
+
+    section_counter, block_bounds, keys, point_index, block_rows, block_cols = work_item
+
+    # The section inputs, by window, that are shared by the triggers
+    input_caches = dict()
+
+    key_values = list()
+
+    with raster_tools.ropen(point_parameters[keys[0]]['input_image']) as this_image_info:
+
+        for key in keys:
+
+            this_parameter_object_ = sputilities.dict2class(copy.copy(point_parameters[key]))
+            this_parameter_object_.update_info(section_counter=section_counter)
+
+            i_sect, j_sect, n_rows, n_cols = spprocess._get_section_bounds(this_image_info, this_parameter_object_)
+
+            i0, i1, j0, j1 = get_window(block_bounds,
+                                        get_context(this_parameter_object_) if block_bounds else None,
+                                        this_parameter_object_,
+                                        n_rows,
+                                        n_cols)
+
+            out_window_array, __, __ = spprocess._compute_section(this_image_info,
+                                                                  this_parameter_object_,
+                                                                  i_sect+i0,
+                                                                  j_sect+j0,
+                                                                  i1-i0,
+                                                                  j1-j0,
+                                                                  input_cache=input_caches.setdefault((i0, i1, j0, j1),
+                                                                                                      dict()))
+
+            blk = this_parameter_object_.block
+
+            key_values.append((key, out_window_array[:, block_rows-int(i0/blk), block_cols-int(j0/blk)].T))
+
+    return point_index, key_values
+
+
+def _read_points(parameter_object):
+
+    """Reads the point coordinates and labels"""
+
+    with vector_tools.vopen(parameter_object.points) as v_info:
+
+        if 'POINT' not in str(v_info.shp_geom_name).upper():
+
+            logger.error('  {} should be a point vector file.'.format(parameter_object.points))
+            raise TypeError
+
+        n_feas = v_info.n_feas
+
+        x = np.zeros(n_feas, dtype='float64')
+        y = np.zeros(n_feas, dtype='float64')
+        labels = np.zeros(n_feas, dtype='float32')
+
+        try:
+
+            for n in range(0, n_feas):
+
+                feature = v_info.lyr.GetFeature(n)
+                geometry = feature.GetGeometryRef()
+
+                x[n] = geometry.GetX()
+                y[n] = geometry.GetY()
+                labels[n] = feature.GetField(parameter_object.points_class)
+
+                feature.Destroy()
+                feature = None
+
+        except:
+
+            logger.error('  Field <{}> does not exist or there is a feature issue.'.format(parameter_object.points_class))
+            raise IOError
+
+    v_info = None
+
+    return x, y, labels
+
+
+def sample_points(parameter_object):
+
+    """
+    Computes the features at each point and writes a samples file
+
+    Each point is mapped to the output block that the full image mosaic would have at the
+    point. Only the windows of those blocks are computed, so the samples match `sample-raster`
+    on the full feature mosaic, without computing the rest of the image. The samples are written
+    to <output_dir>/<points>__<features>_SAMPLES.txt, with the `sample-raster` layout.
+
+    Args:
+        parameter_object (class)
+    """
+
+    spprocess.prepare_parameters(parameter_object)
+
+    # Write the parameters to file.
+    sputilities.write_log(parameter_object)
+
+    if not os.path.isfile(parameter_object.points):
+
+        logger.error('  The points file, {}, does not exist.'.format(parameter_object.points))
+        raise OSError
+
+    parameter_object, parameter_dicts = spprocess._get_parameter_dicts(parameter_object)
+
+    x, y, labels = _read_points(parameter_object)
+
+    with raster_tools.ropen(parameter_object.input_image) as i_info:
+        within, tile_index, block_rows, block_cols = locate_points(i_info, parameter_object, x, y)
+
+    del i_info
+
+    # Only points within the mosaic are sampled, and the ids follow them.
+    x = x[within]
+    y = y[within]
+    labels = labels[within]
+    tile_index = tile_index[within]
+    block_rows = block_rows[within]
+    block_cols = block_cols[within]
+
+    work_items = _get_work_items(parameter_dicts, tile_index, block_rows, block_cols)
+
+    logger.info('  Computing the features of {:,d} points in {:,d} windows ...'.format(int(within.sum()),
+                                                                                       len(work_items)))
+
+    value_array = np.zeros((len(x), parameter_object.band_info['band_count']), dtype='float32')
+
+    n_jobs = max(1, min(parameter_object.n_jobs, len(work_items)))
+
+    if n_jobs == 1:
+
+        _init_worker(parameter_dicts)
+
+        pool = None
+        results = map(_sample_work_item, work_items)
+
+    else:
+
+        pool = multi.Pool(processes=n_jobs,
+                          initializer=_init_worker,
+                          initargs=(parameter_dicts,))
+
+        results = pool.imap_unordered(_sample_work_item, work_items)
+
+    try:
+
+        for point_index, key_values in results:
+
+            for (trigger, band_position), key_array in key_values:
+
+                start_band = parameter_dicts[(trigger, band_position)]['band_info'][trigger] + \
+                             parameter_dicts[(trigger, band_position)]['band_counter']
+
+                value_array[point_index, start_band:start_band+key_array.shape[1]] = key_array
+
+        if pool is not None:
+            pool.close()
+
+    except:
+
+        if pool is not None:
+            pool.terminate()
+
+        raise
+
+    finally:
+
+        if pool is not None:
+            pool.join()
+
+    # Points between tiles have no data.
+    has_data = tile_index >= 0
+
+    # Only the sampled points are counted.
+    class_list = np.unique(labels[has_data])
+    class_counts = OrderedDict([(class_label, (labels[has_data] == class_label).sum()) for class_label in class_list])
+
+    xy_coordinates = np.c_[np.arange(0, len(x)),
+                           [float('{:.6f}'.format(xc)) for xc in x],
+                           [float('{:.6f}'.format(yc)) for yc in y]].astype('float32')
+
+    value_array = np.float32(np.round(np.float64(value_array), 4))
+
+    value_array = np.c_[xy_coordinates[has_data],
+                        value_array[has_data],
+                        labels[has_data]]
+
+    value_array[np.isnan(value_array) | np.isinf(value_array)] = 0.
+
+    features_base = os.path.splitext(os.path.split(parameter_object.status_file)[1])[0]
+    points_base = os.path.splitext(os.path.split(parameter_object.points)[1])[0]
+
+    headers = ['Id', 'X', 'Y'] + \
+              ['{}.{:d}'.format(features_base, b) for b in range(1, parameter_object.band_info['band_count']+1)] + \
+              ['response']
+
+    samples_file = os.path.join(parameter_object.output_dir,
+                                '{POINTS}__{RASTER}_SAMPLES.txt'.format(POINTS=points_base,
+                                                                        RASTER=features_base))
+
+    info_file = os.path.join(parameter_object.output_dir,
+                             '{POINTS}__{RASTER}_INFO.txt'.format(POINTS=points_base,
+                                                                  RASTER=features_base))
+
+    pd.DataFrame(value_array, columns=headers).to_csv(samples_file, sep=',', index=False)
+
+    with open(info_file, 'w') as n_sample_writer:
+
+        for class_label, class_count in class_counts.items():
+            n_sample_writer.write('Class {:d}: {:,d}\n'.format(int(class_label), int(class_count)))
+
+        n_sample_writer.write('Total: {:,d}'.format(int(sum(class_counts.values()))))
+
+    logger.info('  Wrote {:,d} samples to {}'.format(value_array.shape[0], samples_file))
+
+    parameter_object.update_info(samples_file=samples_file)
@@ -1,14 +1,17 @@
 from __future__ import division
-from future.utils import viewitems
 from builtins import map
+from future.moves import queue
+from future.utils import viewitems
 
 import os
 import copy
 import fnmatch
+import traceback
 import multiprocessing as multi
+from collections import deque, OrderedDict
 
 from .errors import logger, CorruptedBandsError
-from .sphelpers import sputilities
+from .sphelpers import sputilities, spstatus
 from . import spsplit
 from .sphelpers import spreshape
 from .spfunctions import get_mag_avg, get_saliency_tile_mean, saliency, segment_image, get_dmp, get_orb_keypoints, convolve_gabor
@@ -44,7 +47,7 @@ except ImportError:
 
 def _write_section2file(this_parameter_object__,
                         meta_info,
-                        section2write,
+                        band_sections,
                         i_sect,
                         j_sect,
                         out_rows,
@@ -52,15 +55,20 @@ def _write_section2file(this_parameter_object__,
                         section_counter):
 
     """
-    Writes the section array to disk
+    Writes the section arrays to disk
+
+    Every band of the section is written with one multi-band dataset write.
 
     Args:
         this_parameter_object__ (class)
         meta_info (`rinfo` object)
-        section2write (list of 1d arrays)
+        band_sections (list): A list of (starting band, number of bands, section array) to write.
         i_sect (int)
         j_sect (int)
         section_counter (int)
+
+    Returns:
+        The integrity token of the tile, or None if the section was empty and nothing was written.
     """
     
     logger.info('  Writing section {:d} of {:d} to file ...'.format(section_counter,
@@ -76,164 +84,393 @@ def _write_section2file(this_parameter_object__,
                                               out_rows,
                                               out_cols)
 
-    if not isinstance(section2write, np.ndarray):
-
-        section2write = np.zeros((o_info.bands,
-                                  o_info.rows,
-                                  o_info.cols), dtype='uint8')
+    band_sections = [(start_band,
+                      n_bands,
+                      section2write if isinstance(section2write, np.ndarray) else np.zeros((n_bands,
+                                                                                             o_info.rows,
+                                                                                             o_info.cols), dtype='uint8'))
+                     for start_band, n_bands, section2write in band_sections]
 
-    start_band = this_parameter_object__.band_info[this_parameter_object__.trigger] + this_parameter_object__.band_counter + 1
-    n_bands = this_parameter_object__.out_bands_dict[this_parameter_object__.trigger]
+    section2write = band_sections[0][2]
 
+    # The tile won't be written to file
+    #   in the case of zero-length sections.
     if section2write[0].shape[0] == 0 or section2write[0].shape[1] == 0:
-        pass
+        return None
+
+    if os.path.isfile(this_parameter_object__.out_img):
+
+        # Open the file and write the new bands.
+        out_raster = raster_tools.ropen(this_parameter_object__.out_img, open2read=False)
+
     else:
 
-        if os.path.isfile(this_parameter_object__.out_img):
+        # Create the output raster.
+        out_raster = raster_tools.create_raster(this_parameter_object__.out_img,
+                                                o_info,
+                                                bigtiff='yes')
 
-            # Open the file and write the new bands.
-            with raster_tools.ropen(this_parameter_object__.out_img, open2read=False) as out_raster:
+    band_list = [feature_band for start_band, n_bands, section2write in band_sections
+                 for feature_band in range(start_band, start_band+n_bands)]
 
-                array_layer_counter = 0
+    if len(band_sections) == 1:
+        section2write = band_sections[0][2]
+    else:
+        section2write = np.concatenate([section2write for start_band, n_bands, section2write in band_sections], axis=0)
 
-                # Write each scale and feature.
-                for feature_band in range(start_band, start_band+n_bands):
+    with out_raster:
 
-                    out_raster.write_array(section2write[array_layer_counter], band=feature_band)
-                    out_raster.close_band()
+        # Write each scale and feature.
+        out_raster.write_bands(section2write, band_list)
 
-                    array_layer_counter += 1
+    del out_raster
 
-        else:
+    # The file size and modification time stand in for
+    #   the band checksums, which re-read every band.
+    return spstatus.get_tile_token(this_parameter_object__.out_img)
 
-            # Create the output raster.
-            with raster_tools.create_raster(this_parameter_object__.out_img,
-                                            o_info,
-                                            bigtiff='yes') as out_raster:
 
-                array_layer_counter = 0
+def _init_worker(parameter_dicts):
 
-                # Write each scale and feature.
-                for feature_band in range(start_band, start_band+n_bands):
+    """
+    Initializes a worker process with the per-trigger/band parameters
 
-                    out_raster.write_array(section2write[array_layer_counter], band=feature_band)
-                    out_raster.close_band()
+    Args:
+        parameter_dicts (dict): The parameter dictionaries, keyed by (trigger, band position).
+    """
 
-                    array_layer_counter += 1
+    global worker_parameters
 
-        del out_raster
+    worker_parameters = parameter_dicts
 
-    is_corrupt = False
 
-    # The tile won't be written to file
-    #   in the case of zero-length sections.
-    if os.path.isfile(this_parameter_object__.out_img):
+def _cache_array(input_cache, key, func, *args, **kwargs):
 
-        # Check if any of the bands are corrupted.
-        with raster_tools.ropen(this_parameter_object__.out_img) as ob_info:
+    """
+    Returns func(*args, **kwargs), reusing the cached array if one exists
 
-            ob_info.check_corrupted_bands()
+    Args:
+        input_cache (dict): The section input cache. If None, nothing is cached.
+        key (tuple): The cache key.
+        func (object): The function that computes the array.
+    """
 
-            if ob_info.corrupted_bands:
-                is_corrupt = True
-            else:
-                is_corrupt = False
+    if input_cache is None:
+        return func(*args, **kwargs)
+
+    if key not in input_cache:
+        input_cache[key] = func(*args, **kwargs)
+
+    return input_cache[key]
+
+
+def _read_spectral_index(this_image_info, this_parameter_object_, i_sect, j_sect, n_rows, n_cols):
+
+    """Reads a section and computes a spectral index"""
+
+    wavelengths = utils.VI_WAVELENGTHS[this_parameter_object_.trigger.upper()]
+
+    # Check if the sensor supports the spectral index
+    utils.sensor_wavelength_check(this_parameter_object_.sat_sensor,
+                                  wavelengths)
+
+    # Get the band positions needed
+    #   to process the spectral index.
+    spectral_bands = utils.get_index_bands(this_parameter_object_.trigger.upper(),
+                                           this_parameter_object_.sat_sensor)
+
+    sect_in = this_image_info.read(bands2open=spectral_bands,
+                                   i=i_sect,
+                                   j=j_sect,
+                                   rows=n_rows,
+                                   cols=n_cols,
+                                   d_type='float32')
+
+    sect_in[sect_in >= this_parameter_object_.image_max] = this_parameter_object_.image_max
+    sect_in /= this_parameter_object_.image_max
+
+    vie = VegIndicesEquations(sect_in, chunk_size=-1)
+
+    return vie.compute(this_parameter_object_.trigger.upper(), out_type=1)
+
+
+def _read_gradient(sect_in, image_min, image_max):
+
+    """Computes the gradient magnitude of a section"""
+
+    sect_in = np.uint8(rescale_intensity(sect_in,
+                                         in_range=(image_min,
+                                                   image_max),
+                                         out_range=(0, 255)))
 
-        del ob_info
+    return get_mag_avg(sect_in)
 
-    return is_corrupt
 
+def _rescale_section(sect_in, image_min, image_max, out_d_range):
 
-def _section_read_write(section_counter):
+    """Scales a section to an 8-bit range"""
+
+    return np.uint8(rescale_intensity(sect_in,
+                                      in_range=(image_min,
+                                                image_max),
+                                      out_range=out_d_range))
+
+
+def _get_section_input(this_image_info, this_parameter_object_, i_sect, j_sect, n_rows, n_cols, input_cache=None):
 
     """
-    Handles the section reading and writing
+    Reads the section input of the current trigger and band
 
     Args:
-        section_counter (int)
+        this_image_info (`rinfo` object)
+        this_parameter_object_ (class)
+        i_sect (int)
+        j_sect (int)
+        n_rows (int)
+        n_cols (int)
+        input_cache (Optional[dict]): A cache of section inputs, shared by triggers of the same section.
+            If given, the 8-bit scaling is also done (and cached) here rather than in `spsplit.get_section_stats`.
+
+    Returns:
+        The section array
     """
 
-    section_pair = potsi[section_counter-1]
+    trigger = this_parameter_object_.trigger
+    band_position = this_parameter_object_.band_position
 
-    # this_parameter_object_ = this_parameter_object.copy()
-    this_parameter_object_ = copy.copy(param_dict)
-    this_parameter_object_ = sputilities.dict2class(this_parameter_object_)
+    # The key of the raw input, used for 8-bit scaling
+    source_key = None
 
-    # Get the input image information.
-    with raster_tools.ropen(this_parameter_object_.input_image) as this_image_info:
+    # Open the image array.
+    if trigger in this_parameter_object_.spectral_indices:
 
-        this_parameter_object_.update_info(section_counter=section_counter)
+        sect_in = _cache_array(input_cache,
+                               ('vi', trigger),
+                               _read_spectral_index,
+                               this_image_info,
+                               this_parameter_object_,
+                               i_sect,
+                               j_sect,
+                               n_rows,
+                               n_cols)
 
-        # Set the output name.
-        this_parameter_object_ = sputilities.scale_fea_check(this_parameter_object_)
+        this_parameter_object_.update_info(image_min=0,
+                                           image_max=1)
 
-        # Open the status YAML file.
-        mts_ = sputilities.ManageStatus()
+    elif trigger == 'saliency':
 
-        # Load the status dictionary
-        mts_.load_status(this_parameter_object_.status_file)
+        sect_in = saliency(this_image_info,
+                           this_parameter_object_,
+                           i_sect,
+                           j_sect,
+                           n_rows,
+                           n_cols)
 
-        # Check file status.
-        if os.path.isfile(this_parameter_object_.out_img):
+        this_parameter_object_.update_info(image_min=0,
+                                           image_max=255)
 
-            if this_parameter_object_.out_img_base in mts_.status_dict:
+    elif trigger == 'seg':
 
-                if this_parameter_object_.trigger in mts_.status_dict[this_parameter_object_.out_img_base]:
+        sect_in = this_image_info.read(bands2open=[1, 2, 3],
+                                       i=i_sect,
+                                       j=j_sect,
+                                       rows=n_rows,
+                                       cols=n_cols)
 
-                    # Check every trigger because the
-                    #   entire file needs to be removed.
-                    status_list = [mts_.status_dict[this_parameter_object_.out_img_base]['{TR}-{BD}'.format(TR=tr,
-                                                                                                            BD=this_parameter_object_.band_position)]
-                                   for tr in this_parameter_object_.triggers]
+        sect_in = segment_image(sect_in, this_parameter_object_)
 
-                    if 'corrupt' in status_list:
+    elif trigger == 'grad':
 
-                        logger.info('Re-running {} ...'.format(this_parameter_object_.out_img))
+        if this_image_info.bands >= 3:
 
-                        # Remove the file on the first trigger
-                        #   if the file is corrupt.
-                        if this_parameter_object_.trigger == this_parameter_object_.triggers[0]:
-                            os.remove(this_parameter_object_.out_img)
+            gray_key = ('gray',)
 
-                        mts_.status_dict[this_parameter_object_.out_img_base]['{TR}-{BD}'.format(TR=this_parameter_object_.trigger,
-                                                                                                 BD=this_parameter_object_.band_position)] = 'incomplete'
-                        mts_.dump_status(this_parameter_object_.status_file)
+            sect_in = _cache_array(input_cache,
+                                   gray_key,
+                                   lambda: sputilities.convert_rgb2gray(this_image_info,
+                                                                        i_sect,
+                                                                        j_sect,
+                                                                        n_rows,
+                                                                        n_cols,
+                                                                        this_parameter_object_.sat_sensor)[0])
 
-                    elif ('corrupt' not in status_list) and ('incomplete' in status_list):
+        else:
 
-                        logger.info('Re-running {} ...'.format(this_parameter_object_.out_img))
+            gray_key = ('band', band_position)
+
+            sect_in = _cache_array(input_cache,
+                                   gray_key,
+                                   this_image_info.read,
+                                   bands2open=band_position,
+                                   i=i_sect,
+                                   j=j_sect,
+                                   rows=n_rows,
+                                   cols=n_cols)
+
+        sect_in = _cache_array(input_cache,
+                               ('grad',) + gray_key,
+                               _read_gradient,
+                               sect_in,
+                               this_parameter_object_.image_min,
+                               this_parameter_object_.image_max)
+
+    elif this_parameter_object_.use_rgb and trigger \
+            not in this_parameter_object_.spectral_indices + ['grad', 'saliency', 'seg']:
+
+        source_key = ('gray',)
+
+        sect_in = _cache_array(input_cache,
+                               source_key,
+                               lambda: sputilities.convert_rgb2gray(this_image_info,
+                                                                    i_sect,
+                                                                    j_sect,
+                                                                    n_rows,
+                                                                    n_cols,
+                                                                    this_parameter_object_.sat_sensor)[0])
 
-                    else:
+    else:
 
-                        if this_parameter_object_.overwrite:
+        source_key = ('band', band_position)
 
-                            logger.info('Re-running {} ...'.format(this_parameter_object_.out_img))
+        sect_in = _cache_array(input_cache,
+                               source_key,
+                               this_image_info.read,
+                               bands2open=band_position,
+                               i=i_sect,
+                               j=j_sect,
+                               rows=n_rows,
+                               cols=n_cols)
 
-                            # Remove the file on the first trigger.
-                            if this_parameter_object_.trigger == this_parameter_object_.triggers[0]:
-                                os.remove(this_parameter_object_.out_img)
+    # Scale the data to an 8-bit range once for all triggers,
+    #   using the same rules as `spsplit.get_section_stats`.
+    if (input_cache is not None) and (source_key is not None) and (sect_in.dtype != 'uint8'):
 
-                            mts_.status_dict[this_parameter_object_.out_img_base]['{TR}-{BD}'.format(TR=this_parameter_object_.trigger,
-                                                                                                     BD=this_parameter_object_.band_position)] = 'incomplete'
-                            mts_.dump_status(this_parameter_object_.status_file)
+        if trigger in ['pantex', 'lac']:
+            out_d_range = (0, 31)
+        else:
+            out_d_range = (0, 255)
 
-                        else:
+        sect_in = _cache_array(input_cache,
+                               source_key + (out_d_range,),
+                               _rescale_section,
+                               sect_in,
+                               this_parameter_object_.image_min,
+                               this_parameter_object_.image_max,
+                               out_d_range)
 
-                            logger.info('{} is already finished ...'.format(this_parameter_object_.out_img))
-                            return
+    if trigger == 'dmp':
 
-            else:
+        # The Differential Morphological Profile
+        #   is a [D x M x N] array
+        # where,
+        #   D = the opening/closing derivative.
+        sect_in = get_dmp(sect_in,
+                          this_parameter_object_.image_min,
+                          this_parameter_object_.image_max,
+                          n_threads=this_parameter_object_.n_threads)
+
+    if trigger == 'gabor':
+
+        sect_in = convolve_gabor(sect_in,
+                                 this_parameter_object_.image_min,
+                                 this_parameter_object_.image_max,
+                                 this_parameter_object_.scales)
+
+    if trigger == 'orb':
+
+        sect_in = get_orb_keypoints(sect_in,
+                                    this_parameter_object_.image_min,
+                                    this_parameter_object_.image_max)
+
+    return sect_in
+
+
+def _compute_section(this_image_info, this_parameter_object_, i_sect, j_sect, n_rows, n_cols, input_cache=None):
+
+    """
+    Computes the features of one trigger and band for a section
+
+    Returns:
+        The <features x rows x columns> section array, the output rows, the output columns
+    """
+
+    sect_in = _get_section_input(this_image_info,
+                                 this_parameter_object_,
+                                 i_sect,
+                                 j_sect,
+                                 n_rows,
+                                 n_cols,
+                                 input_cache=input_cache)
+
+    this_parameter_object_.update_info(i_sect_blk_ctr=1,
+                                       j_sect_blk_ctr=1)
+
+    if this_parameter_object_.trigger == 'gabor':
+        l_rows, l_cols = sect_in[0].shape
+    else:
+        l_rows, l_cols = sect_in.shape
+
+    # Compute section statistics.
+    section_stats_array = spsplit.get_section_stats(sect_in,
+                                                    l_rows,
+                                                    l_cols,
+                                                    this_parameter_object_,
+                                                    this_parameter_object_.section_counter)
+
+    # Get the section output rows and columns.
+    out_rows, out_cols = spsplit.get_out_dims(l_rows,
+                                              l_cols,
+                                              this_parameter_object_)
 
-                # Remove the file on the first trigger.
-                if this_parameter_object_.trigger == this_parameter_object_.triggers[0]:
-                    os.remove(this_parameter_object_.out_img)
+    # Reshape the list of features into
+    #   <features x rows x columns> array.
+    out_section_array = spreshape.reshape_feature_list(section_stats_array,
+                                                       out_rows,
+                                                       out_cols,
+                                                       this_parameter_object_)
 
-                logger.info('Re-running {} ...'.format(this_parameter_object_.out_img))
+    return out_section_array, out_rows, out_cols
 
-        i_sect = section_pair[0]
-        j_sect = section_pair[1]
 
-        # Row and column section bounds checking
+def _get_section_bounds(this_image_info, this_parameter_object_):
+
+    """Gets the section start row, start column, and number of rows and columns"""
+
+    i_sect, j_sect = this_parameter_object_.section_idx_pairs[this_parameter_object_.section_counter-1]
+
+    # Row and column section bounds checking
+    n_rows = raster_tools.n_rows_cols(i_sect,
+                                      this_parameter_object_.sect_row_size,
+                                      this_image_info.rows)
+
+    n_cols = raster_tools.n_rows_cols(j_sect,
+                                      this_parameter_object_.sect_col_size,
+                                      this_image_info.cols)
+
+    return i_sect, j_sect, n_rows, n_cols
+
+
+def _get_empty_sections(this_image_info, this_parameter_object_, occupancy_index):
+
+    """
+    Gets the counters of the sections that have no valid data
+
+    Args:
+        this_image_info (`rinfo` object)
+        this_parameter_object_ (class)
+        occupancy_index (object): A `raster_tools.OccupancyIndex` of the input image, or None.
+
+    Returns:
+        A list of section counters
+    """
+
+    if occupancy_index is None:
+        return list()
+
+    empty_sections = list()
+
+    for section_counter, (i_sect, j_sect) in enumerate(this_parameter_object_.section_idx_pairs, start=1):
+
         n_rows = raster_tools.n_rows_cols(i_sect,
                                           this_parameter_object_.sect_row_size,
                                           this_image_info.rows)
@@ -242,155 +479,147 @@ def _section_read_write(section_counter):
                                           this_parameter_object_.sect_col_size,
                                           this_image_info.cols)
 
-        # Open the image array.
-        if this_parameter_object_.trigger in this_parameter_object_.spectral_indices:
+        if occupancy_index.is_empty(i_sect, j_sect, n_rows, n_cols):
+            empty_sections.append(section_counter)
 
-            wavelengths = utils.VI_WAVELENGTHS[this_parameter_object_.trigger.upper()]
+    return empty_sections
 
-            # Check if the sensor supports the spectral index
-            utils.sensor_wavelength_check(this_parameter_object_.sat_sensor,
-                                          wavelengths)
 
-            # Get the band positions needed
-            #   to process the spectral index.
-            spectral_bands = utils.get_index_bands(this_parameter_object_.trigger.upper(),
-                                                   this_parameter_object_.sat_sensor)
+def _get_empty_section(this_parameter_object_, n_rows, n_cols):
 
-            sect_in = this_image_info.read(bands2open=spectral_bands,
-                                           i=i_sect,
-                                           j=j_sect,
-                                           rows=n_rows,
-                                           cols=n_cols,
-                                           d_type='float32')
+    """
+    Gets the output rows and columns of a section that has no valid data
 
-            sect_in[sect_in >= this_parameter_object_.image_max] = this_parameter_object_.image_max
-            sect_in /= this_parameter_object_.image_max
+    The section is written as 'no data' (0) without being read.
+    """
 
-            vie = VegIndicesEquations(sect_in, chunk_size=-1)
-            sect_in = vie.compute(this_parameter_object_.trigger.upper(), out_type=1)
+    logger.info('  Section {:d} of {:d} has no valid data ...'.format(this_parameter_object_.section_counter,
+                                                                      this_parameter_object_.n_sects))
 
-            this_parameter_object_.update_info(image_min=0,
-                                               image_max=1)
+    out_rows, out_cols = spsplit.get_out_dims(n_rows,
+                                              n_cols,
+                                              this_parameter_object_)
 
-        elif this_parameter_object_.trigger == 'saliency':
+    return None, out_rows, out_cols
 
-            sect_in = saliency(this_image_info,
-                               this_parameter_object_,
-                               i_sect,
-                               j_sect,
-                               n_rows,
-                               n_cols)
 
-            this_parameter_object_.update_info(image_min=0,
-                                               image_max=255)
+def _get_worker_parameters(trigger, band_position, section_counter):
 
-        elif this_parameter_object_.trigger == 'seg':
+    """Gets a copy of the worker parameters, set to the output tile of a section"""
 
-            sect_in = this_image_info.read(bands2open=[1, 2, 3],
-                                           i=i_sect,
-                                           j=j_sect,
-                                           rows=n_rows,
-                                           cols=n_cols)
+    this_parameter_object_ = copy.copy(worker_parameters[(trigger, band_position)])
+    this_parameter_object_ = sputilities.dict2class(this_parameter_object_)
 
-            sect_in = segment_image(sect_in, this_parameter_object_)
+    this_parameter_object_.update_info(section_counter=section_counter)
 
-        elif this_parameter_object_.trigger == 'grad':
+    # Set the output name.
+    return sputilities.scale_fea_check(this_parameter_object_)
 
-            if this_image_info.bands >= 3:
 
-                sect_in = sputilities.convert_rgb2gray(this_image_info,
-                                                       i_sect,
-                                                       j_sect,
-                                                       n_rows,
-                                                       n_cols,
-                                                       this_parameter_object_.sat_sensor)[0]
+def _section_read_write(work_item):
 
-            else:
+    """
+    Handles the section reading and writing
 
-                sect_in = this_image_info.read(bands2open=this_parameter_object_.band_position,
-                                               i=i_sect,
-                                               j=j_sect,
-                                               rows=n_rows,
-                                               cols=n_cols)
+    Args:
+        work_item (tuple): The (trigger, band position, section counter) to process.
 
-            sect_in = np.uint8(rescale_intensity(sect_in,
-                                                 in_range=(this_parameter_object_.image_min,
-                                                           this_parameter_object_.image_max),
-                                                 out_range=(0, 255)))
+    Returns:
+        The work item and the integrity token of the output tile.
+    """
 
-            sect_in = get_mag_avg(sect_in)
+    trigger, band_position, section_counter = work_item
 
-        elif this_parameter_object_.use_rgb and this_parameter_object_.trigger \
-                not in this_parameter_object_.spectral_indices + ['grad', 'saliency', 'seg']:
+    this_parameter_object_ = _get_worker_parameters(trigger, band_position, section_counter)
 
-            sect_in = sputilities.convert_rgb2gray(this_image_info,
-                                                   i_sect,
-                                                   j_sect,
-                                                   n_rows,
-                                                   n_cols,
-                                                   this_parameter_object_.sat_sensor)[0]
+    # Get the input image information.
+    with raster_tools.ropen(this_parameter_object_.input_image) as this_image_info:
+
+        i_sect, j_sect, n_rows, n_cols = _get_section_bounds(this_image_info, this_parameter_object_)
 
+        if section_counter in this_parameter_object_.empty_sections:
+            out_section_array, out_rows, out_cols = _get_empty_section(this_parameter_object_, n_rows, n_cols)
         else:
 
-            sect_in = this_image_info.read(bands2open=this_parameter_object_.band_position,
-                                           i=i_sect,
-                                           j=j_sect,
-                                           rows=n_rows,
-                                           cols=n_cols)
+            out_section_array, out_rows, out_cols = _compute_section(this_image_info,
+                                                                     this_parameter_object_,
+                                                                     i_sect,
+                                                                     j_sect,
+                                                                     n_rows,
+                                                                     n_cols)
 
-        if this_parameter_object_.trigger == 'dmp':
+        start_band = this_parameter_object_.band_info[trigger] + this_parameter_object_.band_counter + 1
 
-            # The Differential Morphological Profile
-            #   is a [D x M x N] array
-            # where,
-            #   D = the opening/closing derivative.
-            sect_in = get_dmp(sect_in,
-                              this_parameter_object_.image_min,
-                              this_parameter_object_.image_max)
+        tile_token = _write_section2file(this_parameter_object_,
+                                         this_image_info,
+                                         [(start_band,
+                                           this_parameter_object_.out_bands_dict[trigger],
+                                           out_section_array)],
+                                         i_sect,
+                                         j_sect,
+                                         out_rows,
+                                         out_cols,
+                                         section_counter)
 
-        if this_parameter_object_.trigger == 'gabor':
+    this_parameter_object_ = None
+    this_image_info_ = None
 
-            sect_in = convolve_gabor(sect_in,
-                                     this_parameter_object_.image_min,
-                                     this_parameter_object_.image_max,
-                                     this_parameter_object_.scales)
+    return work_item, tile_token
 
-        if this_parameter_object_.trigger == 'orb':
 
-            sect_in = get_orb_keypoints(sect_in,
-                                        this_parameter_object_.image_min,
-                                        this_parameter_object_.image_max)
+def _fused_section_read_write(work_item):
 
-        this_parameter_object_.update_info(i_sect_blk_ctr=1,
-                                           j_sect_blk_ctr=1)
+    """
+    Handles the section reading and writing of every trigger and band at once
 
-        if this_parameter_object_.trigger == 'gabor':
-            l_rows, l_cols = sect_in[0].shape
-        else:
-            l_rows, l_cols = sect_in.shape
-
-        # Compute section statistics.
-        section_stats_array = spsplit.get_section_stats(sect_in,
-                                                        l_rows,
-                                                        l_cols,
-                                                        this_parameter_object_,
-                                                        section_counter)
-
-        # Get the section output rows and columns.
-        out_rows, out_cols = spsplit.get_out_dims(l_rows,
-                                                  l_cols,
-                                                  this_parameter_object_)
-
-        # Reshape the list of features into
-        #   <features x rows x columns> array.
-        out_section_array = spreshape.reshape_feature_list(section_stats_array,
-                                                           out_rows,
-                                                           out_cols,
-                                                           this_parameter_object_)
-
-        is_corrupt = _write_section2file(this_parameter_object_,
+    The section is read once, derived inputs (e.g., 8-bit scaling, grayscale, spectral indices)
+    are shared by the triggers, and all of the tile bands are written in one pass.
+
+    Args:
+        work_item (tuple): The (None, None, section counter) to process.
+
+    Returns:
+        The work item and the integrity token of the output tile.
+    """
+
+    section_counter = work_item[2]
+
+    input_cache = dict()
+    band_sections = list()
+
+    this_parameter_object_ = None
+
+    with raster_tools.ropen(worker_parameters[next(iter(worker_parameters))]['input_image']) as this_image_info:
+
+        for trigger, band_position in worker_parameters:
+
+            this_parameter_object_ = _get_worker_parameters(trigger, band_position, section_counter)
+
+            i_sect, j_sect, n_rows, n_cols = _get_section_bounds(this_image_info, this_parameter_object_)
+
+            if section_counter in this_parameter_object_.empty_sections:
+                out_section_array, out_rows, out_cols = _get_empty_section(this_parameter_object_, n_rows, n_cols)
+            else:
+
+                out_section_array, out_rows, out_cols = _compute_section(this_image_info,
+                                                                         this_parameter_object_,
+                                                                         i_sect,
+                                                                         j_sect,
+                                                                         n_rows,
+                                                                         n_cols,
+                                                                         input_cache=input_cache)
+
+            start_band = this_parameter_object_.band_info[trigger] + this_parameter_object_.band_counter + 1
+
+            band_sections.append((start_band,
+                                  this_parameter_object_.out_bands_dict[trigger],
+                                  out_section_array))
+
+        input_cache = None
+
+        tile_token = _write_section2file(this_parameter_object_,
                                          this_image_info,
-                                         out_section_array,
+                                         band_sections,
                                          i_sect,
                                          j_sect,
                                          out_rows,
@@ -398,23 +627,210 @@ def _section_read_write(section_counter):
                                          section_counter)
 
     this_parameter_object_ = None
-    this_image_info_ = None
 
-    return is_corrupt
+    return work_item, tile_token
 
 
-def run(parameter_object):
+def _run_work_item(process_func, work_item):
 
     """
+    Runs one work item, returning the traceback on failure
+
     Args:
-        input_image, output_dir, band_positions=[1], use_rgb=False, block=2, scales=[8], triggers=['mean'],
-        threshold=20, min_len=10, line_gap=2, weighted=False, sfs_thresh=80, resamp_sfs=0.,
-        equalize=False, equalize_adapt=False, smooth=0, visualize=False, convert_stk=False, gdal_cache=256,
-        do_pca=False, stack_feas=True, stack_only=False, neighbors=False, n_jobs=-1,
-        reset_sects=False, image_max=0, lac_r=2, section_size=8000, chunk_size=512
+        process_func (object): The section processing function.
+        work_item (tuple): The (trigger, band position, section counter) to process.
     """
 
-    global potsi, param_dict
+    try:
+        return process_func(work_item) + (None,)
+    except:
+        return work_item, None, traceback.format_exc()
+
+
+class SectionScheduler(object):
+
+    """
+    A class to feed (trigger, band, section) work items to a persistent worker pool
+
+    Items of the same tile are never processed at the same time because they
+    write to the same file. Within a tile, items are processed in the order given.
+
+    Args:
+        work_items (list): A list of (trigger, band position, section counter) tuples.
+        parameter_dicts (dict): The parameter dictionaries, keyed by (trigger, band position).
+        n_jobs (int): The number of worker processes.
+        process_func (Optional[object]): The function that processes one work item.
+            Default is `_section_read_write`.
+    """
+
+    def __init__(self, work_items, parameter_dicts, n_jobs, process_func=_section_read_write):
+
+        self.parameter_dicts = parameter_dicts
+        self.n_jobs = n_jobs
+        self.process_func = process_func
+
+        self.tile_queues = OrderedDict()
+
+        for work_item in work_items:
+            self.tile_queues.setdefault(work_item[2], deque()).append(work_item)
+
+        # Tiles that have no item running
+        self.ready = deque(self.tile_queues.keys())
+
+    def next_item(self):
+
+        """Gets the next work item, or None if every queued tile is busy"""
+
+        if not self.ready:
+            return None
+
+        return self.tile_queues[self.ready.popleft()].popleft()
+
+    def release(self, work_item):
+
+        """Releases the tile of a finished work item"""
+
+        section_counter = work_item[2]
+
+        if self.tile_queues[section_counter]:
+
+            # Finish started tiles first.
+            self.ready.appendleft(section_counter)
+
+        else:
+            del self.tile_queues[section_counter]
+
+    def run(self):
+
+        """
+        Processes the work items, yielding (work item, tile token) as each item completes
+        """
+
+        if self.n_jobs == 1:
+
+            _init_worker(self.parameter_dicts)
+
+            while True:
+
+                work_item = self.next_item()
+
+                if not work_item:
+                    break
+
+                yield self.process_func(work_item)
+
+                self.release(work_item)
+
+        else:
+
+            results = queue.Queue()
+
+            pool = multi.Pool(processes=self.n_jobs,
+                              initializer=_init_worker,
+                              initargs=(self.parameter_dicts,))
+
+            n_running = 0
+
+            try:
+
+                while True:
+
+                    # Keep every worker busy.
+                    while n_running < self.n_jobs:
+
+                        work_item = self.next_item()
+
+                        if not work_item:
+                            break
+
+                        pool.apply_async(_run_work_item, (self.process_func, work_item), callback=results.put)
+
+                        n_running += 1
+
+                    if n_running == 0:
+                        break
+
+                    work_item, tile_token, error = results.get()
+
+                    n_running -= 1
+
+                    if error:
+
+                        logger.error('  Section {:d} of {} (band {}) failed:\n{}'.format(work_item[2],
+                                                                                          work_item[0],
+                                                                                          work_item[1],
+                                                                                          error))
+
+                        raise RuntimeError('Section {:d} of {} (band {}) failed.'.format(work_item[2],
+                                                                                         work_item[0],
+                                                                                         work_item[1]))
+
+                    self.release(work_item)
+
+                    yield work_item, tile_token
+
+                pool.close()
+
+            except:
+
+                pool.terminate()
+                raise
+
+            finally:
+                pool.join()
+
+
+def _write_gtiff_mosaic(parameter_object, vrt_mosaic, gtiff_mosaic):
+
+    """
+    Writes the VRT mosaic of the section tiles to one GeoTIFF
+
+    The GeoTIFF is internally tiled, compressed, and pixel-interleaved, so one
+    tile read returns every feature band of a `tile_block` x `tile_block` block.
+
+    Args:
+        parameter_object (class)
+        vrt_mosaic (str): The VRT mosaic.
+        gtiff_mosaic (str): The GeoTIFF to write.
+    """
+
+    logger.info('  Writing the GeoTIFF mosaic ...')
+
+    # An interrupted write should not leave a mosaic that looks finished.
+    temp_mosaic = gtiff_mosaic.replace('.tif', '_temp.tif')
+
+    raster_tools.translate(vrt_mosaic,
+                           temp_mosaic,
+                           format='GTiff',
+                           overwrite=True,
+                           creationOptions=['TILED=YES',
+                                            'BLOCKXSIZE={:d}'.format(parameter_object.tile_block),
+                                            'BLOCKYSIZE={:d}'.format(parameter_object.tile_block),
+                                            'INTERLEAVE=PIXEL',
+                                            'COMPRESS=DEFLATE',
+                                            'PREDICTOR=3',
+                                            'BIGTIFF=IF_SAFER',
+                                            'NUM_THREADS={:d}'.format(parameter_object.n_jobs)])
+
+    if not os.path.isfile(temp_mosaic):
+
+        logger.error('  The GeoTIFF mosaic, {}, was not written.'.format(gtiff_mosaic))
+        raise IOError
+
+    if os.path.isfile(gtiff_mosaic):
+        os.remove(gtiff_mosaic)
+
+    os.rename(temp_mosaic, gtiff_mosaic)
+
+
+def prepare_parameters(parameter_object):
+
+    """
+    Sets the number of jobs and threads, sorts the scales, and checks the parameters
+
+    Args:
+        parameter_object (class)
+    """
 
     if parameter_object.n_jobs == 0:
         parameter_object.n_jobs = 1
@@ -423,11 +839,131 @@ def run(parameter_object):
     elif parameter_object.n_jobs > multi.cpu_count():
         parameter_object.n_jobs = multi.cpu_count()
 
+    if parameter_object.n_threads == 0:
+        parameter_object.n_threads = 1
+    elif parameter_object.n_threads < 0:
+        parameter_object.n_threads = multi.cpu_count()
+
     # It is assumed in various places that the scales are sorted
     parameter_object.scales.sort()
 
     sputilities.parameter_checks(parameter_object)
 
+
+def _get_parameter_dicts(parameter_object):
+
+    """
+    Sets the image statistics and sections of each trigger and band
+
+    Args:
+        parameter_object (class)
+
+    Returns:
+        The parameter object and the parameter dictionaries, keyed by (trigger, band position)
+    """
+
+    original_band_positions = copy.copy(parameter_object.band_positions)
+
+    # Store the parameters of each trigger and band,
+    #   which are passed to the workers once.
+    parameter_dicts = OrderedDict()
+
+    # Get the input image information.
+    with raster_tools.ropen(parameter_object.input_image) as i_info:
+
+        # Check if any of the input
+        #   bands are corrupted.
+        i_info.check_corrupted_bands()
+
+        if i_info.corrupted_bands:
+
+            logger.error('\nThe following bands appear to be corrupted:\n{}'.format(', '.join(i_info.corrupted_bands)))
+            raise CorruptedBandsError
+
+        # The valid-data footprint, built once
+        #   for skipping empty sections.
+        occupancy_index = None
+
+        if isinstance(parameter_object.aoi_file, str) or parameter_object.skip_empty:
+
+            occupancy_index = raster_tools.OccupancyIndex(i_info,
+                                                          band=original_band_positions[0],
+                                                          boundary_file=parameter_object.aoi_file)
+
+        # Iterate over each feature trigger.
+        for trigger in parameter_object.triggers:
+
+            parameter_object.update_info(trigger=trigger,
+                                         band_positions=original_band_positions,
+                                         band_counter=0)
+
+            # Iterate over each band
+            for band_position in parameter_object.band_positions:
+
+                parameter_object.update_info(band_position=band_position)
+
+                # Get image statistics.
+                parameter_object = sputilities.get_stats(i_info, parameter_object)
+
+                # Get the section size.
+                parameter_object = sputilities.get_section_size(i_info, parameter_object)
+
+                # Get the number of sections in
+                #   the image (only used as a counter).
+                parameter_object = sputilities.get_n_sects(i_info, parameter_object)
+
+                parameter_object.update_info(empty_sections=_get_empty_sections(i_info,
+                                                                                parameter_object,
+                                                                                occupancy_index))
+
+                # The tile means do not depend on the
+                #   band, so they are only computed once.
+                if (parameter_object.trigger == 'saliency') and (band_position == parameter_object.band_positions[0]):
+
+                    bp = raster_tools.BlockFunc(get_saliency_tile_mean,
+                                                [i_info],
+                                                None,
+                                                None,
+                                                band_list=[[1, 2, 3]],
+                                                d_types=['float32'],
+                                                write_array=False,
+                                                close_files=False,
+                                                be_quiet=True,
+                                                print_statement='\nGetting tile lab means for saliency',
+                                                out_attributes=['lab_means'],
+                                                block_rows=parameter_object.sect_row_size,
+                                                block_cols=parameter_object.sect_col_size,
+                                                min_max=[(parameter_object.image_min,
+                                                          parameter_object.image_max)]*3,
+                                                vis_order=parameter_object.vis_order)
+
+                    bp.run()
+
+                    parameter_object.update_info(lab_means=np.array(bp.lab_means,
+                                                                    dtype='float32').mean(axis=0))
+
+                parameter_dicts[(trigger, band_position)] = sputilities.class2dict(parameter_object)
+
+                parameter_object.band_counter += parameter_object.out_bands_dict[parameter_object.trigger]
+
+    del i_info
+
+    return parameter_object, parameter_dicts
+
+
+def run(parameter_object):
+
+    """
+    Args:
+        input_image, output_dir, band_positions=[1], use_rgb=False, block=2, scales=[8], triggers=['mean'],
+        threshold=20, min_len=10, line_gap=2, weighted=False, sfs_thresh=80, resamp_sfs=0.,
+        equalize=False, equalize_adapt=False, smooth=0, visualize=False, convert_stk=False, gdal_cache=256,
+        do_pca=False, stack_feas=True, stack_only=False, neighbors=False, n_jobs=-1,
+        reset_sects=False, image_max=0, lac_r=2, section_size=8000, chunk_size=512
+    """
+
+    prepare_parameters(parameter_object)
+
     # Write the parameters to file.
     sputilities.write_log(parameter_object)
 
@@ -455,50 +991,40 @@ def run(parameter_object):
 
     else:
 
-        # Create the status object.
-        mts = sputilities.ManageStatus()
+        # Open the progress store.
+        progress = spstatus.get_progress_store(parameter_object)
 
         parameter_object.remove_files = False
 
-        # Setup the status dictionary.
-        if os.path.isfile(parameter_object.status_file):
+        section_size = progress.get_meta('SECTION_SIZE')
 
-            mts.load_status(parameter_object.status_file)
+        band_order = dict()
 
-            if parameter_object.section_size != mts.status_dict['SECTION_SIZE']:
+        # The band order of the current triggers
+        for trigger in parameter_object.triggers:
 
-                logger.warning('The section size was changed, so all existing tiled images will be removed.')
-
-                parameter_object.remove_files = True
-
-            if not isinstance(mts.status_dict, dict):
-
-                logger.error('The YAML file already existed, but was not properly stored and saved.\nPlease remove and re-run.')
-                raise AttributeError
-
-        else:
+            band_order['{}'.format(trigger)] = '{:d}-{:d}'.format(parameter_object.band_info[trigger]+1,
+                                                                  parameter_object.band_info[trigger]+parameter_object.out_bands_dict[trigger]*parameter_object.n_bands)
 
-            mts.status_dict = dict()
+        if section_size is None:
 
-            mts.status_dict['ALL_FINISHED'] = 'no'
-            mts.status_dict['BAND_ORDER'] = dict()
+            progress.set_meta('ALL_FINISHED', 'no')
+            progress.set_meta('BAND_ORDER', band_order)
+            progress.set_meta('SECTION_SIZE', parameter_object.section_size)
 
-            # Save the band order.
-            for trigger in parameter_object.triggers:
+        elif parameter_object.section_size != section_size:
 
-                mts.status_dict['BAND_ORDER']['{}'.format(trigger)] = '{:d}-{:d}'.format(parameter_object.band_info[trigger]+1,
-                                                                                         parameter_object.band_info[trigger]+parameter_object.out_bands_dict[trigger]*parameter_object.n_bands)
+            logger.warning('The section size was changed, so all existing tiled images will be removed.')
 
-            mts.status_dict['SECTION_SIZE'] = parameter_object.section_size
+            parameter_object.remove_files = True
 
-            mts.dump_status(parameter_object.status_file)
+            progress.clear()
 
-        process_image = True
+            progress.set_meta('ALL_FINISHED', 'no')
+            progress.set_meta('BAND_ORDER', band_order)
+            progress.set_meta('SECTION_SIZE', parameter_object.section_size)
 
-        if 'ALL_FINISHED' in mts.status_dict:
-
-            if mts.status_dict['ALL_FINISHED'] == 'yes':
-                process_image = False
+        process_image = progress.get_meta('ALL_FINISHED') != 'yes'
 
         # Set the output features folder.
         parameter_object = sputilities.set_feas_dir(parameter_object)
@@ -518,169 +1044,112 @@ def run(parameter_object):
             logger.warning('The input image, {}, is set as finished processing.'.format(parameter_object.input_image))
         else:
 
-            original_band_positions = copy.copy(parameter_object.band_positions)
-
-            # Iterate over each feature trigger.
-            for trigger in parameter_object.triggers:
-
-                parameter_object.update_info(trigger=trigger,
-                                             band_positions=original_band_positions,
-                                             band_counter=0)
-
-                # Iterate over each band
-                for band_position in parameter_object.band_positions:
-
-                    parameter_object.update_info(band_position=band_position)
-
-                    # Get the input image information.
-                    with raster_tools.ropen(parameter_object.input_image) as i_info:
-
-                        # Check if any of the input
-                        #   bands are corrupted.
-                        i_info.check_corrupted_bands()
-
-                        if i_info.corrupted_bands:
-
-                            logger.error('\nThe following bands appear to be corrupted:\n{}'.format(', '.join(i_info.corrupted_bands)))
-                            raise CorruptedBandsError
+            parameter_object, parameter_dicts = _get_parameter_dicts(parameter_object)
 
-                        # Get image statistics.
-                        parameter_object = sputilities.get_stats(i_info, parameter_object)
+            # The tile base names and images, by section
+            tile_bases = dict()
+            tile_images = dict()
 
-                        # Get the section size.
-                        parameter_object = sputilities.get_section_size(i_info, parameter_object)
+            for sect_counter in range(1, parameter_object.n_sects+1):
 
-                        # Get the number of sections in
-                        #   the image (only used as a counter).
-                        parameter_object = sputilities.get_n_sects(i_info, parameter_object)
+                parameter_object.update_info(section_counter=sect_counter)
+                parameter_object = sputilities.scale_fea_check(parameter_object)
 
-                        if parameter_object.trigger == 'saliency':
+                tile_bases[sect_counter] = parameter_object.out_img_base
+                tile_images[parameter_object.out_img_base] = parameter_object.out_img
 
-                            bp = raster_tools.BlockFunc(get_saliency_tile_mean,
-                                                        [i_info],
-                                                        None,
-                                                        None,
-                                                        band_list=[[1, 2, 3]],
-                                                        d_types=['float32'],
-                                                        write_array=False,
-                                                        close_files=False,
-                                                        be_quiet=True,
-                                                        print_statement='\nGetting tile lab means for saliency',
-                                                        out_attributes=['lab_means'],
-                                                        block_rows=parameter_object.sect_row_size,
-                                                        block_cols=parameter_object.sect_col_size,
-                                                        min_max=[(parameter_object.image_min,
-                                                                  parameter_object.image_max)]*3,
-                                                        vis_order=parameter_object.vis_order)
+            # Existing items keep their status.
+            progress.add_items([(tile_bases[sect_counter], trigger, band_position)
+                                for sect_counter in range(1, parameter_object.n_sects+1)
+                                for trigger, band_position in parameter_dicts])
 
-                            bp.run()
+            # Tiles that are corrupt, that no longer exist on disk, or that
+            #   changed since their last recorded write are processed from scratch.
+            reset_tiles = set([tile for tile, trigger, band, status in progress.get_items(statuses=['corrupt'])])
 
-                            parameter_object.update_info(lab_means=np.array(bp.lab_means,
-                                                                            dtype='float32').mean(axis=0))
+            reset_tiles.update([tile for tile, trigger, band, status in progress.get_items(statuses=['complete'])
+                                if not os.path.isfile(tile_images[tile])])
 
-                    del i_info
+            reset_tiles.update([tile for tile, tile_token in viewitems(progress.get_tokens())
+                                if (tile in tile_images) and not spstatus.check_tile_token(tile_images[tile], tile_token)])
 
-                    mts = sputilities.ManageStatus()
-                    mts.load_status(parameter_object.status_file)
+            for tile in reset_tiles:
 
-                    for sect_counter in range(1, parameter_object.n_sects+1):
+                if os.path.isfile(tile_images[tile]):
 
-                        parameter_object.update_info(section_counter=sect_counter)
-                        parameter_object = sputilities.scale_fea_check(parameter_object)
+                    logger.info('Re-running {} ...'.format(tile_images[tile]))
+                    os.remove(tile_images[tile])
 
-                        if trigger == parameter_object.triggers[0]:
-                            mts.status_dict[parameter_object.out_img_base] = dict()
+            progress.update_items([(tile, trigger, band, 'unprocessed')
+                                   for tile, trigger, band, status in progress.get_items()
+                                   if tile in reset_tiles])
 
-                        mts.status_dict[parameter_object.out_img_base]['{TR}-{BD}'.format(TR=parameter_object.trigger,
-                                                                                          BD=parameter_object.band_position)] = 'unprocessed'
+            # The items left to process
+            band_keys = dict([(str(band_position), band_position) for trigger, band_position in parameter_dicts])
 
-                    mts.dump_status(parameter_object.status_file)
+            pending_items = set([(tile, trigger, band_keys[band])
+                                 for tile, trigger, band, status in progress.get_items(statuses=['unprocessed'])])
 
-                    param_dict = sputilities.class2dict(parameter_object)
-                    potsi = parameter_object.section_idx_pairs
+            if parameter_object.fused:
 
-                    # PROCESS IN PARALLEL CHUNKS
+                # Queue one item per tile, covering every trigger and band.
+                work_items = [(None, None, sect_counter) for sect_counter in range(1, parameter_object.n_sects+1)
+                              if any([(tile_bases[sect_counter], trigger, band_position) in pending_items
+                                      for trigger, band_position in parameter_dicts])]
 
-                    parallel_chunk_counter = 1
+                process_func = _fused_section_read_write
 
-                    for parallel_chunk in range(1,
-                                                parameter_object.n_sects+parameter_object.n_jobs,
-                                                parameter_object.n_jobs):
-
-                        if parallel_chunk + parameter_object.n_jobs < parameter_object.n_sects:
-                            parallel_chunk_end = parallel_chunk + parameter_object.n_jobs
-                        else:
-                            parallel_chunk_end = parallel_chunk + (parameter_object.n_sects - parallel_chunk) + 1
-
-                        # Testing
-                        # results = list(map(_section_read_write, range(parallel_chunk, parallel_chunk_end)))
-
-                        pool = multi.Pool(processes=parameter_object.n_jobs)
-
-                        results = pool.map(_section_read_write,
-                                           range(parallel_chunk,
-                                                 parallel_chunk_end))
-
-                        pool.close()
-                        pool.join()
-                        pool = None
-
-                        logger.info('  Updating status ...')
-
-                        for result in results:
-
-                            parameter_object.update_info(section_counter=parallel_chunk_counter)
-                            parameter_object = sputilities.scale_fea_check(parameter_object)
-
-                            # Open the status YAML file.
-                            mts = sputilities.ManageStatus()
+            else:
 
-                            # Load the status dictionary
-                            mts.load_status(parameter_object.status_file)
+                # Queue every tile's triggers and bands, in band order.
+                work_items = [(trigger, band_position, sect_counter)
+                              for sect_counter in range(1, parameter_object.n_sects+1)
+                              for trigger, band_position in parameter_dicts
+                              if (tile_bases[sect_counter], trigger, band_position) in pending_items]
 
-                            if parameter_object.out_img_base in mts.status_dict:
+                process_func = _section_read_write
 
-                                if result:
+            logger.info('  {:,d} of {:,d} items left to process ...'.format(len(pending_items),
+                                                                            parameter_object.n_sects*len(parameter_dicts)))
 
-                                    mts.status_dict[parameter_object.out_img_base]['{TR}-{BD}'.format(TR=parameter_object.trigger,
-                                                                                                      BD=parameter_object.band_position)] = 'corrupt'
+            scheduler = SectionScheduler(work_items,
+                                         parameter_dicts,
+                                         parameter_object.n_jobs,
+                                         process_func=process_func)
 
-                                else:
+            try:
 
-                                    mts.status_dict[parameter_object.out_img_base]['{TR}-{BD}'.format(TR=parameter_object.trigger,
-                                                                                                      BD=parameter_object.band_position)] = 'complete'
+                for work_item, tile_token in scheduler.run():
 
-                            mts.dump_status(parameter_object.status_file)
+                    trigger, band_position, sect_counter = work_item
 
-                            parallel_chunk_counter += 1
+                    if trigger is None:
+                        finished_items = list(parameter_dicts)
+                    else:
+                        finished_items = [(trigger, band_position)]
 
-                    # Parallel(n_jobs=parameter_object.n_jobs,
-                    #          batch_size=1,
-                    #          max_nbytes=None)(delayed(_section_read_write)(idx_pair,
-                    #                                                        parameter_object.section_idx_pairs[idx_pair-1],
-                    #                                                        param_dict)
-                    #                           for idx_pair in range(1, parameter_object.n_sects+1))
+                    progress.update_items([(tile_bases[sect_counter],
+                                            trigger,
+                                            band_position,
+                                            'complete')
+                                           for trigger, band_position in finished_items],
+                                          tokens={tile_bases[sect_counter]: tile_token} if tile_token else None)
 
-                    parameter_object.band_counter += parameter_object.out_bands_dict[parameter_object.trigger]
+            finally:
+                progress.flush()
 
         # Check the corruption status.
-        mts.load_status(parameter_object.status_file)
-
-        n_corrupt = 0
-        for k, v in viewitems(mts.status_dict):
-
-            if isinstance(v, dict):
+        n_corrupt = len(progress.get_items(statuses=['corrupt', 'unprocessed']))
 
-                for ksub, vsub in viewitems(v):
+        if n_corrupt == 0:
+            progress.set_meta('ALL_FINISHED', 'yes')
 
-                    if vsub in ['corrupt', 'incomplete']:
-                        n_corrupt += 1
+        # Keep the YAML status layout available.
+        progress.export_yaml(parameter_object.status_file)
+        progress.close()
 
         if n_corrupt == 0:
 
-            mts.status_dict['ALL_FINISHED'] = 'yes'
-            mts.dump_status(parameter_object.status_file)
-
             # Finally, mosaic the image tiles.
 
             logger.info('  Creating the VRT mosaic ...')
@@ -704,11 +1173,21 @@ def run(parameter_object):
                         overwrite=True,
                         relative_path=parameter_object.relative_path)
 
+            mosaic_image = vrt_mosaic
+
+            if parameter_object.mosaic == 'gtiff':
+
+                mosaic_image = vrt_mosaic.replace('.vrt', '.tif')
+
+                # The tiles have not changed since the last mosaic.
+                if process_image or not os.path.isfile(mosaic_image):
+                    _write_gtiff_mosaic(parameter_object, vrt_mosaic, mosaic_image)
+
             if parameter_object.overviews:
 
-                logger.info('\nBuilding VRT overviews ...')
+                logger.info('\nBuilding mosaic overviews ...')
 
-                with raster_tools.ropen(vrt_mosaic, open2read=False) as vrt_info:
+                with raster_tools.ropen(mosaic_image, open2read=False) as vrt_info:
 
                     vrt_info.remove_overviews()
                     vrt_info.build_overviews(levels=[2, 4, 8, 16])
@@ -75,16 +75,16 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
-def call_gabor(block_array_, block_size_, scales_, end_scale_):
-    return _stats.feature_gabor(np.float32(block_array_), block_size_, scales_, end_scale_)
+def call_gabor(block_array_, block_size_, scales_, end_scale_, n_threads_=1):
+    return _stats.feature_gabor(np.float32(block_array_), block_size_, scales_, end_scale_, n_threads=n_threads_)
 
 
 def call_fourier(block_array_, block_size_, scales_, end_scale_):
     return spfunctions.feature_fourier(block_array_, block_size_, scales_, end_scale_)
 
 
-def call_dmp(block_array_, block_size_, scales_, end_scale_):
-    return _stats.feature_dmp(np.float32(block_array_), block_size_, scales_, end_scale_)
+def call_dmp(block_array_, block_size_, scales_, end_scale_, n_threads_=1):
+    return _stats.feature_dmp(np.float32(block_array_), block_size_, scales_, end_scale_, n_threads=n_threads_)
 
 
 # def call_hog(gradient_array_, orientation_array_, block_size_, scales_, end_scale_):
@@ -103,28 +103,33 @@ def call_lbp(block_array_, block_size_, scales_, end_scale_):
     return _stats.feature_lbp(block_array_, block_size_, scales_, end_scale_)
 
 
-def call_lbpm(block_array_, block_size_, scales_, end_scale_):
-    return _stats.feature_lbpm(block_array_, block_size_, scales_, end_scale_)
+def call_lbpm(block_array_, block_size_, scales_, end_scale_, n_threads_=1):
+    return _stats.feature_lbpm(block_array_, block_size_, scales_, end_scale_, n_threads=n_threads_)
 
 
 def call_lacunarity(block_array_, block_size_, scales_, end_scale_, lac_r_):
-    return _stats.feature_lacunarity(np.uint8(block_array_), block_size_, scales_, end_scale_, lac_r_)
+    return _stats.feature_lacunarity_boxes(np.uint8(block_array_), block_size_, scales_, end_scale_, lac_r_)
 
 
-def call_lsr(block_array_, block_size_, scales_, end_scale_):
-    return spfunctions.feature_lsr(block_array_, block_size_, scales_, end_scale_)
+def call_lsr(block_array_, block_size_, scales_, end_scale_, n_threads_=1):
+    return spfunctions.feature_lsr(block_array_, block_size_, scales_, end_scale_, n_threads=n_threads_)
 
 
-def call_mean(block_array_, block_size_, scales_, end_scale_):
-    return _stats.feature_mean(np.float32(block_array_), block_size_, scales_, end_scale_)
+def call_mean(block_array_, block_size_, scales_, end_scale_, n_threads_=1, mean_engine_='window'):
+
+    if mean_engine_ == 'integral':
+        return spfunctions.feature_mean_integral(np.float32(block_array_), block_size_, scales_, end_scale_)
+    else:
+        return _stats.feature_mean(np.float32(block_array_), block_size_, scales_, end_scale_, n_threads=n_threads_)
 
 
 def call_orb(block_array_, block_size_, scales_, end_scale_):
     return _stats.feature_orb(np.uint8(np.ascontiguousarray(block_array_)), block_size_, scales_, end_scale_)
 
 
-def call_pantex(block_array_, block_size_, scales_, end_scale_, weighted_):
-    return _stats.feature_pantex(np.uint8(block_array_), block_size_, scales_, end_scale_, weighted_)
+def call_pantex(block_array_, block_size_, scales_, end_scale_, weighted_, n_threads_=1):
+    return _stats.feature_pantex_incremental(np.uint8(block_array_), block_size_, scales_, end_scale_, weighted_,
+                                             n_threads=n_threads_)
 
 
 def call_sfs(block_array_, block_size_, scales_, end_scale_, sfs_thresh_, sfs_skip_):
@@ -133,28 +138,34 @@ def call_sfs(block_array_, block_size_, scales_, end_scale_, sfs_thresh_, sfs_sk
 
 def call_func(block_array_, block_size_, scales_, end_scale_, trigger_, **kwargs):
 
+    # The number of threads for the threaded kernels
+    n_threads = kwargs['n_threads'] if 'n_threads' in kwargs else 1
+
+    # The mean and variance implementation
+    mean_engine = kwargs['mean_engine'] if 'mean_engine' in kwargs else 'window'
+
     if trigger_ in ['grad', 'mean', 'saliency', 'seg']:
-        return call_mean(block_array_, block_size_, scales_, end_scale_)
+        return call_mean(block_array_, block_size_, scales_, end_scale_, n_threads, mean_engine)
     elif trigger_ == 'dmp':
-        return call_dmp(block_array_, block_size_, scales_, end_scale_)
+        return call_dmp(block_array_, block_size_, scales_, end_scale_, n_threads)
     elif trigger_ == 'fourier':
         return call_fourier(block_array_, block_size_, scales_, end_scale_)
     elif trigger_ == 'gabor':
-        return call_gabor(block_array_, block_size_, scales_, end_scale_)
+        return call_gabor(block_array_, block_size_, scales_, end_scale_, n_threads)
     elif trigger_ == 'hog':
         return call_hog(block_array_, block_size_, scales_, end_scale_)
     elif trigger_ == 'lbp':
         return call_lbp(block_array_, block_size_, scales_, end_scale_)
     elif trigger_ == 'lbpm':
-        return call_lbpm(block_array_, block_size_, scales_, end_scale_)
+        return call_lbpm(block_array_, block_size_, scales_, end_scale_, n_threads)
     elif trigger_ == 'lac':
         return call_lacunarity(block_array_, block_size_, scales_, end_scale_, kwargs['lac_r'])
     elif trigger_ == 'lsr':
-        return call_lsr(block_array_, block_size_, scales_, end_scale_)
+        return call_lsr(block_array_, block_size_, scales_, end_scale_, n_threads)
     elif trigger_ == 'orb':
         return call_orb(block_array_, block_size_, scales_, end_scale_)
     elif trigger_ == 'pantex':
-        return call_pantex(block_array_, block_size_, scales_, end_scale_, kwargs['weight'])
+        return call_pantex(block_array_, block_size_, scales_, end_scale_, kwargs['weight'], n_threads)
     elif trigger_ == 'sfs':
         return call_sfs(block_array_, block_size_, scales_, end_scale_, kwargs['sfs_threshold'], kwargs['sfs_skip'])
 
@@ -512,6 +523,8 @@ def get_section_stats(bd, section_rows, section_cols, parameter_object, section_
                                                                         parameter_object.n_sects))
 
     other_args = func_dict[parameter_object.trigger]['args']
+    other_args['n_threads'] = parameter_object.n_threads
+    other_args['mean_engine'] = parameter_object.mean_engine
 
     if parameter_object.trigger in parameter_object.spectral_indices:
         trigger = 'mean'
@@ -2,12 +2,19 @@ import os
 import shutil
 
 from .errors import logger
-from .spfeas import spatial_features
+from .spfeas import spatial_features, SPParameters
+from . import spprocess, sppoints
+from .spfunctions import feature_mean_integral, feature_fourier, feature_lsr, fourier_transform, grad_mag
+from .sphelpers import _stats, lsr
+from .sphelpers._dmp import morphological_profiles
+from .sphelpers.gabor_filter_bank import filter_bank
 from .paths import get_path
 
 import mpglue as gl
 
 import numpy as np
+import cv2
+from skimage.morphology import reconstruction
 
 
 SPFEAS_PATH = get_path()
@@ -77,3 +84,339 @@ def test_features():
     logger.info('  SpFeas tests were OK.')
 
     shutil.rmtree(test_features_dir)
+
+
+def test_integral_mean():
+
+    """
+    Test the summed-area table mean and variance against the window kernel
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='float32')
+
+    del i_info
+
+    for scales in [[8], [16], [32], [64], [8, 16, 32, 64]]:
+
+        window_features = _stats.feature_mean(band, 4, scales, scales[-1])
+        integral_features = feature_mean_integral(band, 4, scales, scales[-1])
+
+        assert window_features.shape == integral_features.shape
+
+        # The means and variances
+        assert np.allclose(window_features[::2], integral_features[::2], rtol=1e-4, atol=1e-3)
+        assert np.allclose(window_features[1::2], integral_features[1::2], rtol=1e-3, atol=1e-2)
+
+    logger.info('')
+    logger.info('  SpFeas integral mean tests were OK.')
+
+
+def test_fourier():
+
+    """
+    Test the batched Fourier features against the per-window transform
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='byte')
+
+    del i_info
+
+    blk = 4
+    scales = [8, 16, 32]
+    scales_half = int(scales[-1] / 2.0)
+
+    features = feature_fourier(band, blk, scales, scales[-1])
+
+    n_block_cols = len(range(0, band.shape[1]-(scales[-1]-blk), blk))
+
+    features = features.reshape(-1, n_block_cols, len(scales), 2)
+
+    for bi, bj in [(0, 0), (10, 20), (features.shape[0]-1, n_block_cols-1)]:
+
+        for ki, k in enumerate(scales):
+
+            k_half = int(k / 2.0)
+
+            i = bi * blk + scales_half - k_half
+            j = bj * blk + scales_half - k_half
+
+            sts = [st[0][0] for st in fourier_transform(band[i:i+k, j:j+k])]
+            sts = [0.0 if np.isnan(st) or np.isinf(st) else st for st in sts]
+
+            assert np.allclose(features[bi, bj, ki], sts, rtol=1e-4, atol=1e-3)
+
+    logger.info('')
+    logger.info('  SpFeas Fourier tests were OK.')
+
+
+def test_pantex():
+
+    """
+    Test the incremental PanTex against the per-window co-occurrence matrices
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='byte')
+
+    del i_info
+
+    band = np.ascontiguousarray(band)
+
+    for scales in [[8], [16], [32], [64], [8, 16, 32, 64]]:
+
+        for weighted in [False, True]:
+
+            glcm_features = _stats.feature_pantex(band, 4, scales, scales[-1], weighted)
+            incremental_features = _stats.feature_pantex_incremental(band, 4, scales, scales[-1], weighted)
+
+            assert glcm_features.shape == incremental_features.shape
+
+            # The contrasts only differ by float32 summation order.
+            assert np.allclose(glcm_features, incremental_features, rtol=1e-5, atol=1e-5)
+
+    logger.info('')
+    logger.info('  SpFeas PanTex tests were OK.')
+
+
+def test_lacunarity():
+
+    """
+    Test the box raster lacunarity against the per-window box counting
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='byte')
+
+    del i_info
+
+    # The full range and the 0-31 range used by the `lac` trigger
+    for band_array in [np.ascontiguousarray(band), np.ascontiguousarray(band // 8)]:
+
+        for scales in [[8], [16], [32], [64], [8, 16, 32, 64]]:
+
+            for r in [2, 3]:
+
+                box_features = _stats.feature_lacunarity(band_array, 4, scales, scales[-1], r)
+                raster_features = _stats.feature_lacunarity_boxes(band_array, 4, scales, scales[-1], r)
+
+                assert np.array_equal(box_features, raster_features)
+
+    logger.info('')
+    logger.info('  SpFeas lacunarity tests were OK.')
+
+
+def test_gabor():
+
+    """
+    Test the frequency domain Gabor filter bank against the spatial filters
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='byte')
+
+    del i_info
+
+    for scales in [[8], [16], [32], [64], [8, 16, 32, 64]]:
+
+        spatial_responses = filter_bank(band, scales, fft_size=None)
+        fft_responses = filter_bank(band, scales)
+
+        assert spatial_responses.dtype == fft_responses.dtype
+        assert spatial_responses.shape == fft_responses.shape
+
+        # Responses can only differ where rounding ties break differently.
+        response_diffs = np.abs(np.int16(spatial_responses) - np.int16(fft_responses))
+
+        assert response_diffs.max() <= 1
+        assert (response_diffs > 0).mean() < 1e-4
+
+    logger.info('')
+    logger.info('  SpFeas Gabor tests were OK.')
+
+
+def test_dmp():
+
+    """
+    Test the DMP reconstructions against Scikit-image
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='byte')
+
+    del i_info
+
+    band = np.ascontiguousarray(band[:300, :300])
+
+    ses = [3, 5, 7, 9, 11, 13, 15]
+
+    openings, closings = morphological_profiles(band, ses, n_threads=2)
+
+    opening_marker = band.copy()
+    closing_marker = band.copy()
+
+    for si, se_size in enumerate(ses):
+
+        se = cv2.getStructuringElement(cv2.MORPH_RECT, (se_size, se_size))
+
+        opening_marker = cv2.erode(opening_marker, se, iterations=1)
+        closing_marker = cv2.dilate(closing_marker, se, iterations=1)
+
+        assert np.array_equal(openings[si], reconstruction(opening_marker, band, 'dilation', se))
+        assert np.array_equal(closings[si], reconstruction(closing_marker, band, 'erosion', se))
+
+    logger.info('')
+    logger.info('  SpFeas DMP tests were OK.')
+
+
+def test_lsr():
+
+    """
+    Test the section line support region features against the window features
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    with gl.ropen(image) as i_info:
+
+        band = i_info.read(bands2open=1,
+                           d_type='float32')
+
+    del i_info
+
+    blk = 8
+    scs = [8, 16, 32]
+    end_scale = 32
+    scales_half = int(end_scale / 2)
+
+    edge_mag, edge_ori, deriv_x, deriv_y = grad_mag(band[:90, :90])
+
+    features = list()
+
+    # The window by window features
+    for i in range(0, 90-(end_scale-blk), blk):
+
+        for j in range(0, 90-(end_scale-blk), blk):
+
+            windows = [edge_ori[i:i+end_scale, j:j+end_scale].copy(),
+                       edge_mag[i:i+end_scale, j:j+end_scale],
+                       deriv_x[i:i+end_scale, j:j+end_scale],
+                       deriv_y[i:i+end_scale, j:j+end_scale]]
+
+            for k in scs:
+
+                if k != scs[-1]:
+                    ifst = scales_half - int(k / 2)
+                    isnd = ifst + k
+                else:
+                    ifst, isnd = None, None
+
+                features += list(lsr.feature_lsr(*[window[ifst:isnd, ifst:isnd] for window in windows]))
+
+    section_features = feature_lsr(band[:90, :90], blk, scs, end_scale)
+
+    assert np.allclose(section_features, np.float32(features), atol=1e-5)
+    assert np.array_equal(section_features, feature_lsr(band[:90, :90], blk, scs, end_scale, n_threads=4))
+
+    # No edges
+    flat = np.zeros((64, 64), dtype='float32')
+
+    assert not lsr.feature_lsr_section(flat, flat, flat, flat, blk, scs, end_scale).any()
+
+    logger.info('')
+    logger.info('  SpFeas LSR tests were OK.')
+
+
+def test_points():
+
+    """
+    Test the point sampling block windows against whole sections
+    """
+
+    image = os.path.join(SPFEAS_PATH, 'data', 'test_image.tif')
+
+    spp = SPParameters(image, os.path.join(SPFEAS_PATH, 'data', 'features'))
+
+    spp.set_params(triggers=['mean', 'pantex', 'gabor', 'lbpm'],
+                   block=4,
+                   scales=[8, 16],
+                   band_positions=[1],
+                   n_threads=1)
+
+    spp.update_info(image_min=0,
+                    image_max=255,
+                    n_sects=1,
+                    section_counter=1)
+
+    n_rows = 260
+    n_cols = 300
+
+    # (first row, last row + 1, first column, last column + 1) output blocks, including the section edges
+    block_bounds_list = [(0, 2, 0, 1), (10, 13, 20, 24), (60, 62, 68, 71)]
+
+    with gl.ropen(image) as i_info:
+
+        for trigger in spp.triggers:
+
+            parameter_object = spp.copy()
+            parameter_object.update_info(trigger=trigger, band_position=1)
+
+            section_array, out_rows, out_cols = spprocess._compute_section(i_info,
+                                                                           parameter_object,
+                                                                           0,
+                                                                           0,
+                                                                           n_rows,
+                                                                           n_cols)
+
+            context = sppoints.get_context(parameter_object)
+
+            for r0, r1, c0, c1 in block_bounds_list:
+
+                r1 = min(r1, out_rows)
+                c1 = min(c1, out_cols)
+
+                i0, i1, j0, j1 = sppoints.get_window((r0, r1, c0, c1), context, parameter_object, n_rows, n_cols)
+
+                window_array, __, __ = spprocess._compute_section(i_info,
+                                                                  parameter_object,
+                                                                  i0,
+                                                                  j0,
+                                                                  i1-i0,
+                                                                  j1-j0,
+                                                                  input_cache=dict())
+
+                i0 = int(i0 / parameter_object.block)
+                j0 = int(j0 / parameter_object.block)
+
+                assert np.array_equal(section_array[:, r0:r1, c0:c1],
+                                      window_array[:, r0-i0:r1-i0, c0-j0:c1-j0])
+
+    del i_info
+
+    logger.info('')
+    logger.info('  SpFeas point sampling tests were OK.')